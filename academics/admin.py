@@ -1,17 +1,47 @@
 import string
-import json
 
 from django import forms
 from django.contrib import admin, messages
-from django.core.exceptions import ValidationError
-from .models import AcademicYear, ClassLevel, Subject, TeacherAssignment, StudentEnrollment, normalize_section
-from .services import promote_enrollments
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from .exports import ASSIGNMENT_EXPORT_COLUMNS, ENROLLMENT_EXPORT_COLUMNS, export_csv_action
+from .families import class_family, year_families
+from .models import (
+    AcademicYear,
+    ClassLevel,
+    RolloverCheckpoint,
+    Subject,
+    TeacherAssignment,
+    StudentEnrollment,
+    normalize_section,
+)
+from .rollover import plan_rollover
+from .services import promote_enrollments, resequence_roll_numbers
+from accounts.search import SearchTextAdminMixin
+from cems.admin_base import CemsModelAdmin
+from exams.admin import ResultPublishingAdminMixin
+from exams.services import publish_class_results
 
 
 def all_model_fields(model_class):
     return [field.name for field in model_class._meta.fields]
 
 
+def promotion_preview_message(result, source_class, limit=10):
+    def names(enrollments):
+        labels = [enr.student.student_id or enr.student.user.username for enr in enrollments[:limit]]
+        extra = len(enrollments) - len(labels)
+        return ", ".join(labels) + (f" and {extra} more" if extra > 0 else "") if labels else "none"
+
+    return (
+        f"Dry run for {source_class} -> {result['target_class']}: "
+        f"would create {result['created']} ({names(result['created_enrollments'])}); "
+        f"would skip {result['skipped']} already placed ({names(result['skipped_enrollments'])}). Nothing was saved."
+    )
+
+
 class ClassLevelAdminForm(forms.ModelForm):
     name = forms.ChoiceField(
         choices=[(f"Class {n}", f"Class {n}") for n in range(1, 11)],
@@ -44,36 +74,10 @@ class SubjectAdminForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Attach metadata for client-side filtering
-        classes = list(ClassLevel.objects.select_related("academic_year").only("id", "name", "academic_year_id"))
-        class_meta = {
-            str(cls.pk): {"name": cls.name, "year_id": cls.academic_year_id}
-            for cls in classes
-        }
-        self.fields["class_level"].widget.attrs["data-class-meta"] = json.dumps(class_meta)
-
-        family_subjects_by_class = {}
-        # Build family buckets by (name, year)
-        family_ids = {}
-        for cls in classes:
-            key = (cls.name.lower(), cls.academic_year_id)
-            family_ids.setdefault(key, []).append(cls.id)
-
-        subjects = Subject.objects.select_related("class_level", "class_level__academic_year")
-        subjects_by_family = {}
-        for subj in subjects:
-            cls = subj.class_level
-            key = (cls.name.lower(), cls.academic_year_id)
-            subjects_by_family.setdefault(key, []).append(
-                {"id": subj.id, "name": subj.name, "code": subj.code or ""}
-            )
-
-        for key, class_ids in family_ids.items():
-            subject_list = subjects_by_family.get(key, [])
-            for cid in class_ids:
-                family_subjects_by_class[str(cid)] = subject_list
-
-        self.fields["reuse_subject"].widget.attrs["data-family-subjects"] = json.dumps(family_subjects_by_class)
+        # subject_reuse_filter.js loads the chosen class's family subjects from here.
+        widget = self.fields["class_level"].widget
+        # The admin wraps the select; its attrs are the ones rendered.
+        getattr(widget, "widget", widget).attrs["data-families-url"] = reverse("admin:academics_subject_families")
 
         class_level_id = self.initial.get("class_level") or self.data.get("class_level")
         cls = None
@@ -185,19 +189,53 @@ class TeacherAssignmentAdminForm(forms.ModelForm):
 
 
 @admin.register(AcademicYear)
-class AcademicYearAdmin(admin.ModelAdmin):
+class AcademicYearAdmin(CemsModelAdmin):
     list_display = all_model_fields(AcademicYear)
     list_filter = ("is_current",)
     search_fields = ("name", "id")
+    actions = ("rollover_into_current_year",)
+
+    def rollover_into_current_year(self, request, queryset):
+        # Promoting every class is too long for a request; show the plan and hand over
+        # to the rollover_year command, which runs it with workers and checkpoints.
+        target_year = AcademicYear.objects.filter(is_current=True).order_by("-start_date").first()
+        if not target_year:
+            self.message_user(request, "Mark an academic year as current before rolling over.", level=messages.ERROR)
+            return
+
+        for source_year in queryset.exclude(pk=target_year.pk):
+            try:
+                plan = plan_rollover(source_year, target_year)
+            except ValidationError as exc:
+                self.message_user(request, "; ".join(exc.messages), level=messages.ERROR)
+                continue
+            ready = [item for item in plan if item.target_class is not None]
+            self.message_user(
+                request,
+                f"{source_year} -> {target_year}: {len(ready)} classes ready to promote. "
+                f"Run 'python manage.py rollover_year \"{source_year.name}\"' to promote them.",
+                level=messages.INFO,
+            )
+            for item in plan:
+                if item.status == "missing":
+                    self.message_user(request, f"{item.source_class}: {item.message}", level=messages.ERROR)
+    rollover_into_current_year.short_description = "Check rollover of selected years into the current year"
 
 
 @admin.register(ClassLevel)
-class ClassLevelAdmin(admin.ModelAdmin):
+class ClassLevelAdmin(ResultPublishingAdminMixin, CemsModelAdmin):
     form = ClassLevelAdminForm
     list_display = all_model_fields(ClassLevel)
     list_filter = ("academic_year",)
     search_fields = ("name", "section", "id")
-    actions = ("promote_entire_class",)
+    actions = (
+        "promote_entire_class",
+        "preview_class_promotion",
+        "resequence_rolls_by_name",
+        "resequence_rolls_by_student_id",
+        "release_term_results",
+        "withdraw_term_results",
+    )
 
     def save_model(self, request, obj, form, change):
         """
@@ -232,7 +270,7 @@ class ClassLevelAdmin(admin.ModelAdmin):
 
         super().save_model(request, obj, form, change)
 
-    def promote_entire_class(self, request, queryset):
+    def _promote_class(self, request, queryset, dry_run):
         if queryset.count() != 1:
             self.message_user(request, "Select a single class to promote.", level=messages.ERROR)
             return
@@ -245,23 +283,60 @@ class ClassLevelAdmin(admin.ModelAdmin):
         class_level = queryset.first()
         enrollments = StudentEnrollment.objects.filter(class_level=class_level, status="current")
         try:
-            result = promote_enrollments(enrollments, target_year=target_year)
+            result = promote_enrollments(enrollments, target_year=target_year, dry_run=dry_run)
         except ValidationError as exc:
             self.message_user(request, "; ".join(exc.messages), level=messages.ERROR)
             return
 
         target_label = result.get("target_class") or "target class"
+        if dry_run:
+            self.message_user(request, promotion_preview_message(result, class_level), level=messages.INFO)
+            return
         self.message_user(
             request,
             f"Promoted {result['created']} students from {class_level} to {target_label}. "
             f"Skipped {result['skipped']} already placed.",
             level=messages.INFO,
         )
+
+    def promote_entire_class(self, request, queryset):
+        self._promote_class(request, queryset, dry_run=False)
     promote_entire_class.short_description = "Promote all current students in selected class to next class"
 
+    def preview_class_promotion(self, request, queryset):
+        self._promote_class(request, queryset, dry_run=True)
+    preview_class_promotion.short_description = "Preview promotion of selected class (dry run)"
+
+    def _resequence(self, request, queryset, order):
+        for class_level in queryset.select_related("academic_year"):
+            count = resequence_roll_numbers(class_level, order=order)
+            self.message_user(request, f"Renumbered {count} students in {class_level}.", level=messages.INFO)
+
+    def has_change_enrollment_permission(self, request):
+        # Resequencing rewrites every enrollment's roll, not the classes being selected.
+        return request.user.has_perm("academics.change_studentenrollment")
+
+    @admin.action(permissions=["change_enrollment"], description="Resequence roll numbers by student name")
+    def resequence_rolls_by_name(self, request, queryset):
+        self._resequence(request, queryset, "name")
+
+    @admin.action(permissions=["change_enrollment"], description="Resequence roll numbers by student ID")
+    def resequence_rolls_by_student_id(self, request, queryset):
+        self._resequence(request, queryset, "student_id")
+
+    @admin.action(permissions=["publish"], description="Publish all exam results of selected classes")
+    def release_term_results(self, request, queryset):
+        changed = publish_class_results(queryset, published=True, actor=request.user)
+        self.message_user(request, f"Published {changed} results across {queryset.count()} classes.", level=messages.INFO)
+
+    @admin.action(permissions=["publish"], description="Unpublish all exam results of selected classes")
+    def withdraw_term_results(self, request, queryset):
+        changed = publish_class_results(queryset, published=False)
+        self.message_user(request, f"Withdrew {changed} results across {queryset.count()} classes.", level=messages.INFO)
+
 
 @admin.register(Subject)
-class SubjectAdmin(admin.ModelAdmin):
+class SubjectAdmin(CemsModelAdmin):
     form = SubjectAdminForm
     list_display = all_model_fields(Subject)
     list_filter = ("class_level",)
@@ -270,20 +345,40 @@ class SubjectAdmin(admin.ModelAdmin):
     class Media:
         js = ("admin/js/subject_reuse_filter.js",)
 
+    def get_urls(self):
+        urls = [
+            path(
+                "families/",
+                self.admin_site.admin_view(self.families_view),
+                name="academics_subject_families",
+            )
+        ]
+        return urls + super().get_urls()
+
+    def families_view(self, request):
+        """
+        Class metadata and family subjects as JSON, for one class (?class_level=) or a
+        whole academic year (?academic_year=); both read the year's cached payload.
+        """
+        if not (self.has_view_permission(request) or self.has_add_permission(request)):
+            raise PermissionDenied
+        class_id = request.GET.get("class_level") or ""
+        year_id = request.GET.get("academic_year") or ""
+        if class_id.isdigit():
+            class_level = get_object_or_404(ClassLevel.objects.only("pk", "academic_year_id"), pk=class_id)
+            return JsonResponse(class_family(class_level))
+        if year_id.isdigit():
+            return JsonResponse(year_families(int(year_id)))
+        return JsonResponse({"error": "Pass class_level or academic_year."}, status=400)
+
 
 @admin.register(TeacherAssignment)
-class TeacherAssignmentAdmin(admin.ModelAdmin):
+class TeacherAssignmentAdmin(SearchTextAdminMixin, CemsModelAdmin):
     form = TeacherAssignmentAdminForm
     list_display = ("teacher_display",) + tuple(all_model_fields(TeacherAssignment))
     list_filter = ("academic_year", "class_level", "subject")
-    search_fields = (
-        "teacher__employee_code",
-        "teacher__user__username",
-        "teacher__user__first_name",
-        "teacher__user__last_name",
-        "subject__name",
-        "class_level__name",
-    )
+    search_fields = ("teacher__search_text__contains", "subject__name", "class_level__name")
+    actions = (export_csv_action(ASSIGNMENT_EXPORT_COLUMNS, "teacher-assignments.csv"),)
 
     class Media:
         js = ("admin/js/subject_reuse_filter.js",)
@@ -296,11 +391,15 @@ class TeacherAssignmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(StudentEnrollment)
-class StudentEnrollmentAdmin(admin.ModelAdmin):
+class StudentEnrollmentAdmin(SearchTextAdminMixin, CemsModelAdmin):
     list_display = ("student_display",) + tuple(all_model_fields(StudentEnrollment))
     list_filter = ("academic_year", "status")
-    search_fields = ("student__student_id", "student__user__username", "class_level__name", "roll_number", "id")
-    actions = ("promote_selected_students",)
+    search_fields = ("student__search_text__contains", "class_level__name", "roll_number", "id")
+    actions = (
+        "promote_selected_students",
+        "preview_selected_promotion",
+        export_csv_action(ENROLLMENT_EXPORT_COLUMNS, "student-enrollments.csv"),
+    )
 
     def student_display(self, obj):
         student = obj.student
@@ -309,7 +408,7 @@ class StudentEnrollmentAdmin(admin.ModelAdmin):
         return f"{code} - {name}"
     student_display.short_description = "Student"
 
-    def promote_selected_students(self, request, queryset):
+    def _promote_selected(self, request, queryset, dry_run):
         if not queryset.exists():
             self.message_user(request, "Select at least one enrollment to promote.", level=messages.WARNING)
             return
@@ -325,15 +424,31 @@ class StudentEnrollmentAdmin(admin.ModelAdmin):
             return
 
         try:
-            result = promote_enrollments(queryset, target_year=target_year)
+            result = promote_enrollments(queryset, target_year=target_year, dry_run=dry_run)
         except ValidationError as exc:
             self.message_user(request, "; ".join(exc.messages), level=messages.ERROR)
             return
 
         target_label = result.get("target_class") or "target class"
+        if dry_run:
+            self.message_user(request, promotion_preview_message(result, enrollment.class_level), level=messages.INFO)
+            return
         self.message_user(
             request,
             f"Promoted {result['created']} students to {target_label}; skipped {result['skipped']} already enrolled.",
             level=messages.INFO,
         )
+
+    def promote_selected_students(self, request, queryset):
+        self._promote_selected(request, queryset, dry_run=False)
     promote_selected_students.short_description = "Promote selected students to their next class"
+
+    def preview_selected_promotion(self, request, queryset):
+        self._promote_selected(request, queryset, dry_run=True)
+    preview_selected_promotion.short_description = "Preview promotion of selected students (dry run)"
+
+
+@admin.register(RolloverCheckpoint)
+class RolloverCheckpointAdmin(CemsModelAdmin):
+    list_display = all_model_fields(RolloverCheckpoint)
+    list_filter = ("target_year", "status")
@@ -0,0 +1,100 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """
+    Return a StreamingHttpResponse that writes ``header`` then each row as CSV.
+
+    ``rows`` should be lazy (e.g. ``values_list(...).iterator(chunk_size=...)``) so the
+    first bytes go out immediately and the full result set is never held in memory.
+    """
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type="text/csv")
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+def stream_queryset_csv(queryset, filename, columns):
+    """
+    Stream a queryset as CSV using a ``values_list`` projection.
+
+    ``columns`` is a sequence of (header, lookup) pairs; no model instances are built.
+    """
+    headers = [header for header, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    rows = queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return stream_csv(filename, headers, rows)
+
+
+ENROLLMENT_EXPORT_COLUMNS = (
+    ("Academic year", "academic_year__name"),
+    ("Class", "class_level__name"),
+    ("Section", "class_level__section"),
+    ("Roll", "roll_number"),
+    ("Student ID", "student__student_id"),
+    ("Username", "student__user__username"),
+    ("First name", "student__user__first_name"),
+    ("Last name", "student__user__last_name"),
+    ("Status", "status"),
+    ("Enrolled on", "enrolled_on"),
+)
+
+ASSIGNMENT_EXPORT_COLUMNS = (
+    ("Academic year", "academic_year__name"),
+    ("Class", "class_level__name"),
+    ("Section", "class_level__section"),
+    ("Subject", "subject__name"),
+    ("Subject code", "subject__code"),
+    ("Employee code", "teacher__employee_code"),
+    ("Username", "teacher__user__username"),
+    ("First name", "teacher__user__first_name"),
+    ("Last name", "teacher__user__last_name"),
+)
+
+RESULT_EXPORT_COLUMNS = (
+    ("Academic year", "exam__academic_year__name"),
+    ("Class", "exam__class_level__name"),
+    ("Section", "exam__class_level__section"),
+    ("Subject", "exam__subject__name"),
+    ("Exam", "exam__title"),
+    ("Exam date", "exam__exam_date"),
+    ("Max marks", "exam__max_marks"),
+    ("Student ID", "student__student_id"),
+    ("Username", "student__user__username"),
+    ("First name", "student__user__first_name"),
+    ("Last name", "student__user__last_name"),
+    ("Marks", "marks_obtained"),
+    ("Attendance", "attendance"),
+    ("Published", "published"),
+    ("Published at", "published_at"),
+)
+
+
+def export_csv_action(columns, filename):
+    """
+    Build a ModelAdmin action that streams the selected rows as CSV.
+    """
+
+    def export_csv(modeladmin, request, queryset):
+        return stream_queryset_csv(queryset, filename, columns)
+
+    export_csv.short_description = "Export selected rows to CSV"
+    return export_csv
@@ -0,0 +1,66 @@
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from academics.models import ClassLevel, Subject
+from cems.routers import replica_reads
+
+YEAR_KEY = "subject_families:year:{}"
+
+
+def cache_timeout():
+    return getattr(settings, "SUBJECT_FAMILY_CACHE_SECONDS", 3600)
+
+
+def family_key(class_name: str) -> str:
+    """Sections of the same class in a year form one family, e.g. "Class 5" A/B/C."""
+    return class_name.lower()
+
+
+@replica_reads(False)
+def load_year_families(academic_year_id: int) -> dict:
+    """
+    Class metadata and subjects per class family of one academic year, in two queries:
+    {"classes": {class_id: {"name", "section", "family"}}, "families": {family: [subjects]}}.
+    """
+    classes = {
+        str(pk): {"name": name, "section": section, "family": family_key(name)}
+        for pk, name, section in ClassLevel.objects.filter(academic_year_id=academic_year_id).values_list(
+            "pk", "name", "section"
+        )
+    }
+    families = {meta["family"]: [] for meta in classes.values()}
+    subjects = Subject.objects.filter(class_level__academic_year_id=academic_year_id).order_by("name", "pk")
+    for pk, name, code, class_id in subjects.values_list("pk", "name", "code", "class_level_id"):
+        meta = classes.get(str(class_id))
+        if meta:  # a class created between the two queries
+            families[meta["family"]].append({"id": pk, "name": name, "code": code or "", "class_id": class_id})
+    return {"classes": classes, "families": families}
+
+
+def year_families(academic_year_id: int) -> dict:
+    key = YEAR_KEY.format(academic_year_id)
+    payload = cache.get(key)
+    if payload is None:
+        payload = load_year_families(academic_year_id)
+        cache.set(key, payload, cache_timeout())
+    return payload
+
+
+def class_family(class_level: ClassLevel) -> dict:
+    """The class's metadata and the subjects already used across its family's sections."""
+    payload = year_families(class_level.academic_year_id)
+    meta = payload["classes"].get(str(class_level.pk))
+    return {
+        "class": meta,
+        "subjects": payload["families"].get(meta["family"], []) if meta else [],
+    }
+
+
+def invalidate_year_families(academic_year_ids: Iterable[Optional[int]]):
+    """Drop the cached family metadata of these years once the transaction commits."""
+    keys = [YEAR_KEY.format(year_id) for year_id in set(academic_year_ids) if year_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
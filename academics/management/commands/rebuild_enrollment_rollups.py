@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from academics.rollups import rebuild_enrollment_rollups
+
+
+class Command(BaseCommand):
+    help = "Recount enrollment rollups per class/year/status from StudentEnrollment (drift repair)."
+
+    def handle(self, *args, **options):
+        written = rebuild_enrollment_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} enrollment rollup rows."))
@@ -0,0 +1,77 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import AcademicYear
+from academics.rollover import DEFAULT_ROLLOVER_WORKERS, run_rollover
+
+
+def _get_year(value):
+    lookup = {"pk": int(value)} if value.isdigit() else {"name": value}
+    try:
+        return AcademicYear.objects.get(**lookup)
+    except AcademicYear.DoesNotExist:
+        raise CommandError(f"Academic year '{value}' does not exist.")
+
+
+class Command(BaseCommand):
+    help = "Promote every class of an academic year into the current academic year."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source_year", help="Name or id of the year being closed.")
+        parser.add_argument("--target-year", help="Name or id of the year to promote into (default: current year).")
+        parser.add_argument("--workers", type=int, default=DEFAULT_ROLLOVER_WORKERS, help="Classes promoted in parallel.")
+        parser.add_argument("--dry-run", action="store_true", help="Plan and report without writing.")
+        parser.add_argument("--restart", action="store_true", help="Ignore checkpoints from an earlier run.")
+
+    def handle(self, *args, **options):
+        source_year = _get_year(options["source_year"])
+        if options["target_year"]:
+            target_year = _get_year(options["target_year"])
+        else:
+            target_year = AcademicYear.objects.filter(is_current=True).order_by("-start_date").first()
+            if not target_year:
+                raise CommandError("Mark an academic year as current or pass --target-year.")
+
+        self.stdout.write(
+            f"Rolling over {source_year} -> {target_year}"
+            f"{' (dry run)' if options['dry_run'] else ''} with {options['workers']} workers."
+        )
+
+        def report(item):
+            line = (
+                f"  {item.source_class} -> {item.target_class}: {item.status}, "
+                f"created {item.created}, skipped {item.skipped} in {item.seconds:.2f}s"
+            )
+            if item.status == "failed":
+                self.stdout.write(self.style.ERROR(f"{line} ({item.message})"))
+            else:
+                self.stdout.write(line)
+
+        started = time.perf_counter()
+        try:
+            plan = run_rollover(
+                source_year,
+                target_year,
+                workers=options["workers"],
+                dry_run=options["dry_run"],
+                resume=not options["restart"],
+                on_progress=report,
+            )
+        except ValidationError as exc:
+            raise CommandError("; ".join(exc.messages))
+        elapsed = time.perf_counter() - started
+
+        for item in plan:
+            if item.status in ("done", "graduating", "missing"):
+                self.stdout.write(f"  {item.source_class}: {item.status} ({item.message})")
+
+        promoted = [item for item in plan if item.status == "promoted"]
+        failed = [item for item in plan if item.status in ("failed", "missing")]
+        summary = (
+            f"{len(promoted)} classes promoted, {sum(item.created for item in promoted)} students created, "
+            f"{sum(item.skipped for item in promoted)} skipped, {len(failed)} classes need attention "
+            f"({elapsed:.2f}s total)."
+        )
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0003_teacherassignment_unique_class_subject_year_assignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RolloverCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('done', 'Done'), ('failed', 'Failed')], max_length=8)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('skipped_count', models.PositiveIntegerField(default=0)),
+                ('duration_seconds', models.FloatField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollover_checkpoints', to='academics.classlevel')),
+                ('target_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollover_checkpoints', to='academics.academicyear')),
+            ],
+            options={
+                'ordering': ['target_year', 'class_level'],
+                'unique_together': {('class_level', 'target_year')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_rollovercheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roll_counters', to='academics.academicyear')),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roll_counters', to='academics.classlevel')),
+            ],
+            options={
+                'unique_together': {('class_level', 'academic_year')},
+            },
+        ),
+    ]
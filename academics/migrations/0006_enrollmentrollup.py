@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_enrollment_rollups(apps, schema_editor):
+    StudentEnrollment = apps.get_model("academics", "StudentEnrollment")
+    EnrollmentRollup = apps.get_model("academics", "EnrollmentRollup")
+    rows = (
+        StudentEnrollment.objects.order_by()
+        .values("class_level_id", "academic_year_id", "status")
+        .annotate(total=Count("id"))
+    )
+    EnrollmentRollup.objects.bulk_create(
+        [
+            EnrollmentRollup(
+                class_level_id=row["class_level_id"],
+                academic_year_id=row["academic_year_id"],
+                status=row["status"],
+                count=row["total"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0005_rollnumbercounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('current', 'Current'), ('promoted', 'Promoted'), ('archived', 'Archived')], max_length=12)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_rollups', to='academics.academicyear')),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_rollups', to='academics.classlevel')),
+            ],
+            options={
+                'ordering': ['academic_year', 'class_level', 'status'],
+                'unique_together': {('class_level', 'academic_year', 'status')},
+            },
+        ),
+        migrations.RunPython(seed_enrollment_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0006_enrollmentrollup'),
+        ('accounts', '0006_profile_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentenrollment',
+            index=models.Index(fields=['class_level', 'academic_year', 'updated_at'], name='academics_s_class_l_173ddf_idx'),
+        ),
+    ]
@@ -2,8 +2,8 @@ import re
 from datetime import date
 
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Max, Q
+from django.db import models, transaction
+from django.db.models import F, Max, Q
 from accounts.models import TeacherProfile, StudentProfile
 
 ALLOWED_CLASS_NUMBERS = list(range(1, 11))
@@ -261,6 +261,10 @@ class StudentEnrollment(models.Model):
     class Meta:
         unique_together = ("student", "class_level", "academic_year")
         ordering = ["academic_year", "class_level", "student"]
+        indexes = [
+            # Conditional GETs of the roster page read Count/Max(updated_at) per class/year.
+            models.Index(fields=["class_level", "academic_year", "updated_at"]),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["class_level", "academic_year", "roll_number"],
@@ -275,21 +279,21 @@ class StudentEnrollment(models.Model):
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         self.full_clean()
+        allocated = False
         if (
             is_new
             and self.roll_number is None
             and self.class_level_id
             and self.academic_year_id
         ):
-            max_roll = (
-                StudentEnrollment.objects.filter(
-                    class_level=self.class_level, academic_year=self.academic_year
-                ).aggregate(Max("roll_number"))
-            ).get("roll_number__max") or 0
-            self.roll_number = max_roll + 1
+            self.roll_number = RollNumberCounter.allocate(self.class_level_id, self.academic_year_id)
+            allocated = True
 
         super().save(*args, **kwargs)
 
+        if not allocated and self.roll_number and self.class_level_id and self.academic_year_id:
+            RollNumberCounter.bump_to(self.class_level_id, self.academic_year_id, self.roll_number)
+
         if is_new and self.roll_number and self.student_id:
             StudentProfile.objects.filter(pk=self.student_id).update(roll_number=self.roll_number)
 
@@ -337,3 +341,125 @@ class StudentEnrollment(models.Model):
 
         if errors:
             raise ValidationError(errors)
+
+
+class RollNumberCounter(models.Model):
+    """
+    Last roll number handed out per class/year. Rows are locked while allocating, so
+    concurrent admissions never read the same value, and a block of numbers for a bulk
+    enrollment costs one locked read and one update.
+    """
+
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name="roll_counters")
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="roll_counters")
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("class_level", "academic_year")
+
+    def __str__(self):
+        return f"{self.class_level} ({self.academic_year}): {self.last_value}"
+
+    @staticmethod
+    def _current_max(class_level_id, academic_year_id):
+        return (
+            StudentEnrollment.objects.filter(class_level_id=class_level_id, academic_year_id=academic_year_id)
+            .aggregate(Max("roll_number"))
+            .get("roll_number__max")
+        ) or 0
+
+    @classmethod
+    def lock(cls, class_level_id, academic_year_id):
+        """
+        Return the counter row locked for update, creating it from the current max roll.
+        Must be called inside a transaction.
+        """
+        counter, _ = cls.objects.select_for_update().get_or_create(
+            class_level_id=class_level_id,
+            academic_year_id=academic_year_id,
+            defaults={"last_value": cls._current_max(class_level_id, academic_year_id)},
+        )
+        return counter
+
+    @classmethod
+    def allocate(cls, class_level_id, academic_year_id, count=1):
+        """
+        Reserve ``count`` consecutive roll numbers and return the first one.
+        """
+        with transaction.atomic():
+            counter = cls.lock(class_level_id, academic_year_id)
+            first = counter.last_value + 1
+            cls.objects.filter(pk=counter.pk).update(last_value=F("last_value") + count)
+        return first
+
+    @classmethod
+    def peek(cls, class_level_id, academic_year_id):
+        """
+        Return the next roll number without reserving it (for previews).
+        """
+        last_value = (
+            cls.objects.filter(class_level_id=class_level_id, academic_year_id=academic_year_id)
+            .values_list("last_value", flat=True)
+            .first()
+        )
+        if last_value is None:
+            last_value = cls._current_max(class_level_id, academic_year_id)
+        return last_value + 1
+
+    @classmethod
+    def bump_to(cls, class_level_id, academic_year_id, value):
+        """
+        Make sure numbers assigned by hand are never handed out again.
+        """
+        cls.objects.filter(
+            class_level_id=class_level_id, academic_year_id=academic_year_id, last_value__lt=value
+        ).update(last_value=value)
+
+
+class RolloverCheckpoint(models.Model):
+    """
+    Records that a class was rolled over into a target year so a crashed rollover resumes
+    with the classes it had not finished.
+    """
+
+    STATUS_CHOICES = [
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name="rollover_checkpoints")
+    target_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="rollover_checkpoints")
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    duration_seconds = models.FloatField(default=0)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    class Meta:
+        unique_together = ("class_level", "target_year")
+        ordering = ["target_year", "class_level"]
+
+    def __str__(self):
+        return f"{self.class_level} -> {self.target_year}: {self.get_status_display()}"
+
+
+class EnrollmentRollup(models.Model):
+    """
+    Enrollment count per class/year/status, kept current by academics.rollups so
+    dashboards read class sizes from one indexed table instead of counting rows.
+    """
+
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name="enrollment_rollups")
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="enrollment_rollups")
+    status = models.CharField(max_length=12, choices=StudentEnrollment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    class Meta:
+        unique_together = ("class_level", "academic_year", "status")
+        ordering = ["academic_year", "class_level", "status"]
+
+    def __str__(self):
+        return f"{self.class_level} ({self.academic_year}) {self.status}: {self.count}"
@@ -0,0 +1,148 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+
+from academics.models import AcademicYear, ClassLevel, RolloverCheckpoint, StudentEnrollment
+from academics.services import next_class_name, promote_enrollments, resolve_target_class
+
+DEFAULT_ROLLOVER_WORKERS = 4
+
+
+@dataclass
+class ClassRollover:
+    source_class: ClassLevel
+    target_class: Optional[ClassLevel] = None
+    status: str = "pending"
+    created: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    message: str = ""
+    created_enrollments: List[StudentEnrollment] = field(default_factory=list)
+
+
+def plan_rollover(source_year: AcademicYear, target_year: AcademicYear, resume: bool = True) -> List[ClassRollover]:
+    """
+    Pair every class of ``source_year`` with its next class in ``target_year``.
+
+    Classes with no next class (the final class) are marked "graduating", classes whose
+    target is missing are marked "missing", and classes already checkpointed as done for
+    ``target_year`` are marked "done" when ``resume`` is set.
+    """
+    if source_year.pk == target_year.pk:
+        raise ValidationError("Pick a source year other than the target year.")
+
+    done_ids = set()
+    if resume:
+        done_ids = set(
+            RolloverCheckpoint.objects.filter(target_year=target_year, status="done").values_list(
+                "class_level_id", flat=True
+            )
+        )
+
+    plan = []
+    for source_class in ClassLevel.objects.filter(academic_year=source_year).select_related("academic_year"):
+        item = ClassRollover(source_class=source_class)
+        if source_class.pk in done_ids:
+            item.status = "done"
+            item.message = "Already rolled over (checkpoint)."
+        elif not next_class_name(source_class):
+            item.status = "graduating"
+            item.message = "Final class; no next class to promote into."
+        else:
+            item.target_class = resolve_target_class(source_class, target_year)
+            if not item.target_class:
+                item.status = "missing"
+                item.message = f"Create '{next_class_name(source_class)}' for {target_year} (matching section)."
+        plan.append(item)
+    return plan
+
+
+def _promote_class(item: ClassRollover, target_year: AcademicYear, dry_run: bool) -> ClassRollover:
+    started = time.perf_counter()
+    try:
+        enrollments = StudentEnrollment.objects.filter(class_level=item.source_class, status="current")
+        with transaction.atomic():
+            result = promote_enrollments(enrollments, target_year=target_year, dry_run=dry_run)
+            item.seconds = time.perf_counter() - started
+            if not dry_run:
+                RolloverCheckpoint.objects.update_or_create(
+                    class_level=item.source_class,
+                    target_year=target_year,
+                    defaults={
+                        "status": "done",
+                        "created_count": result["created"],
+                        "skipped_count": result["skipped"],
+                        "duration_seconds": item.seconds,
+                        "message": "",
+                    },
+                )
+        item.status = "promoted"
+        item.created = result["created"]
+        item.skipped = result["skipped"]
+        item.created_enrollments = result["created_enrollments"]
+    except (ValidationError, DatabaseError) as exc:
+        # IntegrityError/OperationalError (a lost race, a deadlock, a dropped connection)
+        # fail this class only; its transaction is rolled back and the others carry on.
+        item.seconds = time.perf_counter() - started
+        item.status = "failed"
+        item.message = "; ".join(exc.messages) if isinstance(exc, ValidationError) else f"{type(exc).__name__}: {exc}"
+        if not dry_run:
+            try:
+                RolloverCheckpoint.objects.update_or_create(
+                    class_level=item.source_class,
+                    target_year=target_year,
+                    defaults={"status": "failed", "duration_seconds": item.seconds, "message": item.message},
+                )
+            except DatabaseError as checkpoint_exc:
+                item.message = f"{item.message} (checkpoint not saved: {checkpoint_exc})"
+    return item
+
+
+def _promote_class_in_worker(item: ClassRollover, target_year: AcademicYear, dry_run: bool) -> ClassRollover:
+    # Each worker thread opens its own connection; close it so the pool does not leak them.
+    close_old_connections()
+    try:
+        return _promote_class(item, target_year, dry_run)
+    finally:
+        connections.close_all()
+
+
+def run_rollover(
+    source_year: AcademicYear,
+    target_year: AcademicYear,
+    workers: int = DEFAULT_ROLLOVER_WORKERS,
+    dry_run: bool = False,
+    resume: bool = True,
+    on_progress: Optional[Callable[[ClassRollover], None]] = None,
+) -> List[ClassRollover]:
+    """
+    Promote every class of ``source_year`` into ``target_year``.
+
+    Classes are independent, so each one runs in its own transaction on a worker thread
+    (with its own database connection). A checkpoint row is written in the same
+    transaction as each class's promotion, so rerunning after a crash skips finished
+    classes; a class whose promotion raises is checkpointed as "failed" with the error.
+    Returns the plan with per-class status, counts and timings.
+    """
+    plan = plan_rollover(source_year, target_year, resume=resume)
+    runnable = [item for item in plan if item.target_class is not None]
+
+    if workers <= 1 or connection.vendor == "sqlite":
+        # SQLite allows a single writer, so parallel promotions would only trade lock errors.
+        for item in runnable:
+            _promote_class(item, target_year, dry_run)
+            if on_progress:
+                on_progress(item)
+        return plan
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_promote_class_in_worker, item, target_year, dry_run) for item in runnable]
+        for future in as_completed(futures):
+            item = future.result()
+            if on_progress:
+                on_progress(item)
+    return plan
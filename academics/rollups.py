@@ -0,0 +1,92 @@
+from collections import Counter
+from typing import Iterable, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from academics.models import ClassLevel, EnrollmentRollup, StudentEnrollment
+from cems.fragments import bump_fragment_versions
+
+RollupKey = Tuple[int, int, str]
+
+
+def rollup_key(enrollment) -> RollupKey:
+    return (enrollment.class_level_id, enrollment.academic_year_id, enrollment.status)
+
+
+def adjust_enrollment_rollups(deltas):
+    """
+    Apply {(class_level_id, academic_year_id, status): delta} to the rollup table.
+
+    Used by the enrollment signals and by bulk paths (promotions, onboarding) that skip
+    save()/delete(). Negative deltas for missing rows are dropped; rebuild_enrollment_rollups
+    repairs any drift.
+    """
+    deltas = Counter(deltas)
+    bump_fragment_versions("class", [class_level_id for class_level_id, _, _ in deltas])
+    for (class_level_id, academic_year_id, status), delta in deltas.items():
+        if not delta or not class_level_id or not academic_year_id:
+            continue
+        key = {"class_level_id": class_level_id, "academic_year_id": academic_year_id, "status": status}
+        updated = EnrollmentRollup.objects.filter(**key).update(count=F("count") + delta)
+        if not updated and delta > 0:
+            with transaction.atomic():
+                EnrollmentRollup.objects.get_or_create(**key)
+                EnrollmentRollup.objects.filter(**key).update(count=F("count") + delta)
+
+
+def count_keys(keys: Iterable[RollupKey], sign: int = 1) -> Counter:
+    deltas = Counter()
+    for key in keys:
+        deltas[key] += sign
+    return deltas
+
+
+@transaction.atomic
+def rebuild_enrollment_rollups() -> int:
+    """
+    Recount every class/year/status from StudentEnrollment and replace the rollup table.
+    Returns the number of rollup rows written.
+    """
+    EnrollmentRollup.objects.all().delete()
+    bump_fragment_versions("class", ClassLevel.objects.values_list("pk", flat=True))
+    rows = (
+        StudentEnrollment.objects.order_by()
+        .values("class_level_id", "academic_year_id", "status")
+        .annotate(total=Count("id"))
+    )
+    rollups = EnrollmentRollup.objects.bulk_create(
+        [
+            EnrollmentRollup(
+                class_level_id=row["class_level_id"],
+                academic_year_id=row["academic_year_id"],
+                status=row["status"],
+                count=row["total"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+    return len(rollups)
+
+
+def class_student_counts(class_levels) -> dict:
+    """
+    Enrollment totals (all statuses) for each class within its own academic year, from
+    one query on the rollup table. Returns {class_level_id: count}.
+    """
+    class_levels = list(class_levels)
+    if not class_levels:
+        return {}
+    rows = (
+        EnrollmentRollup.objects.filter(class_level_id__in=[cls.id for cls in class_levels])
+        .values("class_level_id", "academic_year_id")
+        .annotate(total=Sum("count"))
+        .order_by()
+    )
+    year_by_class = {cls.id: cls.academic_year_id for cls in class_levels}
+    return {
+        row["class_level_id"]: row["total"]
+        for row in rows
+        if year_by_class.get(row["class_level_id"]) == row["academic_year_id"]
+    }
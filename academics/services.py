@@ -2,11 +2,17 @@ from datetime import date
 from typing import Iterable, Optional
 
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
 
+from accounts.dashboard import invalidate_class_dashboards, invalidate_student_dashboards
+from accounts.models import StudentProfile
+from academics.rollups import adjust_enrollment_rollups, count_keys, rollup_key
 from academics.models import (
     AcademicYear,
     ClassLevel,
+    RollNumberCounter,
     StudentEnrollment,
     ALLOWED_CLASS_NUMBERS,
     normalize_class_name,
@@ -54,29 +60,50 @@ def _validate_target_year(target_year: AcademicYear):
         raise ValidationError("Cannot promote students into a past academic year.")
 
 
+def _source_queryset(enrollments):
+    if isinstance(enrollments, QuerySet):
+        return StudentEnrollment.objects.filter(pk__in=enrollments.values("pk"))
+    return StudentEnrollment.objects.filter(pk__in=[e.pk for e in enrollments])
+
+
 @transaction.atomic
 def promote_enrollments(
     enrollments: Iterable[StudentEnrollment],
     target_year: AcademicYear,
+    dry_run: bool = False,
 ):
     """
     Promote a set of enrollments to the next class within the given target academic year.
 
-    Returns a dict with counts and the resolved target class.
+    The work is set-based: sources are loaded in one query, students already placed in the
+    target class are found in one query, new enrollments are inserted with one bulk insert
+    (roll numbers reserved as one contiguous block from the class counter), profile roll numbers are synced with
+    one bulk update and source statuses are flipped with one UPDATE.
+
+    With ``dry_run=True`` nothing is written; the returned lists show what would happen.
+
+    Returns a dict with counts, the resolved target class, ``created_enrollments`` (new,
+    unsaved when dry-running) and ``skipped_enrollments`` (sources already placed).
     """
     _validate_target_year(target_year)
 
-    enrollment_list = list(enrollments)
-    if not enrollment_list:
-        return {"created": 0, "skipped": 0, "target_class": None}
-
-    enrollment_list = list(
-        StudentEnrollment.objects.filter(pk__in=[e.pk for e in enrollment_list]).select_related(
-            "class_level", "academic_year", "student", "class_level__academic_year"
-        )
+    sources = list(
+        _source_queryset(enrollments)
+        .select_related("class_level", "student__user")
+        .order_by("roll_number", "student_id")
     )
-    source_class = enrollment_list[0].class_level
-    if any(enr.class_level_id != source_class.id for enr in enrollment_list):
+    if not sources:
+        return {
+            "created": 0,
+            "skipped": 0,
+            "target_class": None,
+            "created_enrollments": [],
+            "skipped_enrollments": [],
+            "dry_run": dry_run,
+        }
+
+    source_class = sources[0].class_level
+    if any(enr.class_level_id != source_class.id for enr in sources):
         raise ValidationError("Promotions must target a single class at a time.")
 
     if source_class.academic_year_id == target_year.id:
@@ -89,25 +116,119 @@ def promote_enrollments(
             f"Create '{next_name}' for {target_year} (matching section) before running a promotion."
         )
 
-    created = 0
-    skipped = 0
-    for enrollment in enrollment_list:
-        _, created_flag = StudentEnrollment.objects.get_or_create(
+    already_placed = set(
+        StudentEnrollment.objects.filter(
+            class_level=target_class,
+            academic_year=target_year,
+            student_id__in=[enr.student_id for enr in sources],
+        ).values_list("student_id", flat=True)
+    )
+
+    to_promote = []
+    skipped_enrollments = []
+    for enrollment in sources:
+        if enrollment.student_id in already_placed:
+            skipped_enrollments.append(enrollment)
+        else:
+            already_placed.add(enrollment.student_id)
+            to_promote.append(enrollment)
+
+    if not to_promote:
+        first_roll = 1
+    elif dry_run:
+        first_roll = RollNumberCounter.peek(target_class.id, target_year.id)
+    else:
+        first_roll = RollNumberCounter.allocate(target_class.id, target_year.id, count=len(to_promote))
+    today = date.today()
+    created_enrollments = [
+        StudentEnrollment(
             student=enrollment.student,
             class_level=target_class,
             academic_year=target_year,
-            defaults={"status": "current", "enrolled_on": date.today()},
+            status="current",
+            enrolled_on=today,
+            roll_number=first_roll + offset,
         )
-        if created_flag:
-            created += 1
-            if enrollment.status != "promoted":
-                enrollment.status = "promoted"
-                enrollment.save(update_fields=["status", "updated_at"])
-        else:
-            skipped += 1
+        for offset, enrollment in enumerate(to_promote)
+    ]
+
+    if not dry_run and created_enrollments:
+        try:
+            StudentEnrollment.objects.bulk_create(created_enrollments)
+        except IntegrityError:
+            # Every later step assumes each row went in; undo the whole promotion instead.
+            raise ValidationError(
+                f"Could not place every student in {target_class}: a roll number or enrollment was "
+                "taken concurrently. Nothing was promoted; run the promotion again."
+            )
+
+        students = []
+        for new in created_enrollments:
+            new.student.roll_number = new.roll_number
+            students.append(new.student)
+        StudentProfile.objects.bulk_update(students, ["roll_number"])
+
+        StudentEnrollment.objects.filter(pk__in=[enr.pk for enr in to_promote]).exclude(
+            status="promoted"
+        ).update(status="promoted", updated_at=timezone.now())
+
+        flipped = [enr for enr in to_promote if enr.status != "promoted"]
+        deltas = count_keys(rollup_key(new) for new in created_enrollments)
+        deltas.update(count_keys((rollup_key(enr) for enr in flipped), sign=-1))
+        deltas.update(count_keys((enr.class_level_id, enr.academic_year_id, "promoted") for enr in flipped))
+        adjust_enrollment_rollups(deltas)
+        invalidate_student_dashboards(enr.student_id for enr in to_promote)
 
     return {
-        "created": created,
-        "skipped": skipped,
+        "created": len(created_enrollments),
+        "skipped": len(skipped_enrollments),
         "target_class": target_class,
+        "created_enrollments": created_enrollments,
+        "skipped_enrollments": skipped_enrollments,
+        "dry_run": dry_run,
     }
+
+
+RESEQUENCE_ORDERINGS = {
+    "name": ("student__user__last_name", "student__user__first_name", "student__user__username", "student_id"),
+    "student_id": ("student__student_id", "student_id"),
+}
+
+
+@transaction.atomic
+def resequence_roll_numbers(class_level: ClassLevel, order: str = "name") -> int:
+    """
+    Renumber every enrollment of a class/year as 1..n, ordered by student name or student_id,
+    and sync ``StudentProfile.roll_number`` for current enrollments in the same pass.
+
+    Rolls are cleared with one UPDATE and rewritten with one bulk update, because rewriting
+    them in place would trip the unique roll constraint while numbers are being swapped.
+    Returns the number of enrollments renumbered.
+    """
+    if order not in RESEQUENCE_ORDERINGS:
+        raise ValidationError(f"Unknown roll ordering '{order}'.")
+
+    # Hold the counter while renumbering so admissions wait for the new sequence.
+    counter = RollNumberCounter.lock(class_level.id, class_level.academic_year_id)
+    enrollments = StudentEnrollment.objects.filter(
+        class_level=class_level, academic_year_id=class_level.academic_year_id
+    )
+    rows = list(enrollments.order_by(*RESEQUENCE_ORDERINGS[order]).values_list("pk", "student_id", "status"))
+
+    now = timezone.now()
+    renumbered = [
+        StudentEnrollment(pk=pk, roll_number=index, updated_at=now) for index, (pk, _, _) in enumerate(rows, start=1)
+    ]
+    profiles = [
+        StudentProfile(pk=student_id, roll_number=index)
+        for index, (_, student_id, status) in enumerate(rows, start=1)
+        if status == "current"
+    ]
+
+    enrollments.update(roll_number=None)
+    StudentEnrollment.objects.bulk_update(renumbered, ["roll_number", "updated_at"])
+    StudentProfile.objects.bulk_update(profiles, ["roll_number"])
+    counter.last_value = len(rows)
+    counter.save(update_fields=["last_value"])
+    invalidate_class_dashboards(class_level.id, class_level.academic_year_id)
+    return len(rows)
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from academics.families import invalidate_year_families
+from academics.models import AcademicYear, ClassLevel, StudentEnrollment, Subject, TeacherAssignment
+from academics.rollups import adjust_enrollment_rollups
+from cems.fragments import bump_fragment_versions
+
+
+def _loaded_rollup_key(instance):
+    # Read from __dict__ so deferred fields are not fetched just to remember them.
+    values = instance.__dict__
+    key = (values.get("class_level_id"), values.get("academic_year_id"), values.get("status"))
+    return key if all(key) else None
+
+
+@receiver(post_init, sender=StudentEnrollment)
+def remember_enrollment_rollup_key(sender, instance, **kwargs):
+    instance._rollup_key = _loaded_rollup_key(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=StudentEnrollment)
+def update_rollups_on_enrollment_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._rollup_key
+    current = _loaded_rollup_key(instance)
+    if previous != current:
+        deltas = {}
+        if previous:
+            deltas[previous] = -1
+        if current:
+            deltas[current] = deltas.get(current, 0) + 1
+        adjust_enrollment_rollups(deltas)
+    instance._rollup_key = current
+
+
+@receiver(post_delete, sender=StudentEnrollment)
+def update_rollups_on_enrollment_delete(sender, instance, **kwargs):
+    key = instance._rollup_key or _loaded_rollup_key(instance)
+    if key:
+        adjust_enrollment_rollups({key: -1})
+
+
+@receiver(post_init, sender=ClassLevel)
+def remember_class_year(sender, instance, **kwargs):
+    instance._families_year_id = instance.__dict__.get("academic_year_id")
+
+
+@receiver(post_save, sender=ClassLevel)
+@receiver(post_delete, sender=ClassLevel)
+def invalidate_families_for_class(sender, instance, raw=False, **kwargs):
+    # A class moved to another year leaves both years' families stale.
+    if not raw:
+        invalidate_year_families([instance._families_year_id, instance.academic_year_id])
+    instance._families_year_id = instance.academic_year_id
+
+
+@receiver(post_init, sender=Subject)
+def remember_subject_class(sender, instance, **kwargs):
+    instance._families_class_id = instance.__dict__.get("class_level_id")
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_families_for_subject(sender, instance, raw=False, **kwargs):
+    if not raw:
+        class_ids = {instance._families_class_id, instance.class_level_id} - {None}
+        invalidate_year_families(
+            ClassLevel.objects.filter(pk__in=class_ids).values_list("academic_year_id", flat=True)
+        )
+        # The teacher dashboard lists subject names in its class rows.
+        bump_fragment_versions("class", class_ids)
+    instance._families_class_id = instance.class_level_id
+
+
+# Teacher dashboard class rows: name, section, year and assigned subjects (subject edits
+# and student counts are bumped with the families and the enrollment rollups).
+@receiver(post_save, sender=ClassLevel)
+@receiver(post_delete, sender=ClassLevel)
+@receiver(post_save, sender=TeacherAssignment)
+@receiver(post_delete, sender=TeacherAssignment)
+def bump_class_fragment_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_fragment_versions("class", [instance.pk if sender is ClassLevel else instance.class_level_id])
+
+
+@receiver(post_save, sender=AcademicYear)
+def bump_year_class_fragment_versions(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        bump_fragment_versions("class", ClassLevel.objects.filter(academic_year=instance).values_list("pk", flat=True))
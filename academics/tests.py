@@ -1,3 +1,238 @@
-from django.test import TestCase
+import threading
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Permission, User
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+
+from academics.models import AcademicYear, ClassLevel, RollNumberCounter, RolloverCheckpoint, StudentEnrollment
+from academics.exports import stream_csv
+from academics.rollover import run_rollover
+from academics.services import promote_enrollments, resequence_roll_numbers
+from accounts.models import StudentProfile
+
+
+def make_student(username, **extra):
+    return StudentProfile.objects.create(user=User.objects.create_user(username, **extra))
+
+
+class PromotionSetupMixin:
+    """A previous year with 'Class 1 - A' and three students, and a current year with 'Class 2 - A'."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.previous_year = AcademicYear.objects.create(
+            name="Previous", start_date=date(today.year - 1, 1, 1), is_current=True
+        )
+        cls.source_class = ClassLevel.objects.create(name="Class 1", section="A", academic_year=cls.previous_year)
+        cls.students = [make_student(f"pupil{index}") for index in range(3)]
+        # Students can only be admitted into the current year, so enroll before moving on.
+        cls.sources = [
+            StudentEnrollment.objects.create(student=student, class_level=cls.source_class, academic_year=cls.previous_year)
+            for student in cls.students
+        ]
+        cls.previous_year.is_current = False
+        cls.previous_year.save()
+        cls.target_year = AcademicYear.objects.create(name="Current", start_date=date(today.year, 1, 1), is_current=True)
+        cls.target_class = ClassLevel.objects.create(name="Class 2", section="A", academic_year=cls.target_year)
+
+
+class PromoteEnrollmentsTests(PromotionSetupMixin, TestCase):
+    def test_promotes_every_source(self):
+        result = promote_enrollments(self.sources, target_year=self.target_year)
+
+        self.assertEqual(result["created"], 3)
+        self.assertEqual(
+            sorted(StudentEnrollment.objects.filter(class_level=self.target_class).values_list("roll_number", flat=True)),
+            [1, 2, 3],
+        )
+        self.assertFalse(StudentEnrollment.objects.filter(pk__in=[enr.pk for enr in self.sources], status="current"))
+
+    def test_roll_conflict_promotes_nobody(self):
+        # A newcomer holds roll 1 while the counter has drifted back to 0.
+        newcomer = make_student("newcomer")
+        StudentEnrollment.objects.create(student=newcomer, class_level=self.target_class, academic_year=self.target_year)
+        RollNumberCounter.objects.filter(class_level=self.target_class).update(last_value=0)
+
+        with self.assertRaises(ValidationError):
+            promote_enrollments(self.sources, target_year=self.target_year)
+
+        self.assertEqual(StudentEnrollment.objects.filter(class_level=self.target_class).count(), 1)
+        self.assertEqual(
+            StudentEnrollment.objects.filter(pk__in=[enr.pk for enr in self.sources], status="current").count(), 3
+        )
+
+
+class RunRolloverTests(PromotionSetupMixin, TestCase):
+    def test_promotes_and_checkpoints(self):
+        (item,) = run_rollover(self.previous_year, self.target_year)
+
+        self.assertEqual((item.status, item.created), ("promoted", 3))
+        self.assertEqual(RolloverCheckpoint.objects.get(class_level=self.source_class).status, "done")
+
+    def test_database_error_fails_the_class_with_a_checkpoint(self):
+        with mock.patch("academics.rollover.promote_enrollments", side_effect=OperationalError("deadlock detected")):
+            (item,) = run_rollover(self.previous_year, self.target_year)
+
+        self.assertEqual(item.status, "failed")
+        self.assertIn("deadlock detected", item.message)
+        checkpoint = RolloverCheckpoint.objects.get(class_level=self.source_class, target_year=self.target_year)
+        self.assertEqual(checkpoint.status, "failed")
+        self.assertIn("OperationalError", checkpoint.message)
+        self.assertFalse(StudentEnrollment.objects.filter(class_level=self.target_class).exists())
+
+    def test_failed_class_is_retried_on_the_next_run(self):
+        with mock.patch("academics.rollover.promote_enrollments", side_effect=OperationalError("deadlock detected")):
+            run_rollover(self.previous_year, self.target_year)
+
+        (item,) = run_rollover(self.previous_year, self.target_year)
+
+        self.assertEqual((item.status, item.created), ("promoted", 3))
+
+    def test_admin_action_only_plans(self):
+        self.client.force_login(User.objects.create_superuser("root"))
+
+        response = self.client.post(
+            reverse("admin:academics_academicyear_changelist"),
+            {"action": "rollover_into_current_year", "_selected_action": [self.previous_year.pk]},
+            follow=True,
+        )
+
+        self.assertContains(response, "1 classes ready to promote")
+        self.assertContains(response, "rollover_year")
+        self.assertFalse(StudentEnrollment.objects.filter(class_level=self.target_class).exists())
+
+
+def make_roll_class():
+    year = AcademicYear.objects.create(name="Current", start_date=date(date.today().year, 1, 1), is_current=True)
+    return ClassLevel.objects.create(name="Class 3", section="A", academic_year=year)
+
+
+class RollNumberCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_level = make_roll_class()
+        cls.key = (cls.class_level.pk, cls.class_level.academic_year_id)
+
+    def enroll(self, username, last_name="", **fields):
+        return StudentEnrollment.objects.create(
+            student=make_student(username, last_name=last_name),
+            class_level=self.class_level,
+            academic_year=self.class_level.academic_year,
+            **fields,
+        )
+
+    def test_allocations_never_repeat(self):
+        first = RollNumberCounter.allocate(*self.key)
+        block = RollNumberCounter.allocate(*self.key, count=3)
+        last = RollNumberCounter.allocate(*self.key)
+
+        self.assertEqual((first, block, last), (1, 2, 5))
+        self.assertEqual(RollNumberCounter.peek(*self.key), 6)
+
+    def test_counter_starts_from_rolls_already_taken(self):
+        self.enroll("pupil0", roll_number=7)
+        RollNumberCounter.objects.all().delete()
+
+        self.assertEqual(RollNumberCounter.lock(*self.key).last_value, 7)
+        self.assertEqual(RollNumberCounter.allocate(*self.key), 8)
+
+    def test_rolls_set_by_hand_are_not_handed_out_again(self):
+        self.enroll("pupil0")
+        self.enroll("pupil1", roll_number=10)
+        RollNumberCounter.bump_to(*self.key, 4)
+
+        self.assertEqual(self.enroll("pupil2").roll_number, 11)
+
+    def test_resequence_numbers_the_class_from_one(self):
+        for username, last_name, roll in (("pupil0", "Young", 3), ("pupil1", "Adams", 9), ("pupil2", "Moss", 14)):
+            self.enroll(username, last_name=last_name, roll_number=roll)
+
+        self.assertEqual(resequence_roll_numbers(self.class_level, order="name"), 3)
+
+        rolls = dict(
+            StudentEnrollment.objects.filter(class_level=self.class_level).values_list(
+                "student__user__username", "roll_number"
+            )
+        )
+        self.assertEqual(rolls, {"pupil1": 1, "pupil2": 2, "pupil0": 3})
+        self.assertEqual(dict(StudentProfile.objects.values_list("user__username", "roll_number")), rolls)
+        self.assertEqual(RollNumberCounter.allocate(*self.key), 4)
+
+    def test_resequence_by_student_id(self):
+        for username in ("pupil0", "pupil1", "pupil2"):
+            self.enroll(username)
+        StudentEnrollment.objects.filter(student__user__username="pupil0").update(roll_number=20)
+
+        resequence_roll_numbers(self.class_level, order="student_id")
+
+        self.assertEqual(
+            list(
+                StudentEnrollment.objects.filter(class_level=self.class_level)
+                .order_by("student__student_id")
+                .values_list("roll_number", flat=True)
+            ),
+            [1, 2, 3],
+        )
+
+    def test_resequence_actions_need_enrollment_change_permission(self):
+        user = User.objects.create_user("clerk", is_staff=True)
+        user.user_permissions.add(Permission.objects.get(codename="change_classlevel"))
+        model_admin = admin.site._registry[ClassLevel]
+        resequence_actions = {"resequence_rolls_by_name", "resequence_rolls_by_student_id"}
+
+        def actions():
+            request = RequestFactory().get("/")
+            request.user = User.objects.get(pk=user.pk)
+            return set(model_admin.get_actions(request))
+
+        self.assertFalse(actions() & resequence_actions)
+        user.user_permissions.add(Permission.objects.get(codename="change_studentenrollment"))
+        self.assertLessEqual(resequence_actions, actions())
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class RollNumberCounterLockingTests(TransactionTestCase):
+    def test_concurrent_allocations_get_different_numbers(self):
+        class_level = make_roll_class()
+        key = (class_level.pk, class_level.academic_year_id)
+        RollNumberCounter.objects.create(class_level=class_level, academic_year=class_level.academic_year)
+        numbers = []
+        start = threading.Barrier(4)
+
+        def admit():
+            try:
+                start.wait(10)
+                for _ in range(5):
+                    numbers.append(RollNumberCounter.allocate(*key))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=admit) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(numbers), list(range(1, 21)))
+
+
+class StreamCsvTests(SimpleTestCase):
+    def test_streams_header_and_rows(self):
+        response = stream_csv("roster.csv", ["Roll", "Name"], iter([(1, "Ann"), (2, "Bo, Jr.")]))
+
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="roster.csv"')
+        self.assertEqual(b"".join(response.streaming_content), b'Roll,Name\r\n1,Ann\r\n2,"Bo, Jr."\r\n')
+
+    def test_filename_is_escaped(self):
+        response = stream_csv('Class 5 "A" – résultats.csv', ["Roll"], iter([]))
+
+        self.assertEqual(
+            response["Content-Disposition"],
+            "attachment; filename*=utf-8''Class%205%20%22A%22%20%E2%80%93%20r%C3%A9sultats.csv",
+        )
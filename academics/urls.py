@@ -1,10 +1,26 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = "academics"
 
 urlpatterns = [
-    path("teacher/dashboard/", views.teacher_dashboard, name="teacher_dashboard"),
+    path(
+        "teacher/dashboard/",
+        views.teacher_dashboard_async if settings.ASYNC_DASHBOARDS else views.teacher_dashboard,
+        name="teacher_dashboard",
+    ),
     path("teacher/classes/<int:class_id>/students/", views.teacher_class_students, name="teacher_class_students"),
+    path(
+        "teacher/classes/<int:class_id>/students/export/",
+        views.teacher_class_students_export,
+        name="teacher_class_students_export",
+    ),
     path("teacher/classes/<int:class_id>/subjects/", views.teacher_class_subjects, name="teacher_class_subjects"),
+    path("api/teacher/assignments/", views.api_teacher_assignments, name="api_teacher_assignments"),
+    path(
+        "api/teacher/classes/<int:class_id>/students/",
+        views.api_teacher_class_students,
+        name="api_teacher_class_students",
+    ),
 ]
@@ -1,22 +1,56 @@
 from collections import defaultdict
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Avg, Max, Min
+from django.db.models import Count, Max
 from django.shortcuts import render, redirect
 
-from academics.models import TeacherAssignment, StudentEnrollment
+from academics.exports import ENROLLMENT_EXPORT_COLUMNS, stream_queryset_csv
+from academics.models import ClassLevel, TeacherAssignment, StudentEnrollment
+from academics.rollups import class_student_counts
+from accounts.roles import request_teacher
+from cems.api import ApiError, api_view, keyset_page
+from cems.concurrency import gather_queries
+from cems.conditional import conditional_page, latest, page_etag
+from cems.fragments import fragment_cached, fragment_timeout, fragment_vary, fragment_versions
+from cems.routers import replica_reads
 from exams.models import Exam
+from exams.statistics import ensure_exam_statistics
+
+# (field, lookup) pairs the teacher API can return; ?fields= picks a subset.
+ASSIGNMENT_API_FIELDS = (
+    ("id", "pk"),
+    ("academic_year", "academic_year__name"),
+    ("class_level", "class_level_id"),
+    ("class_name", "class_level__name"),
+    ("section", "class_level__section"),
+    ("subject", "subject_id"),
+    ("subject_name", "subject__name"),
+    ("subject_code", "subject__code"),
+)
+
+ROSTER_API_FIELDS = (
+    ("id", "pk"),
+    ("roll_number", "roll_number"),
+    ("student", "student_id"),
+    ("student_id", "student__student_id"),
+    ("username", "student__user__username"),
+    ("first_name", "student__user__first_name"),
+    ("last_name", "student__user__last_name"),
+    ("status", "status"),
+    ("enrolled_on", "enrolled_on"),
+)
 
 
 def _get_teacher(request):
-    return getattr(request.user, "teacher_profile", None)
+    return request_teacher(request)
 
 
 def _teacher_assignments(teacher):
     assignments = (
         TeacherAssignment.objects.filter(teacher=teacher)
-        .select_related("class_level", "subject", "academic_year")
+        .select_related("class_level__academic_year", "subject", "academic_year")
         .order_by("class_level__name", "subject__name")
     )
     class_map = {}
@@ -31,53 +65,127 @@ def _redirect_dashboard():
     return redirect("academics:teacher_dashboard")
 
 
-@login_required
-def teacher_dashboard(request):
-    teacher = _get_teacher(request)
-    if not teacher:
-        return redirect("accounts:role_redirect")
-
-    assignments, class_map, subjects_by_class = _teacher_assignments(teacher)
-    assigned_classes = list(class_map.values())
-    class_rows = []
-    for cls in assigned_classes:
-        student_total = StudentEnrollment.objects.filter(
-            class_level=cls, academic_year=cls.academic_year
-        ).count()
-        class_rows.append(
-            {"class_level": cls, "subjects": subjects_by_class.get(cls.id, []), "student_count": student_total}
-        )
-
-    if request.method == "POST":
-        messages.error(request, "Teachers cannot admit or enroll students into classes.")
-        return _redirect_dashboard()
-
-    teacher_exams = (
+def _teacher_exams(teacher):
+    return list(
         Exam.objects.filter(assigned_teacher=teacher)
-        .select_related("class_level", "subject", "academic_year")
-        .annotate(
-            result_count=Count("results"),
-            highest=Max("results__marks_obtained"),
-            lowest=Min("results__marks_obtained"),
-            average=Avg("results__marks_obtained"),
-        )
+        .select_related("class_level__academic_year", "subject", "academic_year")
         .order_by("-exam_date", "title")
     )
 
-    context = {
+
+def _teacher_exam_keys(teacher):
+    """(exam id, class id) of the teacher's exams in table order; enough to key the exam table."""
+    return list(
+        Exam.objects.filter(assigned_teacher=teacher).order_by("-exam_date", "title").values_list("pk", "class_level_id")
+    )
+
+
+@replica_reads(False)
+def _load_class_rows(assignment_data):
+    _, class_map, subjects_by_class = assignment_data
+    student_counts = class_student_counts(class_map.values())
+    return [
+        {
+            "class_level": cls,
+            "subjects": subjects_by_class.get(cls.id, []),
+            "student_count": student_counts.get(cls.id, 0),
+        }
+        for cls in class_map.values()
+    ]
+
+
+@replica_reads(False)
+def _load_exam_rows(teacher):
+    teacher_exams = _teacher_exams(teacher)
+    stats_by_exam = ensure_exam_statistics(teacher_exams)
+    for exam in teacher_exams:
+        exam.stats = stats_by_exam.get(exam.pk)
+    return teacher_exams
+
+
+def _dashboard_fragments(teacher, class_ids, exam_keys):
+    """
+    Vary-on values of the two cached tables: the teacher's classes and exams with their
+    current versions. Only a change to one of those objects re-renders a table, and only
+    for teachers whose dashboard lists it.
+    """
+    class_versions = fragment_versions("class", set(class_ids) | {class_id for _, class_id in exam_keys})
+    exam_versions = fragment_versions("exam", [pk for pk, _ in exam_keys])
+    return {
+        "classes": fragment_vary(teacher.pk, [(pk, class_versions[pk]) for pk in class_ids]),
+        "exams": fragment_vary(
+            teacher.pk, [(pk, exam_versions[pk], class_versions[class_id]) for pk, class_id in exam_keys]
+        ),
+    }
+
+
+def _teacher_dashboard_context(teacher, assignment_data, exam_keys):
+    """
+    The class and exam rows are loaders, not lists: the template calls them only while
+    rendering a {% cache %} block that missed, so a cached table costs no query.
+    """
+    assignments, class_map, subjects_by_class = assignment_data
+    assigned_classes = list(class_map.values())
+    fragments = _dashboard_fragments(teacher, list(class_map), exam_keys)
+    return {
         "teacher": teacher,
         "assigned_classes": assigned_classes,
-        "class_rows": class_rows,
+        "class_rows": lambda: _load_class_rows(assignment_data),
         "subjects_by_class": subjects_by_class,
         "assignments": assignments,
-        "teacher_exams": teacher_exams,
+        "teacher_exams": lambda: _load_exam_rows(teacher),
         "class_count": len(assigned_classes),
         "subject_count": len(assignments),
-        "student_count": StudentEnrollment.objects.filter(class_level__in=assigned_classes).count(),
+        "exam_count": len(exam_keys),
+        "fragments": fragments,
+        "fragment_timeout": fragment_timeout(),
     }
+
+
+@login_required
+def teacher_dashboard(request):
+    teacher = _get_teacher(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    if request.method == "POST":
+        messages.error(request, "Teachers cannot admit or enroll students into classes.")
+        return _redirect_dashboard()
+
+    context = _teacher_dashboard_context(teacher, _teacher_assignments(teacher), _teacher_exam_keys(teacher))
     return render(request, "teacher_dashboard.html", context)
 
 
+@login_required
+async def teacher_dashboard_async(request):
+    """
+    teacher_dashboard for ASGI: assignments and exam keys are loaded together, then the
+    rows of whichever tables are not cached, together.
+    """
+    teacher = await sync_to_async(_get_teacher)(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    if request.method == "POST":
+        messages.error(request, "Teachers cannot admit or enroll students into classes.")
+        return _redirect_dashboard()
+
+    assignment_data, exam_keys = await gather_queries(
+        lambda: _teacher_assignments(teacher), lambda: _teacher_exam_keys(teacher)
+    )
+    context = await sync_to_async(_teacher_dashboard_context)(teacher, assignment_data, exam_keys)
+    cached = await sync_to_async(
+        lambda: {name: fragment_cached(f"teacher_dashboard_{name}", vary) for name, vary in context["fragments"].items()}
+    )()
+    # Prefetch the rows of missed tables concurrently; cached tables keep their loaders in
+    # case the fragment expires before it is rendered.
+    loaders = {"classes": "class_rows", "exams": "teacher_exams"}
+    missing = [name for name in loaders if not cached[name]]
+    rows = await gather_queries(*(context[loaders[name]] for name in missing))
+    context.update({loaders[name]: value for name, value in zip(missing, rows)})
+    return await sync_to_async(render)(request, "teacher_dashboard.html", context)
+
+
 @login_required
 def teacher_class_students(request, class_id):
     teacher = _get_teacher(request)
@@ -90,18 +198,47 @@ def teacher_class_students(request, class_id):
         messages.error(request, "You can only view your assigned classes.")
         return _redirect_dashboard()
 
-    enrollments = (
-        StudentEnrollment.objects.filter(class_level=class_level, academic_year=class_level.academic_year)
-        .select_related("student__user")
-        .order_by("roll_number", "student__user__username")
-    )
-    return render(
+    enrollments = StudentEnrollment.objects.filter(class_level=class_level, academic_year=class_level.academic_year)
+    # One aggregate decides whether the client's copy is current; a removed enrollment
+    # shows up in the count, anything edited in the latest updated_at.
+    stamp = enrollments.aggregate(count=Count("pk"), enrolled=Max("updated_at"), students=Max("student__updated_at"))
+    return conditional_page(
         request,
-        "teacher_class_students.html",
-        {"class_level": class_level, "enrollments": enrollments, "teacher": teacher},
+        page_etag(request, class_level.pk, class_level.updated_at, *stamp.values()),
+        latest(class_level.updated_at, stamp["enrolled"], stamp["students"]),
+        lambda: render(
+            request,
+            "teacher_class_students.html",
+            {
+                "class_level": class_level,
+                "enrollments": enrollments.select_related("student__user").order_by(
+                    "roll_number", "student__user__username"
+                ),
+                "teacher": teacher,
+            },
+        ),
     )
 
 
+@login_required
+def teacher_class_students_export(request, class_id):
+    teacher = _get_teacher(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    _, class_map, _ = _teacher_assignments(teacher)
+    class_level = class_map.get(int(class_id))
+    if not class_level:
+        messages.error(request, "You can only export your assigned classes.")
+        return _redirect_dashboard()
+
+    enrollments = StudentEnrollment.objects.filter(
+        class_level=class_level, academic_year=class_level.academic_year
+    ).order_by("roll_number", "student__user__username")
+    filename = f"{class_level.name}-{class_level.section or 'all'}-{class_level.academic_year}-students.csv"
+    return stream_queryset_csv(enrollments, filename.replace(" ", "_"), ENROLLMENT_EXPORT_COLUMNS)
+
+
 @login_required
 def teacher_class_subjects(request, class_id):
     teacher = _get_teacher(request)
@@ -123,3 +260,33 @@ def teacher_class_subjects(request, class_id):
             "teacher": teacher,
         },
     )
+
+
+def _api_teacher(request):
+    teacher = _get_teacher(request)
+    if not teacher:
+        raise ApiError("Teacher access required.", status=403)
+    return teacher
+
+
+@api_view
+def api_teacher_assignments(request):
+    """The signed-in teacher's class/subject assignments, newest academic year first."""
+    teacher = _api_teacher(request)
+    assignments = TeacherAssignment.objects.filter(teacher=teacher)
+    return keyset_page(request, assignments, ASSIGNMENT_API_FIELDS, ("-academic_year__start_date", "pk"))
+
+
+@api_view
+def api_teacher_class_students(request, class_id):
+    """Roster of an assigned class in roll-number order (students without a roll last)."""
+    teacher = _api_teacher(request)
+    academic_year_id = (
+        ClassLevel.objects.filter(pk=class_id, teacher_assignments__teacher=teacher)
+        .values_list("academic_year_id", flat=True)
+        .first()
+    )
+    if not academic_year_id:
+        raise ApiError("You can only view your assigned classes.", status=404)
+    enrollments = StudentEnrollment.objects.filter(class_level_id=class_id, academic_year_id=academic_year_id)
+    return keyset_page(request, enrollments, ROSTER_API_FIELDS, ("roll_number", "pk"))
@@ -1,5 +1,15 @@
+import io
+
 from django.contrib import admin
+from django.contrib.auth import get_permission_codename
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import TeacherProfile, StudentProfile
+from .onboarding import admin_onboard_max_rows, bulk_onboard, count_csv_rows
+from .search import SearchTextAdminMixin
+from cems.admin_base import CemsModelAdmin
 
 
 def all_model_fields(model_class):
@@ -7,12 +17,57 @@ def all_model_fields(model_class):
 
 
 @admin.register(TeacherProfile)
-class TeacherProfileAdmin(admin.ModelAdmin):
+class TeacherProfileAdmin(SearchTextAdminMixin, CemsModelAdmin):
     list_display = all_model_fields(TeacherProfile)
-    search_fields = ("employee_code", "user__username", "user__first_name", "user__last_name", "id")
+    search_fields = ("search_text__contains", "id")
 
-class StudentProfileAdmin(admin.ModelAdmin):
+class StudentProfileAdmin(SearchTextAdminMixin, CemsModelAdmin):
     list_display = all_model_fields(StudentProfile)
-    search_fields = ("student_id", "user__username", "roll_number", "id")
+    search_fields = ("search_text__contains", "roll_number", "id")
+
+    def get_urls(self):
+        urls = [
+            path(
+                "bulk-onboard/",
+                self.admin_site.admin_view(self.bulk_onboard_view),
+                name="accounts_studentprofile_bulk_onboard",
+            )
+        ]
+        return urls + super().get_urls()
+
+    def has_bulk_onboard_permission(self, request):
+        # Onboarding creates users and teacher profiles as well as student profiles.
+        return self.has_add_permission(request) and all(
+            request.user.has_perm(f"{model._meta.app_label}.{get_permission_codename('add', model._meta)}")
+            for model in (User, TeacherProfile)
+        )
+
+    def bulk_onboard_view(self, request):
+        if not self.has_bulk_onboard_permission(request):
+            raise PermissionDenied
+        report = None
+        error = None
+        max_rows = admin_onboard_max_rows()
+        upload = request.FILES.get("csv_file") if request.method == "POST" else None
+        if upload:
+            csv_file = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            rows = count_csv_rows(csv_file)
+            if rows > max_rows:
+                error = (
+                    f"The file has {rows} rows; uploads here are limited to {max_rows}. "
+                    "Run 'python manage.py bulk_onboard <file>' for larger files."
+                )
+            else:
+                # Hash in this process: a worker pool is for the management command, not a request.
+                report = bulk_onboard(csv_file, workers=0)
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Bulk onboarding",
+            "report": report,
+            "error": error,
+            "max_rows": max_rows,
+        }
+        return TemplateResponse(request, "admin/accounts/bulk_onboard.html", context)
 
 admin.site.register(StudentProfile, StudentProfileAdmin)
@@ -0,0 +1,75 @@
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from academics.models import AcademicYear
+from cems.routers import replica_reads
+from exams.models import Exam, ExamResult
+
+KEY_PREFIX = "landing_counters:"
+
+
+def cache_timeout():
+    return getattr(settings, "LANDING_COUNTERS_CACHE_SECONDS", 600)
+
+
+def _keys(today=None):
+    # The upcoming-exams key is per day, so it resets when exams slip into the past.
+    today = today or date.today()
+    return {
+        "active_years": f"{KEY_PREFIX}active_years",
+        "upcoming_exams": f"{KEY_PREFIX}upcoming_exams:{today.isoformat()}",
+        "published_results": f"{KEY_PREFIX}published_results",
+    }
+
+
+@replica_reads(False)
+def _recount(name, today):
+    if name == "active_years":
+        return AcademicYear.objects.filter(is_current=True).count()
+    if name == "upcoming_exams":
+        return Exam.objects.filter(exam_date__gte=today).count()
+    return ExamResult.objects.filter(published=True).count()
+
+
+def landing_counters() -> dict:
+    """
+    Landing-page figures from the cache; only counters missing from the cache (first hit,
+    TTL expiry, new day) are recounted.
+    """
+    today = date.today()
+    keys = _keys(today)
+    cached = cache.get_many(keys.values())
+    counters = {}
+    for name, key in keys.items():
+        if key in cached:
+            counters[name] = cached[key]
+        else:
+            counters[name] = _recount(name, today)
+            cache.add(key, counters[name], cache_timeout())
+    return counters
+
+
+def adjust_landing_counter(name: str, delta: int):
+    """
+    Apply ``delta`` to a cached counter after the current transaction commits. A counter
+    that is not cached is left alone; the next read recounts it.
+    """
+    if not delta:
+        return
+    key = _keys()[name]
+
+    def apply():
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(apply)
+
+
+def is_upcoming(exam_date: Optional[date]) -> bool:
+    return bool(exam_date) and exam_date >= date.today()
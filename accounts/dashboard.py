@@ -0,0 +1,232 @@
+import asyncio
+import uuid
+from datetime import date
+from typing import Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from academics.models import StudentEnrollment, Subject
+from accounts.models import StudentProfile
+from cems.concurrency import gather_queries
+from cems.routers import replica_reads
+from exams.models import Exam, ExamResult, MeritRank
+
+STUDENT_KEY = "student_dashboard:student:{}"
+CLASS_KEY = "student_dashboard:class:{}:{}"
+
+
+def cache_timeout():
+    return getattr(settings, "STUDENT_DASHBOARD_CACHE_SECONDS", 300)
+
+
+def _class_version(class_level_id, academic_year_id):
+    """
+    Current version token of a class/year. Class-wide changes (exams, bulk marks, ranks)
+    replace the token instead of finding and deleting every student's payload.
+    """
+    key = CLASS_KEY.format(class_level_id, academic_year_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    return version
+
+
+@replica_reads(False)
+def _student_enrollments(student: StudentProfile) -> list:
+    return list(
+        StudentEnrollment.objects.filter(student=student)
+        .select_related("class_level", "academic_year")
+        .order_by("-academic_year__start_date", "-created_at")
+    )
+
+
+def _current_enrollment(enrollments):
+    return next((enr for enr in enrollments if enr.status == "current"), None) or (
+        enrollments[0] if enrollments else None
+    )
+
+
+@replica_reads(False)
+def _class_subjects(enrollment) -> list:
+    return list(Subject.objects.filter(class_level_id=enrollment.class_level_id))
+
+
+@replica_reads(False)
+def _class_exams(enrollment) -> list:
+    return list(
+        Exam.objects.filter(class_level_id=enrollment.class_level_id, academic_year_id=enrollment.academic_year_id)
+        .select_related("subject")
+        .order_by("exam_date")
+    )
+
+
+@replica_reads(False)
+def _student_ranks(student: StudentProfile, enrollment) -> list:
+    return list(
+        MeritRank.objects.filter(
+            student=student, academic_year_id=enrollment.academic_year_id, class_level_id=enrollment.class_level_id
+        )
+    )
+
+
+@replica_reads(False)
+def _student_results(student: StudentProfile) -> list:
+    return list(
+        ExamResult.objects.filter(student=student).select_related(
+            "exam__subject", "exam__academic_year", "exam__class_level"
+        )
+    )
+
+
+def build_student_dashboard(enrollments, subjects, upcoming_exams, ranks, results) -> dict:
+    """Derive the dashboard payload from the five query results; no further queries."""
+    current_enrollment = _current_enrollment(enrollments)
+    current_class = current_enrollment.class_level if current_enrollment else None
+    current_year = current_enrollment.academic_year if current_enrollment else None
+
+    # Stable sorts reproduce the old ORDER BYs: newest year first, then exam title; and
+    # for the current year newest exam first. Undated years and exams come first, as
+    # PostgreSQL sorts NULLs in a descending order.
+    all_results = sorted(results, key=lambda res: res.exam.title)
+    all_results.sort(
+        key=lambda res: (res.exam.academic_year.start_date is None, res.exam.academic_year.start_date or date.min),
+        reverse=True,
+    )
+    current_results = sorted(
+        (
+            res
+            for res in all_results
+            if current_class
+            and res.exam.class_level_id == current_class.pk
+            and res.exam.academic_year_id == current_year.pk
+        ),
+        key=lambda res: res.exam.title,
+    )
+    current_results.sort(key=lambda res: res.exam.exam_date or date.max, reverse=True)
+
+    published_count = sum(1 for res in current_results if res.published)
+    # Positions are only shown for published marks; the overall position waits until
+    # every current result is published so it cannot reveal pending scores.
+    exam_ranks = {rank.exam_id: rank for rank in ranks if rank.scope == "exam"}
+    for result in current_results:
+        result.merit = exam_ranks.get(result.exam_id) if result.published else None
+    class_position = (
+        next((rank for rank in ranks if rank.scope == "class"), None)
+        if current_results and published_count == len(current_results)
+        else None
+    )
+
+    return {
+        "current_enrollment": current_enrollment,
+        "current_class": current_class,
+        "current_year": current_year,
+        "subjects": subjects,
+        "upcoming_exams": upcoming_exams,
+        "results": current_results,
+        "all_results": all_results,
+        "class_position": class_position,
+        "history_enrollments": [enr for enr in enrollments if enr is not current_enrollment],
+        "metrics": {
+            "upcoming": len(upcoming_exams),
+            "published": published_count,
+            "absences": sum(1 for res in current_results if res.attendance == "absent"),
+        },
+    }
+
+
+def load_student_dashboard(student: StudentProfile) -> dict:
+    """
+    Assemble the student dashboard in five queries (enrollments, subjects, class exams,
+    results, merit ranks); current-year results and all metrics are derived in Python.
+    """
+    enrollments = _student_enrollments(student)
+    current = _current_enrollment(enrollments)
+    subjects, exams, ranks = (
+        (_class_subjects(current), _class_exams(current), _student_ranks(student, current)) if current else ([], [], [])
+    )
+    return build_student_dashboard(enrollments, subjects, exams, ranks, _student_results(student))
+
+
+async def aload_student_dashboard(student: StudentProfile) -> dict:
+    """
+    load_student_dashboard with the independent queries in flight together: results
+    alongside enrollments, then subjects, exams and ranks of the current class at once.
+    Two round trips of latency instead of five.
+    """
+
+    async def class_side():
+        (enrollments,) = await gather_queries(lambda: _student_enrollments(student))
+        current = _current_enrollment(enrollments)
+        if not current:
+            return enrollments, [], [], []
+        subjects, exams, ranks = await gather_queries(
+            lambda: _class_subjects(current), lambda: _class_exams(current), lambda: _student_ranks(student, current)
+        )
+        return enrollments, subjects, exams, ranks
+
+    (enrollments, subjects, exams, ranks), (results,) = await asyncio.gather(
+        class_side(), gather_queries(lambda: _student_results(student))
+    )
+    return build_student_dashboard(enrollments, subjects, exams, ranks, results)
+
+
+def _cached_entry(student: StudentProfile):
+    entry = cache.get(STUDENT_KEY.format(student.pk))
+    if entry and (entry["class"] is None or _class_version(*entry["class"]) == entry["class_version"]):
+        return entry
+    return None
+
+
+def _store_payload(student: StudentProfile, payload: dict) -> dict:
+    enrollment = payload["current_enrollment"]
+    class_key = (enrollment.class_level_id, enrollment.academic_year_id) if enrollment else None
+    entry = {
+        "class": class_key,
+        "class_version": _class_version(*class_key) if class_key else None,
+        # Identifies this build for conditional GETs: it changes exactly when the entry is
+        # invalidated and rebuilt.
+        "version": uuid.uuid4().hex,
+        "built_at": timezone.now(),
+        "payload": payload,
+    }
+    cache.set(STUDENT_KEY.format(student.pk), entry, cache_timeout())
+    return entry
+
+
+def student_dashboard_entry(student: StudentProfile) -> dict:
+    """
+    Return the cached dashboard entry for ``student`` ({"payload", "version", "built_at",
+    ...}), rebuilding it when the student's own entry was invalidated or their current
+    class/year moved to a new version.
+    """
+    entry = _cached_entry(student)
+    if entry is None:
+        entry = _store_payload(student, load_student_dashboard(student))
+    return entry
+
+
+async def astudent_dashboard_entry(student: StudentProfile) -> dict:
+    entry = await sync_to_async(_cached_entry)(student)
+    if entry is None:
+        entry = await sync_to_async(_store_payload)(student, await aload_student_dashboard(student))
+    return entry
+
+
+def invalidate_student_dashboards(student_ids: Iterable[int]):
+    """Drop cached dashboards of these students once the current transaction commits."""
+    keys = [STUDENT_KEY.format(student_id) for student_id in set(student_ids) if student_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_class_dashboards(class_level_id: Optional[int], academic_year_id: Optional[int]):
+    """Expire every cached dashboard built for a class/year once the transaction commits."""
+    if class_level_id and academic_year_id:
+        key = CLASS_KEY.format(class_level_id, academic_year_id)
+        transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
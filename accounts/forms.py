@@ -1,5 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import PasswordResetForm
+from django.template import loader
+
+from notifications.outbox import enqueue_email
 
 
 class EmailExistsPasswordResetForm(PasswordResetForm):
@@ -13,3 +16,21 @@ class EmailExistsPasswordResetForm(PasswordResetForm):
         if not list(self.get_users(email)):
             raise forms.ValidationError("No account found with that email.")
         return email
+
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        """
+        Queue the reset email in the outbox instead of talking to the mail server
+        inside the request; the outbox worker delivers it.
+        """
+        subject = "".join(loader.render_to_string(subject_template_name, context).splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = loader.render_to_string(html_email_template_name, context) if html_email_template_name else ""
+        enqueue_email(to_email, subject, body, html_body=html_body, from_email=from_email)
@@ -0,0 +1,170 @@
+import asyncio
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from academics.models import TeacherAssignment
+from academics.views import teacher_dashboard, teacher_dashboard_async
+from accounts.dashboard import STUDENT_KEY
+from accounts.views import student_dashboard, student_dashboard_async
+from cems.fragments import VERSION_KEY
+from exams.models import Exam
+from exams.views import teacher_exam_results, teacher_exam_results_async
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the sync and async dashboards side by side with a simulated database round "
+        "trip added to every query and a simulated setup cost to every new connection. "
+        "Reads the current database; nothing is saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--student", help="Username of a student for the student dashboard.")
+        parser.add_argument("--teacher", help="Username of a teacher for the teacher dashboard and exam results.")
+        parser.add_argument("--exam", type=int, help="Exam id for the results page (default: the teacher's first exam).")
+        parser.add_argument("--latency-ms", type=float, default=5.0, help="Delay added to every query (default 5).")
+        parser.add_argument(
+            "--connect-ms",
+            type=float,
+            default=20.0,
+            help="Delay added to every new connection: TCP, TLS and authentication (default 20).",
+        )
+        parser.add_argument("--rounds", type=int, default=20, help="Requests per view and mode (default 20).")
+
+    def handle(self, *args, **options):
+        if not (options["student"] or options["teacher"]):
+            raise CommandError("Pass --student and/or --teacher.")
+        cases = []
+        if options["student"]:
+            user = self._user(options["student"])
+            student_id = getattr(getattr(user, "student_profile", None), "pk", None)
+            if not student_id:
+                raise CommandError(f"'{user.username}' has no student profile.")
+
+            def reset(key=STUDENT_KEY.format(student_id)):
+                # Time cache misses; a cached dashboard does not touch the database.
+                cache.delete(key)
+
+            cases.append(("student_dashboard", user, (), student_dashboard, student_dashboard_async, reset))
+        if options["teacher"]:
+            user = self._user(options["teacher"])
+            exams = Exam.objects.filter(assigned_teacher__user=user)
+            exam = exams.filter(pk=options["exam"]).first() if options["exam"] else exams.order_by("pk").first()
+            exam_ids = set(exams.values_list("pk", flat=True))
+            class_ids = set(exams.values_list("class_level_id", flat=True)) | set(
+                TeacherAssignment.objects.filter(teacher__user=user).values_list("class_level_id", flat=True)
+            )
+
+            def reset_fragments(
+                keys=[VERSION_KEY.format("class", pk) for pk in class_ids]
+                + [VERSION_KEY.format("exam", pk) for pk in exam_ids],
+            ):
+                # Time the tables being rendered: dropping the versions orphans the cached fragments.
+                cache.delete_many(keys)
+
+            cases.append(("teacher_dashboard", user, (), teacher_dashboard, teacher_dashboard_async, reset_fragments))
+            if exam:
+                cases.append(
+                    ("teacher_exam_results", user, (exam.pk,), teacher_exam_results, teacher_exam_results_async, None)
+                )
+
+        latency = options["latency_ms"] / 1000
+        connect_latency = options["connect_ms"] / 1000
+        rounds = options["rounds"]
+        opened = []
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        def on_connect(sender, connection, **kwargs):
+            # Sent once the connection is open, so this sleep stands in for its setup.
+            opened.append(connection.alias)
+            time.sleep(connect_latency)
+            add_delay(sender, connection)
+
+        for connection in connections.all():
+            add_delay(None, connection)
+        connection_created.connect(on_connect, weak=False, dispatch_uid="benchmark_dashboards_delay")
+        try:
+            self.stdout.write(
+                f"{options['latency_ms']:g} ms per query, {options['connect_ms']:g} ms per new connection, "
+                f"{rounds} requests each (median / mean ms, connections opened)"
+            )
+            for name, user, view_args, sync_view, async_view, reset in cases:
+                opened.clear()
+                sync_times = self._time_sync(sync_view, user, view_args, rounds, reset)
+                sync_opened = len(opened)
+                opened.clear()
+                async_times = asyncio.run(self._time_async(async_view, user, view_args, rounds, reset))
+                async_opened = len(opened)
+                speedup = statistics.median(sync_times) / statistics.median(async_times)
+                self.stdout.write(
+                    f"{name:<22} sync {statistics.median(sync_times):7.1f} / {statistics.mean(sync_times):7.1f}"
+                    f" {sync_opened:4}   async {statistics.median(async_times):7.1f} / "
+                    f"{statistics.mean(async_times):7.1f} {async_opened:4}   x{speedup:.2f}"
+                )
+        finally:
+            connection_created.disconnect(dispatch_uid="benchmark_dashboards_delay")
+            for connection in connections.all():
+                if delay in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(delay)
+
+    def _user(self, username):
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"User '{username}' does not exist.")
+
+    def _request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        request.session = SessionBase()
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    def _check(self, response):
+        if response.status_code != 200:
+            raise CommandError(f"View answered {response.status_code}; check the user's role and the exam.")
+
+    def _time_sync(self, view, user, view_args, rounds, reset):
+        timings = []
+        for _ in range(rounds):
+            if reset:
+                reset()
+            request = self._request(user)
+            started = time.perf_counter()
+            self._check(view(request, *view_args))
+            # What request_finished does: connections past CONN_MAX_AGE are closed.
+            close_old_connections()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    async def _time_async(self, view, user, view_args, rounds, reset):
+        timings = []
+        for _ in range(rounds):
+            if reset:
+                reset()
+            request = self._request(user)
+            started = time.perf_counter()
+            self._check(await view(request, *view_args))
+            await sync_to_async(close_old_connections)()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
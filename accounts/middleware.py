@@ -0,0 +1,20 @@
+from django.utils.functional import SimpleLazyObject
+
+from accounts.roles import request_role, request_student, request_teacher
+
+
+class RoleMiddleware:
+    """
+    Attach ``request.role`` ('admin', 'teacher', 'student' or None) and ``request.profile``
+    (the user's TeacherProfile or StudentProfile with only its pk loaded). Both are lazy and
+    resolved from the session, so requests that never look at them cost nothing.
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: request_role(request))
+        request.profile = SimpleLazyObject(lambda: request_teacher(request) or request_student(request))
+        return self.get_response(request)
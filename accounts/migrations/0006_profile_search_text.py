@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:40
+
+import unicodedata
+
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = (
+    ("accounts_studentprofile_search_trgm", "accounts_studentprofile"),
+    ("accounts_teacherprofile_search_trgm", "accounts_teacherprofile"),
+)
+
+
+def normalize_search_text(*parts):
+    # A frozen copy of accounts.models.normalize_search_text as of this migration.
+    text = unicodedata.normalize("NFKD", " ".join(str(part) for part in parts if part))
+    return " ".join("".join(char for char in text if not unicodedata.combining(char)).lower().split())
+
+
+def fill_search_text(apps, schema_editor):
+    for model_name, code_field in (("StudentProfile", "student_id"), ("TeacherProfile", "employee_code")):
+        model = apps.get_model("accounts", model_name)
+        profiles = list(model.objects.select_related("user"))
+        for profile in profiles:
+            user = profile.user
+            profile.search_text = normalize_search_text(
+                getattr(profile, code_field), user.username, user.first_name, user.last_name
+            )[:255].rstrip()
+        model.objects.bulk_update(profiles, ["search_text"], batch_size=1000)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Substring search (LIKE '%term%') needs pg_trgm; the plain db_index already serves
+    # prefix matches. Other databases search the column without an index.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, table in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin (search_text gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index_name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_identifiersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='search_text',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='teacherprofile',
+            name='search_text',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,11 +1,86 @@
-from django.db import models
-from django.db.models import IntegerField
+import unicodedata
+
+from django.db import models, transaction
+from django.db.models import F, IntegerField
 from django.db.models.functions import Cast, Substr
 from django.contrib.auth.models import User
 
+STUDENT_ID_PREFIX = "225002"
+EMPLOYEE_CODE_PREFIX = "EMP"
+SEARCH_TEXT_MAX_LENGTH = 255
+
+
+def _max_code_number(model_class, field_name, prefix):
+    """
+    Highest number already used after ``prefix`` in ``field_name`` (0 if none).
+    Only used to seed a new IdentifierSequence row.
+    """
+    return (
+        model_class.objects.filter(**{f"{field_name}__regex": rf"^{prefix}[0-9]+$"})
+        .annotate(code_number=Cast(Substr(field_name, len(prefix) + 1), IntegerField()))
+        .order_by("-code_number")
+        .values_list("code_number", flat=True)
+        .first()
+        or 0
+    )
+
+
+def format_identifier(prefix, number):
+    return f"{prefix}{number:03d}"
+
+
+def normalize_search_text(*parts):
+    """
+    Lower-case, accent-free, single-spaced text of ``parts``, as stored in the profiles'
+    ``search_text`` column and applied to search terms before matching it.
+    """
+    text = unicodedata.normalize("NFKD", " ".join(str(part) for part in parts if part))
+    return " ".join("".join(char for char in text if not unicodedata.combining(char)).lower().split())
+
+
+def profile_search_text(code, user):
+    """
+    A profile's ``search_text``: its code, username and names, cut to the column length.
+    Username and names allow 150 characters each, so a long last name loses its tail.
+    """
+    text = normalize_search_text(code, user.username, user.first_name, user.last_name)
+    return text[:SEARCH_TEXT_MAX_LENGTH].rstrip()
+
+
+class IdentifierSequence(models.Model):
+    """
+    Last number handed out for an identifier prefix (student IDs, employee codes).
+    Allocation locks one row, so it is O(1) and safe under concurrent signups.
+    """
+
+    prefix = models.CharField(max_length=16, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+    @classmethod
+    def reserve(cls, prefix, count=1, seed=None):
+        """
+        Reserve ``count`` consecutive numbers for ``prefix`` in one round trip and return
+        them as a range. ``seed`` is called once, when the sequence row is first created,
+        to start after identifiers that already exist.
+        """
+        with transaction.atomic():
+            sequence = cls.objects.select_for_update().filter(prefix=prefix).first()
+            if sequence is None:
+                sequence, _ = cls.objects.select_for_update().get_or_create(
+                    prefix=prefix, defaults={"last_value": seed() if seed else 0}
+                )
+            first = sequence.last_value + 1
+            cls.objects.filter(pk=sequence.pk).update(last_value=F("last_value") + count)
+        return range(first, first + count)
+
+
 class TeacherProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='teacher_profile')
     employee_code = models.CharField(max_length=32, unique=True, blank=True, null=True)
+    search_text = models.CharField(max_length=SEARCH_TEXT_MAX_LENGTH, blank=True, default="", editable=False, db_index=True)
     joining_date = models.DateField(auto_now_add=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
@@ -13,22 +88,26 @@ class TeacherProfile(models.Model):
     def __str__(self):
         return f"Teacher: {self.user.username}"
 
-    def _generate_employee_code(self):
-        prefix = "EMP"
-        prefix_len = len(prefix)
-        max_code = (
-            TeacherProfile.objects.filter(employee_code__regex=rf"^{prefix}[0-9]+$")
-            .annotate(code_number=Cast(Substr("employee_code", prefix_len + 1), IntegerField()))
-            .order_by("-code_number")
-            .values_list("code_number", flat=True)
-            .first()
-            or 0
+    @classmethod
+    def reserve_employee_codes(cls, count):
+        numbers = IdentifierSequence.reserve(
+            EMPLOYEE_CODE_PREFIX,
+            count,
+            seed=lambda: _max_code_number(cls, "employee_code", EMPLOYEE_CODE_PREFIX),
         )
-        return f"{prefix}{max_code + 1:03d}"
+        return [format_identifier(EMPLOYEE_CODE_PREFIX, number) for number in numbers]
+
+    def _generate_employee_code(self):
+        return self.reserve_employee_codes(1)[0]
+
+    def build_search_text(self, user=None):
+        user = user or self.user
+        return profile_search_text(self.employee_code, user)
 
     def save(self, *args, **kwargs):
         if not self.employee_code:
             self.employee_code = self._generate_employee_code()
+        self.search_text = self.build_search_text()
         super().save(*args, **kwargs)
 
 
@@ -36,6 +115,7 @@ class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
     student_id = models.CharField(max_length=16, unique=True, blank=True, null=True, editable=False)
     roll_number = models.PositiveIntegerField(blank=True, null=True)
+    search_text = models.CharField(max_length=SEARCH_TEXT_MAX_LENGTH, blank=True, default="", editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
@@ -43,18 +123,21 @@ class StudentProfile(models.Model):
         identifier = f"{self.student_id} - " if self.student_id else ""
         return f"Student: {identifier}{self.user.username}"
 
-    def _generate_student_id(self):
-        prefix = "225002"
-        prefix_len = len(prefix)
-        max_code = (
-            StudentProfile.objects.filter(student_id__regex=rf"^{prefix}[0-9]+$")
-            .annotate(code_number=Cast(Substr("student_id", prefix_len + 1), IntegerField()))
-            .order_by("-code_number")
-            .values_list("code_number", flat=True)
-            .first()
-            or 0
+    @classmethod
+    def reserve_student_ids(cls, count):
+        numbers = IdentifierSequence.reserve(
+            STUDENT_ID_PREFIX,
+            count,
+            seed=lambda: _max_code_number(cls, "student_id", STUDENT_ID_PREFIX),
         )
-        return f"{prefix}{max_code + 1:03d}"
+        return [format_identifier(STUDENT_ID_PREFIX, number) for number in numbers]
+
+    def _generate_student_id(self):
+        return self.reserve_student_ids(1)[0]
+
+    def build_search_text(self, user=None):
+        user = user or self.user
+        return profile_search_text(self.student_id, user)
 
     def save(self, *args, **kwargs):
         if self.pk:
@@ -65,4 +148,5 @@ class StudentProfile(models.Model):
         if not self.student_id:
             self.student_id = self._generate_student_id()
 
+        self.search_text = self.build_search_text()
         super().save(*args, **kwargs)
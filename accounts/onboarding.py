@@ -0,0 +1,254 @@
+import csv
+import io
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from academics.models import AcademicYear, ClassLevel, RollNumberCounter, StudentEnrollment, normalize_class_name
+from academics.rollups import adjust_enrollment_rollups, count_keys, rollup_key
+from accounts.models import StudentProfile, TeacherProfile
+from cems.workers import init_django_worker, settings_module_name
+
+ONBOARD_CHUNK_SIZE = 1000
+ROLES = ("student", "teacher")
+
+
+@dataclass
+class OnboardRow:
+    line: int
+    role: str
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    password: str
+    class_level: Optional[ClassLevel] = None
+
+
+@dataclass
+class OnboardReport:
+    students: int = 0
+    teachers: int = 0
+    enrollments: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def created(self):
+        return self.students + self.teachers
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password or None)
+
+
+def _class_lookup(year):
+    if not year:
+        return {}
+    return {
+        (cls.name.lower(), cls.section.upper()): cls
+        for cls in ClassLevel.objects.filter(academic_year=year)
+    }
+
+
+def _parse_rows(reader, classes, report):
+    seen_usernames = set()
+    for line, raw in enumerate(reader, start=2):
+        row = {key.strip().lower(): (value or "").strip() for key, value in raw.items() if key}
+        role = (row.get("role") or "student").lower()
+        username = row.get("username", "")
+        if role not in ROLES:
+            report.errors.append((line, f"Unknown role '{role}'."))
+            continue
+        if not username:
+            report.errors.append((line, "Username is required."))
+            continue
+        if username.lower() in seen_usernames:
+            report.errors.append((line, f"Duplicate username '{username}' in file."))
+            continue
+
+        class_level = None
+        class_name = row.get("class", "")
+        if role == "student" and class_name:
+            normalized_name, _ = normalize_class_name(class_name)
+            class_level = classes.get((normalized_name.lower(), row.get("section", "").upper()))
+            if not class_level:
+                report.errors.append((line, f"No class '{class_name}' section '{row.get('section', '')}' in the current year."))
+                continue
+
+        seen_usernames.add(username.lower())
+        yield OnboardRow(
+            line=line,
+            role=role,
+            username=username,
+            email=row.get("email", ""),
+            first_name=row.get("first_name", ""),
+            last_name=row.get("last_name", ""),
+            password=row.get("password", ""),
+            class_level=class_level,
+        )
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _create_chunk(chunk, hashes, year, report):
+    taken = {
+        name.lower()
+        for name in User.objects.filter(username__in=[row.username for row in chunk]).values_list(
+            "username", flat=True
+        )
+    }
+    fresh = []
+    fresh_hashes = []
+    for row, password_hash in zip(chunk, hashes):
+        if row.username.lower() in taken:
+            report.errors.append((row.line, f"Username '{row.username}' already exists."))
+            continue
+        fresh.append(row)
+        fresh_hashes.append(password_hash)
+    if not fresh:
+        return
+
+    students = [row for row in fresh if row.role == "student"]
+    teachers = [row for row in fresh if row.role == "teacher"]
+    by_class = defaultdict(list)
+    for row in students:
+        if row.class_level:
+            by_class[row.class_level].append(row)
+
+    # Reservations and inserts commit or roll back together, so a failed chunk hands its
+    # student IDs, employee codes and rolls back instead of leaving gaps.
+    try:
+        with transaction.atomic():
+            student_ids = iter(StudentProfile.reserve_student_ids(len(students)) if students else [])
+            employee_codes = iter(TeacherProfile.reserve_employee_codes(len(teachers)) if teachers else [])
+            rolls = {}
+            for class_level, class_rows in by_class.items():
+                first = RollNumberCounter.allocate(class_level.id, year.id, count=len(class_rows))
+                for offset, row in enumerate(class_rows):
+                    rolls[row.line] = first + offset
+
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        username=row.username,
+                        email=row.email,
+                        first_name=row.first_name,
+                        last_name=row.last_name,
+                        password=password_hash,
+                    )
+                    for row, password_hash in zip(fresh, fresh_hashes)
+                ]
+            )
+            user_by_line = {row.line: user for row, user in zip(fresh, users)}
+
+            # bulk_create skips save(), so the search column is filled here.
+            profiles = [
+                StudentProfile(
+                    user=user_by_line[row.line],
+                    student_id=next(student_ids),
+                    roll_number=rolls.get(row.line),
+                )
+                for row in students
+            ]
+            teacher_profiles = [
+                TeacherProfile(user=user_by_line[row.line], employee_code=next(employee_codes)) for row in teachers
+            ]
+            for profile in profiles + teacher_profiles:
+                profile.search_text = profile.build_search_text()
+            profiles = StudentProfile.objects.bulk_create(profiles)
+            TeacherProfile.objects.bulk_create(teacher_profiles)
+            enrollments = StudentEnrollment.objects.bulk_create(
+                [
+                    StudentEnrollment(
+                        student=profile,
+                        class_level=row.class_level,
+                        academic_year=year,
+                        status="current",
+                        roll_number=rolls[row.line],
+                        enrolled_on=date.today(),
+                    )
+                    for row, profile in zip(students, profiles)
+                    if row.class_level
+                ]
+            )
+            adjust_enrollment_rollups(count_keys(rollup_key(enrollment) for enrollment in enrollments))
+    except IntegrityError as exc:
+        # E.g. a username or roll taken by a concurrent admission since the checks above.
+        report.errors.extend((row.line, f"Not created; its chunk was rolled back: {exc}") for row in fresh)
+        return
+
+    report.students += len(profiles)
+    report.teachers += len(teachers)
+    report.enrollments += len(enrollments)
+
+
+def admin_onboard_max_rows():
+    return getattr(settings, "ADMIN_ONBOARD_MAX_ROWS", 50)
+
+
+def count_csv_rows(csv_file):
+    """Number of data rows in a CSV file object, which is rewound afterwards."""
+    rows = sum(1 for _ in csv.reader(csv_file)) - 1
+    csv_file.seek(0)
+    return max(rows, 0)
+
+
+def bulk_onboard(csv_file, workers=None, chunk_size=ONBOARD_CHUNK_SIZE, settings_module=None):
+    """
+    Create users, student/teacher profiles and current-year enrollments from a CSV.
+
+    Columns: role (student/teacher, default student), username, email, first_name,
+    last_name, password (blank means unusable; users reset it) and, for students, class
+    and section. Passwords are hashed on a process pool across all cores (``workers=0``
+    hashes in this process instead); student IDs, employee codes and roll numbers are
+    reserved in blocks; rows are bulk-created in chunked transactions. A chunk that hits
+    a database conflict is rolled back whole and its rows reported as errors. Returns an
+    OnboardReport with counts, row errors and timing.
+    """
+    started = time.perf_counter()
+    report = OnboardReport()
+    year = AcademicYear.objects.filter(is_current=True).order_by("-start_date").first()
+    classes = _class_lookup(year)
+    if isinstance(csv_file, (bytes, bytearray)):
+        csv_file = io.StringIO(csv_file.decode("utf-8-sig"))
+    reader = csv.DictReader(csv_file)
+
+    chunks = _chunks(_parse_rows(reader, classes, report), chunk_size)
+    if workers == 0:
+        for chunk in chunks:
+            _create_chunk(chunk, [_hash_password(row.password) for row in chunk], year, report)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=init_django_worker,
+            initargs=(settings_module or settings_module_name(),),
+        ) as pool:
+            for chunk in chunks:
+                hashes = list(pool.map(_hash_password, [row.password for row in chunk], chunksize=32))
+                _create_chunk(chunk, hashes, year, report)
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,110 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+
+from accounts.models import StudentProfile, TeacherProfile
+from cems.routers import replica_reads
+
+SESSION_KEY = "_cems_role"
+VERSION_KEY = "role_version:{}"
+
+PROFILE_KEYS = ("teacher", "employee_code", "student", "student_id")
+PROFILE_COLUMNS = (
+    "teacher_profile__id",
+    "teacher_profile__employee_code",
+    "student_profile__id",
+    "student_profile__student_id",
+)
+
+ROLE_DASHBOARDS = {
+    "admin": "accounts:admin_dashboard",
+    "teacher": "academics:teacher_dashboard",
+    "student": "accounts:student_dashboard",
+}
+
+
+def _role_version(user_id):
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    return version
+
+
+def invalidate_role(user_id):
+    """Force every session of ``user_id`` to re-resolve its role on the next request."""
+    cache.set(VERSION_KEY.format(user_id), uuid.uuid4().hex, None)
+
+
+def _lightweight(model, pk, code_field, code, user):
+    """
+    A profile instance built without a query: only the pk, user and identifier are loaded,
+    other fields are deferred and fetched on first access.
+    """
+    profile = model.from_db(None, ["id", "user_id", code_field], [pk, user.pk, code])
+    profile.user = user
+    return profile
+
+
+def resolve_profiles(request) -> dict:
+    """
+    Return the signed-in user's profile ids and identifiers ({"teacher": id|None,
+    "employee_code", "student": id|None, "student_id"}) from the session when still
+    current, else with one query stored back in the session.
+    """
+    user = request.user
+    memo = getattr(request, "_cems_profiles", None)
+    if memo and memo["user"] == user.pk:
+        return memo
+    if not user.is_authenticated:
+        return {"teacher": None, "student": None}
+
+    version = _role_version(user.pk)
+    stored = request.session.get(SESSION_KEY)
+    if not (stored and stored.get("user") == user.pk and stored.get("version") == version):
+        # Stored until the version changes, so never from a replica that missed the change.
+        with replica_reads(False):
+            row = User.objects.filter(pk=user.pk).values_list(*PROFILE_COLUMNS).first()
+        row = row or (None,) * len(PROFILE_COLUMNS)
+        stored = {"user": user.pk, "version": version, **dict(zip(PROFILE_KEYS, row))}
+        request.session[SESSION_KEY] = stored
+    request._cems_profiles = stored
+    return stored
+
+
+def request_role(request):
+    """'admin', 'teacher', 'student' or None, checked in the order role_redirect uses."""
+    if not request.user.is_authenticated:
+        return None
+    if request.user.is_superuser:
+        return "admin"
+    profiles = resolve_profiles(request)
+    if profiles["teacher"]:
+        return "teacher"
+    if profiles["student"]:
+        return "student"
+    return None
+
+
+def request_teacher(request):
+    profiles = resolve_profiles(request)
+    if not profiles["teacher"]:
+        return None
+    return _lightweight(TeacherProfile, profiles["teacher"], "employee_code", profiles["employee_code"], request.user)
+
+
+def request_student(request):
+    profiles = resolve_profiles(request)
+    if not profiles["student"]:
+        return None
+    return _lightweight(StudentProfile, profiles["student"], "student_id", profiles["student_id"], request.user)
+
+
+def dashboard_url(request):
+    """URL of the signed-in user's dashboard, or None when they have no role."""
+    name = ROLE_DASHBOARDS.get(request_role(request))
+    return reverse(name) if name else None
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.text import smart_split, unescape_string_literal
+
+from academics.models import StudentEnrollment
+from accounts.models import normalize_search_text
+
+# Ranks, best first: the exact student ID / employee code or username, a match at the
+# start of the text, a match at the start of a later word (a name), anywhere else.
+EXACT, LEADING, WORD, ANYWHERE = range(4)
+
+
+def result_limit():
+    return getattr(settings, "STUDENT_SEARCH_LIMIT", 10)
+
+
+def search_profiles(queryset, term, limit=None, prefix="", code_field="student_id"):
+    """
+    Rank the rows of ``queryset`` whose profile ``search_text`` contains every word of
+    ``term``. ``prefix`` is the path to the profile ("" for profile querysets,
+    "student__" for enrollments). Rows carry a ``search_rank`` annotation.
+
+    Each word is a LIKE '%word%' on the normalized column, which the pg_trgm index serves
+    on PostgreSQL; elsewhere (SQLite) it is the same query without the index.
+    """
+    words = normalize_search_text(term).split()
+    if not words:
+        return []
+    column = f"{prefix}search_text"
+    whole = " ".join(words)
+    for word in words:
+        queryset = queryset.filter(**{f"{column}__contains": word})
+
+    exact = Q(**{f"{prefix}{code_field}__iexact": term.strip()}) | Q(
+        **{f"{prefix}user__username__iexact": term.strip()}
+    )
+    ranked = queryset.annotate(
+        search_rank=Case(
+            When(exact, then=Value(EXACT)),
+            When(**{f"{column}__startswith": whole}, then=Value(LEADING)),
+            When(**{f"{column}__contains": f" {whole}"}, then=Value(WORD)),
+            default=Value(ANYWHERE),
+            output_field=IntegerField(),
+        )
+    ).order_by("search_rank", f"{prefix}user__first_name", f"{prefix}user__last_name", f"{prefix}pk")
+    return list(ranked[: limit or result_limit()])
+
+
+def roster_matches(exam, term, limit=None):
+    """Enrollments of ``exam``'s class/year whose student matches ``term``, best first."""
+    enrollments = StudentEnrollment.objects.filter(
+        class_level_id=exam.class_level_id, academic_year_id=exam.academic_year_id
+    ).select_related("student__user")
+    return search_profiles(enrollments, term, limit=limit, prefix="student__")
+
+
+def pick_match(matches):
+    """
+    The single match a free-text identifier refers to: an exact ID/username wins, any
+    other term must match exactly one row. None when nothing or several rows match.
+    """
+    if matches and (matches[0].search_rank == EXACT or len(matches) == 1):
+        return matches[0]
+    return None
+
+
+class SearchTextAdminMixin:
+    """
+    Admin search over ``search_text`` columns next to plain fields: each word of the term
+    is normalized like the column before matching a ``search_text`` lookup, and matched
+    as typed against the other ``search_fields`` (e.g. ``subject__name``).
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = [str(field) for field in self.get_search_fields(request)]
+        text_lookups = [field for field in search_fields if "search_text" in field.split(LOOKUP_SEP)]
+        if not (text_lookups and search_term):
+            return super().get_search_results(request, queryset, search_term)
+
+        plain_lookups = [_plain_lookup(field) for field in search_fields if field not in text_lookups]
+        for word in smart_split(search_term):
+            if word.startswith(('"', "'")) and word[0] == word[-1]:
+                word = unescape_string_literal(word)
+            normalized = normalize_search_text(word)
+            matches = [(lookup, word) for lookup in plain_lookups]
+            if normalized:
+                matches += [(lookup, normalized) for lookup in text_lookups]
+            queryset = queryset.filter(Q.create(matches, connector=Q.OR))
+        may_have_duplicates = any(
+            lookup_spawns_duplicates(self.opts, lookup) for lookup in text_lookups + plain_lookups
+        )
+        return queryset, may_have_duplicates
+
+
+def _plain_lookup(field_name):
+    """The lookup ModelAdmin would use for a plain search field ("^name", "=code", "name")."""
+    if field_name.startswith("^"):
+        return f"{field_name[1:]}__istartswith"
+    if field_name.startswith("="):
+        return f"{field_name[1:]}__iexact"
+    return f"{field_name}__icontains"
@@ -0,0 +1,107 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from academics.models import AcademicYear, ClassLevel, StudentEnrollment, Subject
+from accounts.counters import adjust_landing_counter, is_upcoming
+from accounts.dashboard import invalidate_class_dashboards, invalidate_student_dashboards
+from accounts.models import StudentProfile, TeacherProfile
+from accounts.roles import invalidate_role
+from exams.models import Exam, ExamResult
+
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+@receiver(post_save, sender=StudentEnrollment)
+@receiver(post_delete, sender=StudentEnrollment)
+def invalidate_dashboard_for_student(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_student_dashboards([instance.student_id])
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def invalidate_dashboards_for_exam_class(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_class_dashboards(instance.class_level_id, instance.academic_year_id)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_dashboards_for_subject_class(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    year_id = ClassLevel.objects.filter(pk=instance.class_level_id).values_list("academic_year_id", flat=True).first()
+    invalidate_class_dashboards(instance.class_level_id, year_id)
+
+
+@receiver(post_save, sender=StudentProfile)
+def invalidate_role_on_student_create(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        invalidate_role(instance.user_id)
+
+
+@receiver(post_save, sender=TeacherProfile)
+def invalidate_role_on_teacher_save(sender, instance, raw=False, **kwargs):
+    # Sessions also hold the employee code, which admins can edit.
+    if not raw:
+        invalidate_role(instance.user_id)
+
+
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_delete, sender=StudentProfile)
+def invalidate_role_on_profile_delete(sender, instance, **kwargs):
+    invalidate_role(instance.user_id)
+
+
+SEARCHED_USER_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+def refresh_profile_search_text(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins save only last_login; a new user has no profile yet.
+    if raw or created or (update_fields and not SEARCHED_USER_FIELDS & set(update_fields)):
+        return
+    for model in (StudentProfile, TeacherProfile):
+        profile = model.objects.filter(user=instance).first()
+        text = profile.build_search_text(instance) if profile else None
+        if profile and text != profile.search_text:
+            # updated_at moves too: pages listing the renamed user revalidate on it.
+            model.objects.filter(pk=profile.pk).update(search_text=text, updated_at=timezone.now())
+
+
+# Landing-page counters: remember whether a row was counted as loaded (None if the field
+# was deferred), then apply the difference on save/delete.
+COUNTED_FIELDS = (
+    (AcademicYear, "active_years", "is_current", bool),
+    (Exam, "upcoming_exams", "exam_date", is_upcoming),
+    (ExamResult, "published_results", "published", bool),
+)
+
+
+def _connect_counter(model, name, field_name, counted):
+    def current(instance):
+        values = instance.__dict__
+        return counted(values[field_name]) if field_name in values else None
+
+    def remember(sender, instance, **kwargs):
+        instance._landing_counted = current(instance) if instance.pk else False
+
+    def on_save(sender, instance, raw=False, **kwargs):
+        now = current(instance)
+        if not raw and now is not None and instance._landing_counted is not None:
+            adjust_landing_counter(name, int(now) - int(instance._landing_counted))
+        instance._landing_counted = now
+
+    def on_delete(sender, instance, **kwargs):
+        if instance._landing_counted:
+            adjust_landing_counter(name, -1)
+
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=f"landing_counter_init_{name}")
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f"landing_counter_save_{name}")
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=f"landing_counter_delete_{name}")
+
+
+for counted_model, counter_name, counted_field, counted_flag in COUNTED_FIELDS:
+    _connect_counter(counted_model, counter_name, counted_field, counted_flag)
@@ -1,3 +1,294 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from academics.models import (
+    AcademicYear,
+    ClassLevel,
+    RollNumberCounter,
+    StudentEnrollment,
+    Subject,
+    TeacherAssignment,
+)
+from accounts.counters import landing_counters
+from accounts.dashboard import build_student_dashboard, invalidate_class_dashboards, student_dashboard_entry
+from accounts.middleware import RoleMiddleware
+from accounts.models import (
+    SEARCH_TEXT_MAX_LENGTH,
+    STUDENT_ID_PREFIX,
+    StudentProfile,
+    TeacherProfile,
+    format_identifier,
+)
+from accounts.onboarding import bulk_onboard
+from accounts.roles import SESSION_KEY
+from cems.routers import PrimaryReplicaRouter, replica_reads
+from exams.models import Exam, ExamResult
+from exams.statistics import refresh_exam_statistics
+
+
+def _result(year, title):
+    class_level = ClassLevel(name="Class 5", section="A", academic_year=year)
+    subject = Subject(name="Math", class_level=class_level)
+    exam = Exam(title=title, class_level=class_level, subject=subject, academic_year=year)
+    return ExamResult(exam=exam, marks_obtained=10)
+
+
+class StudentDashboardOrderingTests(SimpleTestCase):
+    def test_year_without_start_date_sorts_first(self):
+        dated = AcademicYear(pk=1, name="2024", start_date=date(2024, 1, 1))
+        older = AcademicYear(pk=2, name="2023", start_date=date(2023, 1, 1))
+        undated = AcademicYear(pk=3, name="Legacy", start_date=None)
+        results = [_result(dated, "B"), _result(undated, "Z"), _result(older, "A"), _result(dated, "A")]
+
+        payload = build_student_dashboard([], [], [], [], results)
+
+        self.assertEqual(
+            [(res.exam.academic_year.name, res.exam.title) for res in payload["all_results"]],
+            [("Legacy", "Z"), ("2024", "A"), ("2024", "B"), ("2023", "A")],
+        )
+
+
+@override_settings(ADMIN_ONBOARD_MAX_ROWS=2)
+class BulkOnboardAdminTests(TestCase):
+    url = reverse("admin:accounts_studentprofile_bulk_onboard")
+
+    def upload(self, *usernames):
+        lines = ["role,username"] + [f"teacher,{name}" for name in usernames]
+        return {"csv_file": SimpleUploadedFile("people.csv", "\n".join(lines).encode())}
+
+    def test_staff_without_add_permissions_is_denied(self):
+        staff = User.objects.create_user("clerk", is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename="add_studentprofile"))
+        self.client.force_login(staff)
+
+        response = self.client.post(self.url, self.upload("t1"))
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(User.objects.filter(username="t1").exists())
+
+    def test_onboards_small_file(self):
+        self.client.force_login(User.objects.create_superuser("root"))
+
+        response = self.client.post(self.url, self.upload("t1", "t2"))
+
+        self.assertEqual(response.context["report"].teachers, 2)
+        self.assertEqual(User.objects.filter(username__in=["t1", "t2"]).count(), 2)
+
+    def test_rejects_file_over_row_limit(self):
+        self.client.force_login(User.objects.create_superuser("root"))
+
+        response = self.client.post(self.url, self.upload("t1", "t2", "t3"))
+
+        self.assertIsNone(response.context["report"])
+        self.assertIn("limited to 2", response.context["error"])
+        self.assertFalse(User.objects.filter(username__startswith="t").exists())
+
+
+class BulkOnboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        year = AcademicYear.objects.create(name="Current", start_date=date(date.today().year, 1, 1), is_current=True)
+        cls.class_level = ClassLevel.objects.create(name="Class 5", section="A", academic_year=year)
+        cls.admitted = StudentProfile.objects.create(user=User.objects.create_user("admitted"))
+        StudentEnrollment.objects.create(student=cls.admitted, class_level=cls.class_level, academic_year=year)
+
+    def onboard(self, *lines):
+        csv_file = "\n".join(["role,username,class,section", *lines]).encode()
+        return bulk_onboard(csv_file, workers=0, chunk_size=2)
+
+    def test_conflicting_chunk_is_rolled_back_and_reported(self):
+        # The counter has drifted back, so the second chunk's first roll collides with roll 1.
+        RollNumberCounter.objects.filter(class_level=self.class_level).update(last_value=0)
+
+        report = self.onboard("teacher,t1,,", "teacher,t2,,", "student,s1,Class 5,A", "teacher,t3,,")
+
+        self.assertEqual((report.teachers, report.students, report.enrollments), (2, 0, 0))
+        self.assertEqual([line for line, _ in report.errors], [4, 5])
+        self.assertTrue(all("rolled back" in message for _, message in report.errors))
+        self.assertFalse(User.objects.filter(username__in=["s1", "t3"]).exists())
+        self.assertEqual(TeacherProfile.objects.count(), 2)
+        # Nothing the failed chunk reserved stays taken.
+        self.assertEqual(RollNumberCounter.objects.get(class_level=self.class_level).last_value, 0)
+        admitted_number = int(self.admitted.student_id[len(STUDENT_ID_PREFIX):])
+        self.assertEqual(StudentProfile.reserve_student_ids(1), [format_identifier(STUDENT_ID_PREFIX, admitted_number + 1)])
+
+    def test_clean_chunks_create_profiles_and_enrollments(self):
+        report = self.onboard("student,s1,Class 5,A", "student,s2,Class 5,A", "teacher,t1,,")
+
+        self.assertEqual((report.students, report.teachers, report.enrollments, report.errors), (2, 1, 2, []))
+        self.assertEqual(
+            StudentEnrollment.objects.filter(class_level=self.class_level).aggregate(Max("roll_number")),
+            {"roll_number__max": 3},
+        )
+
+
+class RoleMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user("pupil")
+        self.session = {}
+
+    def request(self):
+        """Role and profile of one request sharing ``self.session``, as the view sees them."""
+        seen = {}
+
+        def view(request):
+            # Both are lazy; ``or`` resolves them while the request is being handled.
+            seen.update(role=request.role or None, profile=request.profile or None)
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.user = self.user
+        request.session = self.session
+        RoleMiddleware(view)(request)
+        return seen["role"], seen["profile"]
+
+    def test_role_is_resolved_once_and_kept_in_the_session(self):
+        student = StudentProfile.objects.create(user=self.user)
+
+        with self.assertNumQueries(1):
+            role, profile = self.request()
+        self.assertEqual((role, profile.pk, profile.student_id), ("student", student.pk, student.student_id))
+        self.assertEqual(self.session[SESSION_KEY]["student"], student.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.request()[0], "student")
+
+    def test_new_profile_is_picked_up_on_the_next_request(self):
+        self.assertEqual(self.request(), (None, None))
+
+        teacher = TeacherProfile.objects.create(user=self.user)
+
+        role, profile = self.request()
+        self.assertEqual((role, profile.pk, profile.employee_code), ("teacher", teacher.pk, teacher.employee_code))
+
+    def test_deleted_profile_is_dropped_on_the_next_request(self):
+        StudentProfile.objects.create(user=self.user)
+        TeacherProfile.objects.create(user=self.user)
+        self.assertEqual(self.request()[0], "teacher")
+
+        TeacherProfile.objects.filter(user=self.user).delete()
+        self.assertEqual(self.request()[0], "student")
+
+        StudentProfile.objects.get(user=self.user).delete()
+        self.assertEqual(self.request(), (None, None))
+
+    def test_another_users_session_entry_is_not_reused(self):
+        StudentProfile.objects.create(user=self.user)
+        self.request()
+        self.user = User.objects.create_user("other")
+
+        self.assertEqual(self.request(), (None, None))
+
+
+class ProfileSearchTextTests(TestCase):
+    def test_long_names_are_cut_to_the_column_length(self):
+        user = User.objects.create_user("a" * 150, first_name="B" * 150, last_name="C" * 150)
+
+        profile = StudentProfile.objects.create(user=user)
+        user.last_name = "D" * 150
+        user.save()
+
+        profile.refresh_from_db()
+        self.assertEqual(len(profile.search_text), SEARCH_TEXT_MAX_LENGTH)
+        self.assertTrue(profile.search_text.startswith(f"{profile.student_id} {'a' * 150} bbb"))
+
+
+class SearchTextAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        year = AcademicYear.objects.create(name="Current", start_date=date(date.today().year, 1, 1), is_current=True)
+        for username, first_name, section, subject_name in (
+            ("zoe", "Zoë", "A", "Français"),
+            ("zoe", "Zoë", "A", "Math"),
+            ("sam", "Sam", "B", "Français"),
+        ):
+            user, _ = User.objects.get_or_create(username=username, defaults={"first_name": first_name})
+            teacher, _ = TeacherProfile.objects.get_or_create(user=user)
+            class_level, _ = ClassLevel.objects.get_or_create(name="Class 5", section=section, academic_year=year)
+            subject, _ = Subject.objects.get_or_create(name=subject_name, class_level=class_level)
+            TeacherAssignment.objects.create(teacher=teacher, class_level=class_level, subject=subject, academic_year=year)
+
+    def search(self, term):
+        model_admin = admin.site._registry[TeacherAssignment]
+        request = RequestFactory().get("/")
+        queryset, _ = model_admin.get_search_results(request, TeacherAssignment.objects.all(), term)
+        return {(assignment.teacher.user.username, assignment.subject.name) for assignment in queryset}
+
+    def test_plain_fields_get_the_term_as_typed(self):
+        self.assertEqual(self.search("Français"), {("zoe", "Français"), ("sam", "Français")})
+
+    def test_search_text_gets_the_normalized_term(self):
+        self.assertEqual(self.search("ZOË"), {("zoe", "Français"), ("zoe", "Math")})
+        self.assertEqual(self.search("zoe"), {("zoe", "Français"), ("zoe", "Math")})
+
+    def test_every_word_must_match_some_field(self):
+        self.assertEqual(self.search("Zoë Français"), {("zoe", "Français")})
+        self.assertEqual(self.search('sam "class 5"'), {("sam", "Français")})
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class CacheRebuildRoutingTests(TransactionTestCase):
+    """Caches rebuilt during a replica-reading GET load from the primary."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        year = AcademicYear.objects.create(name="Current", start_date=date(date.today().year, 1, 1), is_current=True)
+        self.class_level = ClassLevel.objects.create(name="Class 5", section="A", academic_year=year)
+        self.student = StudentProfile.objects.create(user=User.objects.create_user("pupil"))
+        StudentEnrollment.objects.create(student=self.student, class_level=self.class_level, academic_year=year)
+        subject = Subject.objects.create(name="Math", class_level=self.class_level)
+        self.exam = Exam.objects.create(title="Midterm", class_level=self.class_level, subject=subject, academic_year=year)
+        ExamResult.objects.create(exam=self.exam, student=self.student, marks_obtained=40, published=True)
+
+        # Record where each read would go, but run it on the primary: there is no replica here.
+        self.routed = []
+        route = PrimaryReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            self.routed.append(route(router, model, **hints))
+            return DEFAULT_DB_ALIAS
+
+        patcher = mock.patch.object(PrimaryReplicaRouter, "db_for_read", record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_plain_reads_in_a_get_use_the_replica(self):
+        with replica_reads():
+            StudentProfile.objects.count()
+
+        self.assertEqual(self.routed, ["replica"])
+
+    def test_dashboard_rebuilt_after_invalidation_reads_the_primary(self):
+        with replica_reads():
+            first = student_dashboard_entry(self.student)
+        invalidate_class_dashboards(self.class_level.pk, self.class_level.academic_year_id)
+        self.routed.clear()
+
+        with replica_reads():
+            rebuilt = student_dashboard_entry(self.student)
+
+        self.assertNotEqual(rebuilt["version"], first["version"])
+        self.assertTrue(self.routed)
+        self.assertNotIn("replica", self.routed)
+
+    def test_counters_and_statistics_read_the_primary(self):
+        with replica_reads():
+            counters = landing_counters()
+            refresh_exam_statistics(self.exam.pk)
+
+        self.assertEqual(counters["published_results"], 1)
+        self.assertTrue(self.routed)
+        self.assertNotIn("replica", self.routed)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.urls import reverse_lazy
 from django.contrib.auth import views as auth_views
@@ -11,7 +12,16 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('home/', views.catch_home, name='catch_home'),
     path('dashboard/admin/', views.admin_dashboard, name='admin_dashboard'),
-    path('dashboard/student/', views.student_dashboard, name='student_dashboard'),
+    path(
+        'dashboard/student/',
+        views.student_dashboard_async if settings.ASYNC_DASHBOARDS else views.student_dashboard,
+        name='student_dashboard',
+    ),
+
+    # Read API for the student dashboard (JSON, cursor paginated)
+    path('api/student/enrollments/', views.api_student_enrollments, name='api_student_enrollments'),
+    path('api/student/results/', views.api_student_results, name='api_student_results'),
+    path('api/student/exams/upcoming/', views.api_student_upcoming_exams, name='api_student_upcoming_exams'),
 
     # Login and Logout
     path('login/', views.CEMSLoginView.as_view(), name='login'),
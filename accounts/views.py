@@ -1,14 +1,58 @@
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
 from django.shortcuts import render, redirect
-from django.utils import timezone
 from django.contrib.auth import login, logout
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from academics.models import StudentEnrollment, AcademicYear
+from academics.models import StudentEnrollment
+from cems.api import ApiError, api_view, keyset_page
+from cems.conditional import conditional_page, page_etag
+from cems.fragments import fragment_timeout
 from exams.models import Exam, ExamResult
-from .models import TeacherProfile, StudentProfile
+from .counters import landing_counters
+from .dashboard import astudent_dashboard_entry, student_dashboard_entry
+from .models import StudentProfile
+from .roles import dashboard_url, request_student
 from .forms import EmailExistsPasswordResetForm
 
+# (field, lookup) pairs the student API can return; ?fields= picks a subset.
+STUDENT_ENROLLMENT_API_FIELDS = (
+    ("id", "pk"),
+    ("academic_year", "academic_year__name"),
+    ("class_level", "class_level_id"),
+    ("class_name", "class_level__name"),
+    ("section", "class_level__section"),
+    ("roll_number", "roll_number"),
+    ("status", "status"),
+    ("enrolled_on", "enrolled_on"),
+)
+
+STUDENT_RESULT_API_FIELDS = (
+    ("id", "pk"),
+    ("exam", "exam_id"),
+    ("title", "exam__title"),
+    ("subject", "exam__subject__name"),
+    ("subject_code", "exam__subject__code"),
+    ("exam_date", "exam__exam_date"),
+    ("academic_year", "exam__academic_year__name"),
+    ("max_marks", "exam__max_marks"),
+    ("marks_obtained", "marks_obtained"),
+    ("attendance", "attendance"),
+    ("published", "published"),
+)
+
+STUDENT_EXAM_API_FIELDS = (
+    ("id", "pk"),
+    ("title", "title"),
+    ("subject", "subject__name"),
+    ("subject_code", "subject__code"),
+    ("exam_date", "exam_date"),
+    ("max_marks", "max_marks"),
+)
+
 
 class RedirectIfAuthenticatedMixin:
     """
@@ -27,6 +71,10 @@ class CEMSLoginView(RedirectIfAuthenticatedMixin, auth_views.LoginView):
     redirect_authenticated_user = True
     template_name = 'login.html'
 
+    def get_default_redirect_url(self):
+        # Send users straight to their dashboard instead of bouncing through role_redirect.
+        return dashboard_url(self.request) or super().get_default_redirect_url()
+
 
 class CEMSPasswordResetView(RedirectIfAuthenticatedMixin, auth_views.PasswordResetView):
     template_name = 'password_reset.html'
@@ -66,28 +114,15 @@ def student_register(request):
         # auto login
         login(request, user)
 
-        return redirect('accounts:role_redirect')
+        return redirect('accounts:student_dashboard')
 
     return render(request, 'signup.html')
 
 
 @login_required
 def role_redirect(request):
-    user = request.user
-
-    if user.is_superuser:
-        return redirect('accounts:admin_dashboard')
-
-    # teacher check
-    if hasattr(user, 'teacher_profile'):
-        return redirect('academics:teacher_dashboard')
-
-    # student check
-    if hasattr(user, 'student_profile'):
-        return redirect('accounts:student_dashboard')
-
-    # fallback
-    return redirect('accounts:login')
+    # role and profile come from the session (accounts.roles), not a profile query per check
+    return redirect(dashboard_url(request) or 'accounts:login')
 
 
 def logout_view(request):
@@ -104,20 +139,10 @@ def catch_home(request):
 
 
 def home(request):
-    current_years = AcademicYear.objects.filter(is_current=True).count()
-    upcoming_exams = Exam.objects.filter(exam_date__gte=timezone.now().date()).count()
-    published_results = ExamResult.objects.filter(published=True).count()
-
     if request.user.is_authenticated:
         return redirect('accounts:role_redirect')
 
-    context = {
-        "live_stats": {
-            "active_years": current_years,
-            "upcoming_exams": upcoming_exams,
-            "published_results": published_results,
-        }
-    }
+    context = {"live_stats": landing_counters()}
     return render(request, "home.html", context)
 
 
@@ -135,69 +160,84 @@ def handle_404(request, exception=None):
 
 @login_required
 def student_dashboard(request):
-    student = getattr(request.user, "student_profile", None)
+    student = request_student(request)
     if not student:
         return redirect("accounts:role_redirect")
 
-    enrollments = (
-        StudentEnrollment.objects.filter(student=student)
-        .select_related("class_level", "academic_year")
-        .order_by("-academic_year__start_date", "-created_at")
-    )
-    current_enrollment = enrollments.filter(status="current").first() or enrollments.first()
-    current_class = current_enrollment.class_level if current_enrollment else None
-    current_year = current_enrollment.academic_year if current_enrollment else None
-    subjects = current_class.subjects.all() if current_class else []
-
-    upcoming_exams = (
-        Exam.objects.filter(class_level=current_class, academic_year=current_year)
-        .select_related("subject")
-        .order_by("exam_date")
-        if current_class and current_year
-        else Exam.objects.none()
-    )
-
-    current_results = (
-        ExamResult.objects.filter(
-            student=student, exam__class_level=current_class, exam__academic_year=current_year
-        )
-        .select_related("exam__subject")
-        .order_by("-exam__exam_date", "exam__title")
-        if current_class and current_year
-        else ExamResult.objects.none()
-    )
-
-    all_results = (
-        ExamResult.objects.filter(student=student)
-        .select_related("exam__subject", "exam__academic_year", "exam__class_level")
-        .order_by("-exam__academic_year__start_date", "exam__title")
+    # The cached entry's version is the validator: an unchanged dashboard costs no query.
+    entry = student_dashboard_entry(student)
+    context = {
+        "student": student,
+        **entry["payload"],
+        "dashboard_version": entry["version"],
+        "fragment_timeout": fragment_timeout(),
+    }
+    return conditional_page(
+        request,
+        page_etag(request, entry["version"]),
+        entry["built_at"],
+        lambda: render(request, "student_dashboard.html", context),
     )
 
-    published_count = current_results.filter(published=True).count()
-    absence_count = current_results.filter(attendance="absent").count()
-    upcoming_count = upcoming_exams.count()
 
-    history_enrollments = (
-        enrollments.exclude(pk=current_enrollment.pk) if current_enrollment else enrollments
-    )
+@login_required
+async def student_dashboard_async(request):
+    """student_dashboard for ASGI; a cache miss loads the payload with queries in parallel."""
+    student = await sync_to_async(request_student)(request)
+    if not student:
+        return redirect("accounts:role_redirect")
 
+    entry = await astudent_dashboard_entry(student)
     context = {
         "student": student,
-        "current_enrollment": current_enrollment,
-        "current_class": current_class,
-        "current_year": current_year,
-        "subjects": subjects,
-        "upcoming_exams": upcoming_exams,
-        "results": current_results,
-        "all_results": all_results,
-        "history_enrollments": history_enrollments,
-        "metrics": {
-            "upcoming": upcoming_count,
-            "published": published_count,
-            "absences": absence_count,
-        },
+        **entry["payload"],
+        "dashboard_version": entry["version"],
+        "fragment_timeout": fragment_timeout(),
     }
-    return render(request, "student_dashboard.html", context)
+    return await sync_to_async(conditional_page)(
+        request,
+        page_etag(request, entry["version"]),
+        entry["built_at"],
+        lambda: render(request, "student_dashboard.html", context),
+    )
+
+
+def _api_student(request):
+    student = request_student(request)
+    if not student:
+        raise ApiError("Student access required.", status=403)
+    return student
+
+
+@api_view
+def api_student_enrollments(request):
+    """The signed-in student's enrollments, newest academic year first."""
+    student = _api_student(request)
+    enrollments = StudentEnrollment.objects.filter(student=student)
+    return keyset_page(request, enrollments, STUDENT_ENROLLMENT_API_FIELDS, ("-academic_year__start_date", "pk"))
+
+
+@api_view
+def api_student_results(request):
+    """Every exam result of the signed-in student, newest exam first (undated last)."""
+    student = _api_student(request)
+    results = ExamResult.objects.filter(student=student)
+    return keyset_page(request, results, STUDENT_RESULT_API_FIELDS, ("-exam__exam_date", "pk"))
+
+
+@api_view
+def api_student_upcoming_exams(request):
+    """Exams of the current class from today on, soonest first (undated last)."""
+    student = _api_student(request)
+    current = (
+        StudentEnrollment.objects.filter(student=student, status="current")
+        .values("class_level_id", "academic_year_id")
+        .first()
+    )
+    if not current:
+        return keyset_page(request, Exam.objects.none(), STUDENT_EXAM_API_FIELDS, ("exam_date", "pk"))
+    exams = Exam.objects.filter(**current).filter(Q(exam_date__gte=date.today()) | Q(exam_date__isnull=True))
+    return keyset_page(request, exams, STUDENT_EXAM_API_FIELDS, ("exam_date", "pk"))
 
 
 def fallback_to_home(request, *args, **kwargs):
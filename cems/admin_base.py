@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+
+# Relations each model's __str__ follows. Changelists, autocomplete results and related
+# columns join them up front instead of issuing one query per row.
+STR_RELATED = {
+    "accounts.teacherprofile": ("user",),
+    "accounts.studentprofile": ("user",),
+    "academics.classlevel": ("academic_year",),
+    "academics.subject": ("class_level",),
+    "academics.teacherassignment": ("teacher", "class_level", "subject"),
+    "academics.studentenrollment": ("student", "class_level", "academic_year"),
+    "academics.rollovercheckpoint": ("class_level", "target_year"),
+    "academics.enrollmentrollup": ("class_level", "academic_year"),
+    "exams.exam": ("class_level", "subject"),
+    "exams.examresult": ("exam", "student"),
+    "exams.meritrank": ("student",),
+}
+
+
+def large_table_threshold():
+    return getattr(settings, "ADMIN_LARGE_TABLE_ROWS", 100000)
+
+
+def str_related_paths(model, prefix=""):
+    """select_related() paths that rendering ``model`` instances as text needs."""
+    paths = []
+    for name in STR_RELATED.get(model._meta.label_lower, ()):
+        related = model._meta.get_field(name).related_model
+        paths.append(f"{prefix}{name}")
+        paths.extend(str_related_paths(related, f"{prefix}{name}__"))
+    return paths
+
+
+def estimated_row_count(queryset):
+    """
+    The planner's row estimate for the queryset's table on PostgreSQL (updated by
+    VACUUM/ANALYZE), or None where no cheap estimate exists.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 means the table was never analyzed.
+    return row[0] if row and row[0] >= 0 else None
+
+
+class LargeTablePaginator(Paginator):
+    """
+    Paginator for tables too big to COUNT(*) on every changelist hit.
+
+    An unfiltered listing of a table past ``ADMIN_LARGE_TABLE_ROWS`` reports the
+    planner's estimate as its count. On such tables, pages past the first read only the
+    primary keys at their offset (an index-only scan) and then load the page's rows,
+    with their joins, by key.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, "query") and not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate >= large_table_threshold():
+                return estimate
+        return super().count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        queryset = self.object_list
+        if number == 1 or self.count < large_table_threshold() or not hasattr(queryset, "query"):
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        keys = list(queryset.values_list("pk", flat=True)[bottom : bottom + self.per_page])
+        rows = queryset.order_by().in_bulk(keys)
+        return self._get_page([rows[key] for key in keys if key in rows], number, self)
+
+
+class StrRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """
+    RelatedFieldListFilter whose choices join what their text needs (``STR_RELATED``),
+    so a filter listing classes or subjects does not query once per choice.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        related_model = field.related_model
+        queryset = related_model._default_manager.complex_filter(field.get_limit_choices_to()).select_related(
+            *str_related_paths(related_model)
+        )
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        attname = field.remote_field.get_related_field().attname
+        return [(getattr(obj, attname), str(obj)) for obj in queryset]
+
+
+class CemsModelAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin base for the project's admins:
+
+    - changelists join every related column in ``list_display`` (and what its text
+      needs) instead of querying per row, and so do their related-field filters;
+    - large tables get estimated counts and key-first paging (``LargeTablePaginator``);
+    - foreign keys to models whose admin has ``search_fields`` use autocomplete widgets
+      instead of a select listing every row.
+    """
+
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def get_ordering(self, request):
+        # A stable order keeps autocomplete pages consistent; changelists already
+        # fall back to -pk.
+        return super().get_ordering(request) or self.model._meta.ordering or ("-pk",)
+
+    def get_queryset(self, request):
+        # Joined here rather than left to the changelist (which skips its own
+        # list_select_related once any is set) so autocomplete results, which print each
+        # row as text, get them as well.
+        queryset = super().get_queryset(request)
+        paths = self.get_list_select_related(request)
+        if paths is True:
+            return queryset.select_related()
+        return queryset.select_related(*paths) if paths else queryset
+
+    def get_list_select_related(self, request):
+        if self.list_select_related:
+            return self.list_select_related
+        paths = str_related_paths(self.model)
+        for name in self.get_list_display(request):
+            if not isinstance(name, str) or name == "__str__":
+                continue
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.is_relation and (field.many_to_one or field.one_to_one) and field.concrete:
+                paths.append(name)
+                paths.extend(str_related_paths(field.related_model, f"{name}__"))
+        return list(dict.fromkeys(paths))
+
+    def get_list_filter(self, request):
+        list_filter = []
+        for item in super().get_list_filter(request):
+            if isinstance(item, str) and LOOKUP_SEP not in item:
+                try:
+                    field = self.model._meta.get_field(item)
+                except FieldDoesNotExist:
+                    field = None
+                if field is not None and field.many_to_one and str_related_paths(field.related_model):
+                    item = (item, StrRelatedFieldListFilter)
+            list_filter.append(item)
+        return list_filter
+
+    def get_autocomplete_fields(self, request):
+        if self.autocomplete_fields:
+            return self.autocomplete_fields
+        return tuple(
+            field.name
+            for field in self.model._meta.get_fields()
+            if field.is_relation
+            and field.concrete
+            and field.editable
+            and (field.many_to_one or field.one_to_one or field.many_to_many)
+            and self.admin_site.is_registered(field.related_model)
+            and self.admin_site.get_model_admin(field.related_model).search_fields
+        )
@@ -0,0 +1,165 @@
+import base64
+import binascii
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.http import JsonResponse
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_response(payload, status=200):
+    """Compact JSON: no whitespace between separators."""
+    return JsonResponse(payload, status=status, json_dumps_params={"separators": (",", ":")})
+
+
+def api_view(view):
+    """
+    GET-only JSON endpoint for signed-in users. Anonymous requests get a 401 instead of the
+    login redirect, and an ApiError raised by the view becomes ``{"error": ...}``.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return api_response({"error": "Method not allowed."}, status=405)
+        if not request.user.is_authenticated:
+            return api_response({"error": "Authentication required."}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as exc:
+            return api_response({"error": exc.message}, status=exc.status)
+
+    return wrapper
+
+
+def page_size(request):
+    default = getattr(settings, "API_PAGE_SIZE", 50)
+    maximum = getattr(settings, "API_MAX_PAGE_SIZE", 200)
+    raw = request.GET.get("limit")
+    if not raw:
+        return default
+    try:
+        size = int(raw)
+    except ValueError:
+        raise ApiError("limit must be a whole number.")
+    if size < 1:
+        raise ApiError("limit must be at least 1.")
+    return min(size, maximum)
+
+
+def selected_columns(request, columns):
+    """
+    The (name, lookup) pairs named in ``?fields=a,b`` in the order given, or all of them.
+    """
+    raw = request.GET.get("fields")
+    if not raw:
+        return list(columns)
+    lookups = dict(columns)
+    names = [name for name in (part.strip() for part in raw.split(",")) if name]
+    unknown = [name for name in names if name not in lookups]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(lookups)}.")
+    return [(name, lookups[name]) for name in dict.fromkeys(names)]
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, length: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        raise ApiError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise ApiError("Invalid cursor.")
+    return values
+
+
+def _nullable(model, lookup) -> bool:
+    """Whether ``lookup`` can read NULL, via a nullable column or an optional join."""
+    for part in lookup.split(LOOKUP_SEP):
+        if part == "pk":
+            return False
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return True  # an annotation or filtered relation; assume the worst
+        if field.null or not field.concrete:
+            return True
+        model = field.related_model
+    return False
+
+
+def _after(keys, values) -> Q:
+    """
+    Rows that sort strictly after ``values`` under ``keys`` ((lookup, descending, nullable)
+    triples, NULLs last in either direction): a lexicographic row comparison spelled out
+    so every database can use the ordering index.
+    """
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (lookup, descending, nullable), value in zip(keys, values):
+        if value is None:
+            beyond = Q(pk__in=[])  # NULLs come last, so nothing sorts after a NULL here
+            same = Q(**{f"{lookup}__isnull": True})
+        else:
+            beyond = Q(**{f"{lookup}__{'lt' if descending else 'gt'}": value})
+            if nullable:
+                beyond |= Q(**{f"{lookup}__isnull": True})
+            same = Q(**{lookup: value})
+        condition |= equal & beyond
+        equal &= same
+    return condition
+
+
+def keyset_page(request, queryset, columns, ordering):
+    """
+    One page of ``queryset`` as a JSON response of ``{"results": [...], "next": cursor}``.
+
+    ``columns`` are (name, lookup) pairs read with a single ``values()`` query; clients pick
+    a subset with ``?fields=``. ``ordering`` must end in a unique lookup (usually "pk").
+    Pages continue from ``?cursor=`` (the last row's ordering values) instead of an
+    OFFSET, so every page costs the same and rows do not shift when others are added.
+    """
+    selected = selected_columns(request, columns)
+    limit = page_size(request)
+    keys = [
+        (lookup.lstrip("-"), lookup.startswith("-"), _nullable(queryset.model, lookup.lstrip("-")))
+        for lookup in ordering
+    ]
+    queryset = queryset.order_by(
+        *(
+            F(lookup).desc(nulls_last=nullable or None) if descending else F(lookup).asc(nulls_last=nullable or None)
+            for lookup, descending, nullable in keys
+        )
+    )
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            queryset = queryset.filter(_after(keys, decode_cursor(cursor, len(keys))))
+        except (ValidationError, ValueError, TypeError):
+            raise ApiError("Invalid cursor.")
+
+    key_lookups = [lookup for lookup, _, _ in keys]
+    rows = list(queryset.values(*dict.fromkeys([lookup for _, lookup in selected] + key_lookups))[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return api_response(
+        {
+            "results": [{name: row[lookup] for name, lookup in selected} for row in rows],
+            "next": encode_cursor(rows[-1][lookup] for lookup in key_lookups) if has_more else None,
+        }
+    )
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def gather_queries_workers():
+    return getattr(settings, "GATHER_QUERIES_WORKERS", 8)
+
+
+def _query_executor():
+    """
+    One process-wide pool for gather_queries. Its threads outlive the request (and the
+    event loop async_to_sync creates per call), so with CONN_MAX_AGE their connections
+    are reused instead of opened for every call.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=gather_queries_workers(), thread_name_prefix="gather_queries"
+                )
+    return _executor
+
+
+def _on_own_connection(call):
+    def run():
+        try:
+            return call()
+        finally:
+            # Worker threads live outside the request cycle that normally recycles
+            # connections, so honour CONN_MAX_AGE here.
+            close_old_connections()
+
+    return run
+
+
+async def gather_queries(*calls):
+    """
+    Run zero-argument callables, each a query or two, concurrently and return their
+    results in order.
+
+    The async ORM (aget, async for, ...) runs every query on one shared thread, one after
+    another. Here each call runs on a thread of a small dedicated pool, and so on that
+    thread's own database connection, so independent round trips overlap. Calls must
+    not depend on each other or on an open transaction.
+    """
+    executor = _query_executor()
+    return await asyncio.gather(
+        *(sync_to_async(_on_own_connection(call), thread_sensitive=False, executor=executor)() for call in calls)
+    )
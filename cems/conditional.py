@@ -0,0 +1,61 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def page_etag(request, *parts) -> str:
+    """
+    ETag of a signed-in page from the validator ``parts`` (counts, latest ``updated_at``,
+    version tokens) plus what every such page embeds: the user's name and the CSRF
+    secret its forms were rendered with, so a cached copy never posts a stale token.
+    """
+    user = request.user
+    seed = [user.pk, user.get_username(), request.COOKIES.get(settings.CSRF_COOKIE_NAME), *parts]
+    return quote_etag(hashlib.md5(repr(seed).encode(), usedforsecurity=False).hexdigest())
+
+
+def latest(*stamps):
+    """The newest of these datetimes, ignoring None (e.g. the Max() of no rows)."""
+    return max((stamp for stamp in stamps if stamp is not None), default=None)
+
+
+def _timestamp(last_modified):
+    return timegm(last_modified.utctimetuple()) if last_modified else None
+
+
+def not_modified(request, etag, last_modified):
+    """
+    A 304 response when the client's copy of a GET still matches ``etag`` /
+    ``last_modified`` (a datetime or None), else None.
+
+    A page with flash messages waiting is always rebuilt, or they would never be shown.
+    """
+    if request.method not in ("GET", "HEAD") or len(messages.get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None and response.status_code == 304:
+        return with_validators(response, etag, last_modified)
+    return None
+
+
+def with_validators(response, etag, last_modified):
+    """
+    Attach ETag/Last-Modified to a successful page. Browsers are told to revalidate every
+    time, so edits show up at once.
+    """
+    if response.status_code not in (200, 304):
+        return response
+    response.headers.setdefault("ETag", etag)
+    if last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(_timestamp(last_modified)))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(request, etag, last_modified, build):
+    """Answer 304 if the client's copy is current, else ``build()`` the page with validators."""
+    return not_modified(request, etag, last_modified) or with_validators(build(), etag, last_modified)
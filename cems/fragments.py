@@ -0,0 +1,54 @@
+import hashlib
+import uuid
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+VERSION_KEY = "fragment_version:{}:{}"
+
+
+def fragment_timeout():
+    return getattr(settings, "DASHBOARD_FRAGMENT_CACHE_SECONDS", 3600)
+
+
+def fragment_cache():
+    """The cache {% cache %} writes to: 'template_fragments' if configured, else 'default'."""
+    try:
+        return caches["template_fragments"]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def fragment_versions(scope: str, ids: Iterable[int]) -> dict:
+    """
+    Current version token of each object in ``scope`` ("exam", "class"), {id: token}.
+    Tokens rather than counters, so an evicted version can never come back as a value an
+    old fragment was cached under.
+    """
+    cache = caches["default"]
+    keys = {VERSION_KEY.format(scope, pk): pk for pk in ids}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        token = uuid.uuid4().hex
+        found[key] = token if cache.add(key, token, None) else cache.get(key, token)
+    return {pk: found[key] for key, pk in keys.items()}
+
+
+def bump_fragment_versions(scope: str, ids: Iterable[Optional[int]]):
+    """Give these objects new versions once the transaction commits, orphaning their fragments."""
+    keys = [VERSION_KEY.format(scope, pk) for pk in set(ids) if pk]
+    if keys:
+        transaction.on_commit(lambda: caches["default"].set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+def fragment_vary(*parts) -> str:
+    """One short vary-on value for {% cache %} from any number of ids and versions."""
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def fragment_cached(name: str, vary_on) -> bool:
+    return fragment_cache().has_key(make_template_fragment_key(name, [vary_on]))
@@ -0,0 +1,159 @@
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+STICKY_SESSION_KEY = "_cems_primary_until"
+
+# Apps whose reads must never lag behind their writes.
+PRIMARY_ONLY_APPS = {"sessions"}
+
+_state = Local()
+
+
+def replica_aliases():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def sticky_seconds():
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 15)
+
+
+class _ReadBlock:
+    """
+    One replica_reads() block. Shared by reference with the worker threads the block
+    starts (asgiref carries Local storage into sync_to_async calls), so a write on any of
+    their connections is seen by the block and by the blocks around it.
+    """
+
+    def __init__(self, replica_reads, parent):
+        self.replica_reads = replica_reads
+        self.wrote = False
+        self.parent = parent
+
+    def mark_written(self):
+        block = self
+        while block is not None:
+            block.wrote = True
+            block = block.parent
+
+
+def _current_block():
+    return getattr(_state, "block", None)
+
+
+def replica_reads_allowed():
+    block = _current_block()
+    return block is not None and block.replica_reads and not block.wrote
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Let reads in this block go to a replica. Only request handling turns this on (see
+    ReplicaRoutingMiddleware); scripts and commands read from the primary.
+
+    ``replica_reads(False)`` (also usable as a decorator) sends a block back to the
+    primary. Loaders that fill a cache or write what they read use it: right after an
+    invalidation a lagging replica would otherwise hand them the old rows, which would
+    then be stored under the new version.
+    """
+    parent = _current_block()
+    _state.block = _ReadBlock(enabled, parent)
+    try:
+        yield
+    finally:
+        _state.block = parent
+
+
+def wrote_in_block():
+    block = _current_block()
+    return block is not None and block.wrote
+
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def track_primary_writes(execute, sql, params, many, context):
+    """
+    Execute wrapper on the primary connection that notes data changes, after which the
+    rest of the block reads from the primary too. (db_for_write alone is no signal: Django
+    also asks it when assigning related objects.)
+    """
+    if sql.lstrip()[:6].upper() in WRITE_STATEMENTS:
+        block = _current_block()
+        if block is not None:
+            block.mark_written()
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created, dispatch_uid="cems.routers.install_write_tracking")
+def install_write_tracking(sender, connection, **kwargs):
+    """
+    Track writes on every primary connection as it opens, including the ones
+    gather_queries' worker threads open, not just the request thread's.
+    """
+    if connection.alias == DEFAULT_DB_ALIAS and track_primary_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_primary_writes)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes, migrations and anything inside transaction.atomic use ``default``. Reads go
+    to one of ``DATABASE_REPLICAS`` only while replica reads are allowed and nothing has
+    been written yet in the current block; after a write, reads follow it to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if (
+            not replicas
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or not replica_reads_allowed()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db not in replica_aliases()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Read from replicas during GET/HEAD/OPTIONS requests, except for a session that wrote
+    in the last ``REPLICA_STICKY_SECONDS``, so a teacher sees marks they just saved.
+    Any request that writes renews that window. Must come after SessionMiddleware.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, "session", None)
+        sticky = session is not None and session.get(STICKY_SESSION_KEY, 0) > time.time()
+        enabled = bool(replica_aliases()) and request.method in self.SAFE_METHODS and not sticky
+
+        with replica_reads(enabled):
+            response = self.get_response(request)
+            wrote = wrote_in_block()
+        if wrote and session is not None and replica_aliases():
+            session[STICKY_SESSION_KEY] = time.time() + sticky_seconds()
+        return response
@@ -41,14 +41,17 @@ INSTALLED_APPS = [
     'academics',
     'accounts',
     'exams',
+    'notifications',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'cems.routers.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +88,32 @@ DATABASES = {
         'PASSWORD': 'masumjia',
         'HOST': '127.0.0.1',
         'PORT': '5432',
+        #Keep connections open between requests (and on gather_queries' worker threads)
+        #instead of reconnecting every time; check them before reuse after an error.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+#Read replicas: extra DATABASES aliases that stream from 'default', e.g.
+#DATABASES['replica'] = {**DATABASES['default'], 'HOST': '10.0.0.12', 'TEST': {'MIRROR': 'default'}}
+#GET requests read from them; writes, transactions and recently-writing sessions use 'default'.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['cems.routers.PrimaryReplicaRouter']
+
+#Read replicas: seconds a session keeps reading from 'default' after it wrote
+REPLICA_STICKY_SECONDS = 15
+
+#Async dashboards: threads (and so persistent connections) gather_queries runs queries on
+GATHER_QUERIES_WORKERS = 8
+
+#Cache: must be shared by every web worker and management command. Dashboards, landing counters,
+#session roles, subject families and template fragments are invalidated through it, and a
+#per-process cache (the LocMemCache default) would keep serving stale copies in the other processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
     }
 }
 
@@ -146,3 +175,42 @@ LOGIN_URL = 'accounts:login'
 LOGOUT_REDIRECT_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'accounts:role_redirect'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'no-reply@cems.local'
+
+#Email outbox: messages per worker batch (one SMTP connection each), delivery attempts before
+#giving up, and the first retry delay in seconds (doubled per attempt, capped at an hour)
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_BASE_SECONDS = 30
+NOTIFY_ON_RESULT_PUBLISH = True
+
+#Exam statistics: minimum percentage of max marks counted as a pass
+EXAM_PASS_PERCENTAGE = 40
+
+#Merit lists: rank subject/class totals by mean percentage per exam instead of summed marks
+MERIT_LIST_WEIGHTED = False
+
+#Student dashboard: seconds a cached per-student payload may live (it is also invalidated on writes)
+STUDENT_DASHBOARD_CACHE_SECONDS = 300
+
+#Landing page counters: cache lifetime in seconds; signals keep them current in between recounts
+LANDING_COUNTERS_CACHE_SECONDS = 600
+
+#Student search: most matches returned by the mark-entry autocomplete
+STUDENT_SEARCH_LIMIT = 10
+
+#Admin: tables past this many rows list with estimated counts and key-first paging
+ADMIN_LARGE_TABLE_ROWS = 100000
+
+#Subject admin: seconds the per-year class/subject family metadata stays cached (class and subject saves clear it)
+SUBJECT_FAMILY_CACHE_SECONDS = 3600
+
+#Dashboards: serve the async student/teacher dashboards and exam results (worth it under ASGI, e.g. uvicorn cems.asgi:application)
+ASYNC_DASHBOARDS = False
+
+#Read API: rows per page by default and the most a client may ask for with ?limit=
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+#Dashboards: seconds a rendered table (teacher classes/exams, student results history) stays cached; edits re-render it sooner
+DASHBOARD_FRAGMENT_CACHE_SECONDS = 3600
@@ -0,0 +1,54 @@
+// Subject admin: when a class is chosen, load the subjects already used by its sections
+// (same class name and academic year) into the "Use existing subject" select.
+(function () {
+    "use strict";
+
+    const cache = {};
+
+    function fillReuseSelect(select, classId, subjects) {
+        const current = select.value;
+        select.innerHTML = "";
+        select.appendChild(new Option("---------", ""));
+        subjects
+            .filter(function (subject) { return String(subject.class_id) !== String(classId); })
+            .forEach(function (subject) {
+                const label = subject.code ? subject.name + " (" + subject.code + ")" : subject.name;
+                select.appendChild(new Option(label, subject.id, false, String(subject.id) === current));
+            });
+    }
+
+    function loadFamily(classSelect, reuseSelect) {
+        const classId = classSelect.value;
+        if (!classId) {
+            fillReuseSelect(reuseSelect, "", []);
+            return;
+        }
+        if (!cache[classId]) {
+            const url = classSelect.dataset.familiesUrl + "?class_level=" + encodeURIComponent(classId);
+            cache[classId] = fetch(url, {credentials: "same-origin"}).then(function (response) {
+                return response.ok ? response.json() : {subjects: []};
+            });
+        }
+        cache[classId].then(function (family) {
+            fillReuseSelect(reuseSelect, classId, family.subjects || []);
+        });
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        const classSelect = document.getElementById("id_class_level");
+        const reuseSelect = document.getElementById("id_reuse_subject");
+        if (!classSelect || !reuseSelect || !classSelect.dataset.familiesUrl) {
+            return;
+        }
+        const onChange = function () { loadFamily(classSelect, reuseSelect); };
+        // The class field is an autocomplete widget, which reports changes through jQuery.
+        if (window.django && window.django.jQuery) {
+            window.django.jQuery(classSelect).on("change", onChange);
+        } else {
+            classSelect.addEventListener("change", onChange);
+        }
+        if (classSelect.value && reuseSelect.options.length <= 1) {
+            onChange();
+        }
+    });
+})();
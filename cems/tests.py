@@ -0,0 +1,202 @@
+import threading
+import time
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from academics.models import AcademicYear, ClassLevel, RolloverCheckpoint, StudentEnrollment, Subject, TeacherAssignment
+from accounts.models import StudentProfile, TeacherProfile
+from cems.admin_base import CemsModelAdmin
+from cems.concurrency import gather_queries
+from cems.routers import (
+    STICKY_SESSION_KEY,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+    replica_reads,
+    track_primary_writes,
+)
+from exams.models import Exam, ExamResult, MeritRank
+from notifications.models import OutboxMessage
+
+
+def populate(year, index):
+    """One more row (or a few) for every model with a CemsModelAdmin changelist."""
+    AcademicYear.objects.create(name=f"Past {index}", start_date=date(year.start_date.year - 1 - index, 1, 1))
+    class_level = ClassLevel.objects.create(name=f"Class {index + 1}", section="A", academic_year=year)
+    subject = Subject.objects.create(name="Math", class_level=class_level)
+    teacher = TeacherProfile.objects.create(user=User.objects.create_user(f"teacher{index}"))
+    TeacherAssignment.objects.create(teacher=teacher, class_level=class_level, subject=subject, academic_year=year)
+    exam = Exam.objects.create(
+        title="Midterm", class_level=class_level, subject=subject, academic_year=year, assigned_teacher=teacher
+    )
+    RolloverCheckpoint.objects.create(class_level=class_level, target_year=year, status="done")
+    for number in range(3):
+        student = StudentProfile.objects.create(user=User.objects.create_user(f"student{index}_{number}"))
+        StudentEnrollment.objects.create(student=student, class_level=class_level, academic_year=year)
+        ExamResult.objects.create(exam=exam, student=student, marks_obtained=50 + number)
+        MeritRank.objects.create(
+            scope="exam",
+            academic_year=year,
+            class_level=class_level,
+            exam=exam,
+            student=student,
+            score=50 + number,
+            rank=3 - number,
+            dense_rank=3 - number,
+            percentile=100 * number / 3,
+            cohort_size=3,
+        )
+        OutboxMessage.objects.create(to=f"student{index}_{number}@example.com", subject="Results", body="Published.")
+
+
+class CemsChangelistQueryTests(TestCase):
+    """Every CemsModelAdmin changelist runs the same queries however many rows it lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.year = AcademicYear.objects.create(name="Current", start_date=date(date.today().year, 1, 1), is_current=True)
+        cls.admin_user = User.objects.create_superuser("root")
+
+    def changelist_queries(self):
+        counts = {}
+        for model, model_admin in admin.site._registry.items():
+            if not isinstance(model_admin, CemsModelAdmin):
+                continue
+            url = reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist")
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[model._meta.label] = len(queries)
+        return counts
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.admin_user)
+        populate(self.year, 1)
+        # The first request also warms per-process caches (content types, sessions).
+        self.changelist_queries()
+        few = self.changelist_queries()
+        populate(self.year, 2)
+        populate(self.year, 3)
+        many = self.changelist_queries()
+
+        self.assertGreaterEqual(len(few), 12)
+        for label, count in few.items():
+            with self.subTest(changelist=label):
+                self.assertEqual(many[label], count)
+
+
+class GatherQueriesTests(SimpleTestCase):
+    def test_results_in_order_on_the_shared_pool(self):
+        def call(value):
+            return lambda: (value, threading.current_thread().name)
+
+        first = async_to_sync(gather_queries)(call(1), call(2), call(3))
+        second = async_to_sync(gather_queries)(call(4))
+
+        self.assertEqual([value for value, _ in first + second], [1, 2, 3, 4])
+        # The same threads serve every call, so their connections can be kept open.
+        self.assertTrue(all(name.startswith("gather_queries") for _, name in first + second))
+
+
+def run_statement(sql):
+    """Pass ``sql`` through the write tracker the way the primary connection would."""
+    return track_primary_writes(lambda *args: None, sql, None, False, {})
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_STICKY_SECONDS=15)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def test_reads_use_the_primary_outside_replica_blocks(self):
+        self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_reads_follow_a_write_to_the_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(User), "replica")
+            run_statement("SELECT 1")
+            self.assertEqual(self.router.db_for_read(User), "replica")
+            run_statement("  update auth_user SET first_name = 'A'")
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(User), "replica")
+
+    def test_primary_only_apps_and_writes_use_the_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Session), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_write(User), DEFAULT_DB_ALIAS)
+
+    def test_write_on_a_worker_thread_sends_later_reads_to_the_primary(self):
+        with replica_reads():
+            async_to_sync(gather_queries)(lambda: run_statement("INSERT INTO exams_examstatistics DEFAULT VALUES"))
+
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_write_in_a_primary_block_counts_for_the_request(self):
+        with replica_reads():
+            with replica_reads(False):
+                run_statement("UPDATE exams_examstatistics SET pass_count = 0")
+
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_every_new_primary_connection_tracks_writes(self):
+        wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+        # As when a worker thread opens its connection, and again after it reconnects.
+        connection_created.send(sender=type(wrapper), connection=wrapper)
+        connection_created.send(sender=type(wrapper), connection=wrapper)
+
+        self.assertEqual(wrapper.execute_wrappers, [track_primary_writes])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, "accounts"))
+        self.assertFalse(self.router.allow_migrate("replica", "accounts"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_STICKY_SECONDS=15)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        wrappers = connections[DEFAULT_DB_ALIAS].execute_wrappers
+        self.addCleanup(wrappers.__setitem__, slice(None), list(wrappers))
+        self.session = {}
+        self.reads = []
+
+    def request(self, method, writes=False):
+        def view(request):
+            if writes:
+                run_statement("INSERT INTO exams_examresult DEFAULT VALUES")
+            self.reads.append(PrimaryReplicaRouter().db_for_read(User))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)("/")
+        request.session = self.session
+        ReplicaRoutingMiddleware(view)(request)
+        return self.reads[-1]
+
+    def test_get_reads_from_a_replica(self):
+        self.assertEqual(self.request("get"), "replica")
+        self.assertNotIn(STICKY_SESSION_KEY, self.session)
+
+    def test_read_after_write_sticks_to_the_primary(self):
+        self.assertEqual(self.request("post", writes=True), DEFAULT_DB_ALIAS)
+        self.assertGreater(self.session[STICKY_SESSION_KEY], time.time())
+
+        self.assertEqual(self.request("get"), DEFAULT_DB_ALIAS)
+
+    def test_stickiness_expires(self):
+        self.request("post", writes=True)
+        self.session[STICKY_SESSION_KEY] = time.time() - 1
+
+        self.assertEqual(self.request("get"), "replica")
+
+    def test_get_that_writes_reads_the_primary_afterwards(self):
+        self.assertEqual(self.request("get", writes=True), DEFAULT_DB_ALIAS)
+        self.assertIn(STICKY_SESSION_KEY, self.session)
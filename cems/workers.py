@@ -0,0 +1,16 @@
+import os
+
+
+def init_django_worker(settings_module):
+    """
+    ProcessPoolExecutor initializer: spawned workers (Windows/macOS) do not inherit the
+    configured Django settings, so set them up before the first task runs.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+
+
+def settings_module_name():
+    return os.environ.get("DJANGO_SETTINGS_MODULE", "cems.settings")
@@ -1,20 +1,79 @@
-from django.contrib import admin
-from .models import Exam, ExamResult
+from collections import defaultdict
+
+from django.contrib import admin, messages
+from academics.exports import RESULT_EXPORT_COLUMNS, export_csv_action
+from .merit import refresh_merit_lists
+from .models import Exam, ExamResult, MeritRank
+from .services import set_results_published
+from cems.admin_base import CemsModelAdmin
 
 
 def all_model_fields(model_class):
     return [field.name for field in model_class._meta.fields]
 
 
+class ResultPublishingAdminMixin:
+    """
+    Actions declared with ``permissions=["publish"]`` bulk-update results and can queue
+    emails, so they need change permission on exam results, whichever changelist they
+    are offered on.
+    """
+
+    def has_publish_permission(self, request):
+        return request.user.has_perm("exams.change_examresult")
+
+
 @admin.register(Exam)
-class ExamAdmin(admin.ModelAdmin):
+class ExamAdmin(ResultPublishingAdminMixin, CemsModelAdmin):
     list_display = all_model_fields(Exam)
     list_filter = ("academic_year", "class_level", "subject")
     search_fields = ("title", "subject__name", "class_level__name", "id")
+    actions = ("publish_results", "unpublish_results", "recompute_merit_lists")
+
+    @admin.action(permissions=["publish"], description="Publish all results of selected exams")
+    def publish_results(self, request, queryset):
+        changed = set_results_published(ExamResult.objects.filter(exam__in=queryset), True, request.user)
+        self.message_user(request, f"Published {changed} results.", level=messages.SUCCESS)
+
+    @admin.action(permissions=["publish"], description="Unpublish all results of selected exams")
+    def unpublish_results(self, request, queryset):
+        changed = set_results_published(ExamResult.objects.filter(exam__in=queryset), False)
+        self.message_user(request, f"Withdrew {changed} results.", level=messages.SUCCESS)
+
+    def recompute_merit_lists(self, request, queryset):
+        classes_by_year = defaultdict(set)
+        for exam in queryset.select_related("academic_year"):
+            classes_by_year[exam.academic_year].add(exam.class_level_id)
+        for year, class_ids in classes_by_year.items():
+            counts = refresh_merit_lists(year, class_ids=sorted(class_ids))
+            self.message_user(
+                request,
+                f"{year}: ranked {counts.get('class', 0)} students across {len(class_ids)} classes.",
+                level=messages.INFO,
+            )
+    recompute_merit_lists.short_description = "Recompute merit lists for the classes of selected exams"
 
 
 @admin.register(ExamResult)
-class ExamResultAdmin(admin.ModelAdmin):
+class ExamResultAdmin(ResultPublishingAdminMixin, CemsModelAdmin):
     list_display = all_model_fields(ExamResult)
     list_filter = ("published", "attendance")
     search_fields = ("exam__title", "student__student_id", "student__user__username", "id")
+    actions = (export_csv_action(RESULT_EXPORT_COLUMNS, "exam-results.csv"), "publish_selected", "unpublish_selected")
+
+    @admin.action(permissions=["publish"], description="Publish selected results")
+    def publish_selected(self, request, queryset):
+        changed = set_results_published(queryset, True, request.user)
+        self.message_user(request, f"Published {changed} results.", level=messages.SUCCESS)
+
+    @admin.action(permissions=["publish"], description="Unpublish selected results")
+    def unpublish_selected(self, request, queryset):
+        changed = set_results_published(queryset, False)
+        self.message_user(request, f"Withdrew {changed} results.", level=messages.SUCCESS)
+
+
+@admin.register(MeritRank)
+class MeritRankAdmin(CemsModelAdmin):
+    list_display = all_model_fields(MeritRank)
+    list_filter = ("scope", "academic_year", "class_level")
+    search_fields = ("student__student_id", "student__user__username", "exam__title", "subject__name", "id")
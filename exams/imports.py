@@ -0,0 +1,267 @@
+import csv
+import io
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from academics.models import ClassLevel, StudentEnrollment
+from exams.models import Exam
+from exams.services import clean_attendance, clean_marks, upsert_exam_results
+from exams.statistics import refresh_exam_statistics
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_ERRORS_DIR = "import_errors"
+
+HEADER_ALIASES = {
+    "student_id": "student_id",
+    "student id": "student_id",
+    "id": "student_id",
+    "roll": "roll_number",
+    "roll_number": "roll_number",
+    "roll number": "roll_number",
+    "roll no": "roll_number",
+    "marks": "marks",
+    "marks_obtained": "marks",
+    "marks obtained": "marks",
+    "score": "marks",
+    "attendance": "attendance",
+    "section": "section",
+}
+
+
+def error_file_max_age():
+    return getattr(settings, "IMPORT_ERROR_FILE_MAX_AGE", 24 * 60 * 60)
+
+
+class MarksImportError(Exception):
+    """Raised when an uploaded file cannot be read as a marks sheet at all."""
+
+
+def _iter_csv_rows(upload):
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise MarksImportError(f"Could not read CSV file: {exc}")
+    finally:
+        text.detach()
+
+
+def _iter_xlsx_rows(upload):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise MarksImportError("XLSX import needs openpyxl installed; upload a CSV instead.")
+    try:
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    except Exception as exc:
+        raise MarksImportError(f"Could not read XLSX file: {exc}")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ["" if cell is None else str(cell) for cell in row]
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(upload):
+    """
+    Yield each row of an uploaded CSV/XLSX as a list of strings without loading the file.
+    """
+    name = (upload.name or "").lower()
+    if name.endswith(".xlsx"):
+        return _iter_xlsx_rows(upload)
+    if name.endswith(".csv") or name.endswith(".txt"):
+        return _iter_csv_rows(upload)
+    raise MarksImportError("Upload a .csv or .xlsx file.")
+
+
+def _header_map(header):
+    columns = {}
+    for index, raw in enumerate(header):
+        key = HEADER_ALIASES.get((raw or "").strip().lower())
+        if key and key not in columns:
+            columns[key] = index
+    if "marks" not in columns:
+        raise MarksImportError("The header row needs a 'marks' column.")
+    if "student_id" not in columns and "roll_number" not in columns:
+        raise MarksImportError("The header row needs a 'student_id' or 'roll_number' column.")
+    return columns
+
+
+def _roster_lookups(exam: Exam):
+    by_student_id = {}
+    by_roll = {}
+    for student_pk, student_code, roll_number in StudentEnrollment.objects.filter(
+        class_level_id=exam.class_level_id, academic_year_id=exam.academic_year_id
+    ).values_list("student_id", "student__student_id", "roll_number"):
+        if student_code:
+            by_student_id[student_code.strip().lower()] = student_pk
+        if roll_number is not None:
+            by_roll[roll_number] = student_pk
+    return by_student_id, by_roll
+
+
+def _has_other_sections(exam: Exam) -> bool:
+    """Whether the exam's class shares its name with other sections, so roll numbers repeat."""
+    class_level = exam.class_level
+    return (
+        ClassLevel.objects.filter(academic_year_id=class_level.academic_year_id, name__iexact=class_level.name)
+        .exclude(pk=class_level.pk)
+        .exists()
+    )
+
+
+def _sibling_student_ids(exam: Exam) -> set:
+    """Student IDs enrolled, in the exam's year, in the other sections of the exam's class."""
+    class_level = exam.class_level
+    codes = (
+        StudentEnrollment.objects.filter(
+            academic_year_id=exam.academic_year_id,
+            class_level__academic_year_id=class_level.academic_year_id,
+            class_level__name__iexact=class_level.name,
+        )
+        .exclude(class_level_id=class_level.pk)
+        .values_list("student__student_id", flat=True)
+    )
+    return {code.strip().lower() for code in codes if code}
+
+
+def error_file_path(exam: Exam, token: str) -> Path:
+    return Path(settings.MEDIA_ROOT) / IMPORT_ERRORS_DIR / f"exam_{exam.pk}_{token}.csv"
+
+
+def _prune_error_files(exam: Exam, keep: Path):
+    """
+    Delete the exam's earlier error files, whose download link the new import replaces,
+    and any error file older than ``IMPORT_ERROR_FILE_MAX_AGE`` seconds.
+    """
+    prefix = f"exam_{exam.pk}_"
+    cutoff = time.time() - error_file_max_age()
+    for path in keep.parent.glob("exam_*.csv"):
+        if path == keep:
+            continue
+        try:
+            if path.name.startswith(prefix) or path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def import_exam_marks(exam: Exam, upload, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Stream an uploaded marks sheet into ExamResult rows for ``exam``.
+
+    Rows are resolved against the exam's roster (by student_id, or roll number), validated
+    against ``exam.max_marks`` and upserted in chunks, each in its own transaction, so
+    memory stays bounded by the roster and chunk size rather than the file. Rows for
+    another section (when a ``section`` column is present) are skipped, not rejected.
+    Roll numbers restart in every section, so when the class has sibling sections a row
+    matched by roll number alone must name its section; otherwise it is rejected rather
+    than guessed. A whole-grade file keyed by student_id needs no section column: rows
+    for students of a sibling section are skipped.
+    Rejected rows are written to a CSV error file as they are found; writing one deletes
+    the exam's earlier error files and stale ones of other exams.
+
+    Returns a dict with ``accepted``, ``rejected``, ``skipped`` and ``error_token``
+    (``None`` when nothing was rejected).
+    """
+    rows = iter_upload_rows(upload)
+    header = next(rows, None)
+    if not header:
+        raise MarksImportError("The file is empty.")
+    columns = _header_map(header)
+    by_student_id, by_roll = _roster_lookups(exam)
+    section = (exam.class_level.section or "").strip().upper()
+    rolls_ambiguous = _has_other_sections(exam)
+    sibling_student_ids = _sibling_student_ids(exam) if rolls_ambiguous and "student_id" in columns else set()
+
+    accepted = rejected = skipped = 0
+    seen = set()
+    chunk = []
+    error_token = None
+    error_handle = None
+    error_writer = None
+
+    def cell(row, key):
+        index = columns.get(key)
+        if index is None or index >= len(row):
+            return ""
+        return (row[index] or "").strip()
+
+    def reject(line_number, row, reason):
+        nonlocal rejected, error_token, error_handle, error_writer
+        rejected += 1
+        if error_writer is None:
+            error_token = uuid.uuid4().hex
+            path = error_file_path(exam, error_token)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            error_handle = open(path, "w", newline="", encoding="utf-8")
+            error_writer = csv.writer(error_handle)
+            error_writer.writerow(["line", "error"] + list(header))
+            _prune_error_files(exam, path)
+        error_writer.writerow([line_number, reason] + list(row))
+
+    def flush():
+        nonlocal accepted
+        if chunk:
+            with transaction.atomic():
+                accepted += upsert_exam_results(exam, chunk)
+            chunk.clear()
+
+    try:
+        for line_number, row in enumerate(rows, start=2):
+            if not any((value or "").strip() for value in row):
+                continue
+            row_section = cell(row, "section").upper()
+            if row_section and row_section != section:
+                skipped += 1
+                continue
+
+            student_pk = None
+            code = cell(row, "student_id").lower()
+            if code:
+                student_pk = by_student_id.get(code)
+                if student_pk is None and code in sibling_student_ids:
+                    skipped += 1
+                    continue
+            else:
+                if rolls_ambiguous and not row_section:
+                    reject(
+                        line_number,
+                        row,
+                        "Roll numbers repeat across sections; add a 'section' or 'student_id' column.",
+                    )
+                    continue
+                roll = cell(row, "roll_number")
+                if roll.isdigit():
+                    student_pk = by_roll.get(int(roll))
+            if student_pk is None:
+                reject(line_number, row, "Student is not enrolled in this class for the exam's year.")
+                continue
+            if student_pk in seen:
+                reject(line_number, row, "Duplicate row for this student; the first row was kept.")
+                continue
+
+            try:
+                marks = clean_marks(cell(row, "marks"), exam)
+                attendance = clean_attendance(cell(row, "attendance"))
+            except ValidationError as exc:
+                reject(line_number, row, "; ".join(exc.messages))
+                continue
+
+            seen.add(student_pk)
+            chunk.append((student_pk, marks, attendance))
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+    finally:
+        if accepted:
+            refresh_exam_statistics(exam.pk)
+        if error_handle is not None:
+            error_handle.close()
+
+    return {"accepted": accepted, "rejected": rejected, "skipped": skipped, "error_token": error_token}
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import AcademicYear
+from exams.merit import refresh_merit_lists
+
+
+class Command(BaseCommand):
+    help = "Rank every exam, subject and class of an academic year and store the merit lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", help="Name or id of the academic year.")
+        parser.add_argument("--class-id", type=int, action="append", dest="class_ids", help="Limit to a class (repeatable).")
+        weighting = parser.add_mutually_exclusive_group()
+        weighting.add_argument("--weighted", action="store_true", default=None, help="Rank by mean percentage across exams.")
+        weighting.add_argument("--sum", action="store_false", dest="weighted", help="Rank by total marks across exams.")
+
+    def handle(self, *args, **options):
+        value = options["year"]
+        lookup = {"pk": int(value)} if value.isdigit() else {"name": value}
+        try:
+            year = AcademicYear.objects.get(**lookup)
+        except AcademicYear.DoesNotExist:
+            raise CommandError(f"Academic year '{value}' does not exist.")
+
+        started = time.perf_counter()
+        counts = refresh_merit_lists(year, class_ids=options["class_ids"], weighted=options["weighted"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{year}: stored {counts.get('exam', 0)} exam, {counts.get('subject', 0)} subject and "
+                f"{counts.get('class', 0)} class positions in {time.perf_counter() - started:.2f}s."
+            )
+        )
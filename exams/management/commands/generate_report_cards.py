@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import AcademicYear
+from exams.report_cards import generate_report_cards
+
+
+class Command(BaseCommand):
+    help = "Render report cards (and optionally multi-year transcripts) for an academic year."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", help="Name or id of the academic year.")
+        parser.add_argument("--class-id", type=int, action="append", dest="class_ids", help="Limit to a class (repeatable).")
+        parser.add_argument("--transcripts", action="store_true", help="Also render transcripts across all years.")
+        parser.add_argument("--pdf", action="store_true", help="Also write PDFs (needs weasyprint).")
+        parser.add_argument(
+            "--include-drafts", action="store_true", help="Also count unpublished results (for a staff preview)."
+        )
+        parser.add_argument("--output", help="Output directory (default: MEDIA_ROOT/report_cards/<year>).")
+        parser.add_argument("--workers", type=int, default=None, help="Rendering processes (default: all cores).")
+
+    def handle(self, *args, **options):
+        value = options["year"]
+        lookup = {"pk": int(value)} if value.isdigit() else {"name": value}
+        try:
+            year = AcademicYear.objects.get(**lookup)
+        except AcademicYear.DoesNotExist:
+            raise CommandError(f"Academic year '{value}' does not exist.")
+
+        step = {"last": 0}
+
+        def progress(done, total):
+            if done == total or done - step["last"] >= max(total // 20, 1):
+                step["last"] = done
+                self.stdout.write(f"  {done}/{total} documents")
+
+        started = time.perf_counter()
+        report = generate_report_cards(
+            year,
+            class_ids=options["class_ids"],
+            transcripts=options["transcripts"],
+            formats=("html", "pdf") if options["pdf"] else ("html",),
+            output_dir=options["output"],
+            workers=options["workers"],
+            on_progress=progress,
+            include_drafts=options["include_drafts"],
+        )
+        for warning in report.warnings:
+            self.stdout.write(self.style.WARNING(warning))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {report.rendered} documents, {report.unchanged} unchanged, "
+                f"in {time.perf_counter() - started:.2f}s."
+            )
+        )
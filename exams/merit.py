@@ -0,0 +1,202 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from academics.models import AcademicYear
+from accounts.dashboard import invalidate_class_dashboards
+from exams.models import ExamResult, MeritRank
+
+try:
+    import numpy as np
+except ImportError:  # ranking falls back to plain Python, just slower on a whole school
+    np = None
+
+MERIT_WRITE_BATCH_SIZE = 2000
+RESULT_COLUMNS = (
+    "student_id",
+    "exam_id",
+    "exam__class_level_id",
+    "exam__subject_id",
+    "exam__max_marks",
+    "marks_obtained",
+    "attendance",
+)
+
+
+def weighted_by_default():
+    return getattr(settings, "MERIT_LIST_WEIGHTED", False)
+
+
+def rank_within_groups(groups: Sequence[int], scores: Sequence[float]) -> List[Tuple[int, int, float, int]]:
+    """
+    Rank ``scores`` (higher is better) separately inside each group.
+
+    Returns one (competition rank, dense rank, percentile, group size) tuple per input,
+    in input order. Equal scores share a rank; the percentile is the share of the group
+    scoring below, counting ties as half.
+    """
+    if not len(scores):
+        return []
+    if np is None:
+        return _rank_python(groups, scores)
+
+    groups = np.asarray(groups, dtype=np.int64)
+    scores = np.round(np.asarray(scores, dtype=float), 2)
+    order = np.lexsort((-scores, groups))
+    g, s = groups[order], scores[order]
+    positions = np.arange(len(g))
+
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    new_score = new_group | np.r_[True, s[1:] != s[:-1]]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    tie_start = np.maximum.accumulate(np.where(new_score, positions, 0))
+
+    rank = tie_start - group_start + 1
+    runs = np.cumsum(new_score)
+    dense = runs - runs[group_start] + 1
+    group_ids = np.cumsum(new_group) - 1
+    size = np.bincount(group_ids)[group_ids]
+    ties = np.bincount(runs - 1)[runs - 1]
+    below = size - (rank - 1) - ties
+    percentile = (below + ties / 2) * 100 / size
+
+    restore = np.empty_like(order)
+    restore[order] = positions
+    columns = (rank, dense, np.round(percentile, 2), size)
+    return list(zip(*(column[restore].tolist() for column in columns)))
+
+
+def _rank_python(groups, scores):
+    members = defaultdict(list)
+    for index, (group, score) in enumerate(zip(groups, scores)):
+        members[group].append((round(float(score), 2), index))
+
+    ranked = [None] * len(scores)
+    for items in members.values():
+        items.sort(key=lambda item: -item[0])
+        size = len(items)
+        ties = Counter(score for score, _ in items)
+        rank = dense = 0
+        previous = None
+        for position, (score, index) in enumerate(items, start=1):
+            if score != previous:
+                rank, dense, previous = position, dense + 1, score
+            below = size - (rank - 1) - ties[score]
+            ranked[index] = (rank, dense, round((below + ties[score] / 2) * 100 / size, 2), size)
+    return ranked
+
+
+def _aggregate(groups, students, exams, values, weighted):
+    """
+    Total ``values`` per (group, student). Weighted totals are the mean over every exam
+    seen in the group, so a missing result counts as zero either way.
+    """
+    if np is not None:
+        pairs, inverse = np.unique(np.column_stack((groups, students)), axis=0, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=values, minlength=len(pairs))
+        if weighted:
+            group_of_exam = np.unique(np.column_stack((groups, exams)), axis=0)[:, 0]
+            labels, exam_counts = np.unique(group_of_exam, return_counts=True)
+            totals = totals / exam_counts[np.searchsorted(labels, pairs[:, 0])]
+        return pairs[:, 0].tolist(), pairs[:, 1].tolist(), totals.tolist()
+
+    totals = defaultdict(float)
+    group_exams = defaultdict(set)
+    for group, student, exam, value in zip(groups, students, exams, values):
+        totals[(group, student)] += value
+        group_exams[group].add(exam)
+    keys = list(totals)
+    scores = [
+        totals[key] / len(group_exams[key[0]]) if weighted else totals[key]
+        for key in keys
+    ]
+    return [key[0] for key in keys], [key[1] for key in keys], scores
+
+
+def compute_merit_ranks(rows, weighted: bool = False) -> List[MeritRank]:
+    """
+    Build unsaved MeritRank rows from ExamResult rows shaped like RESULT_COLUMNS.
+
+    Exam lists rank present students by raw marks. Subject and class lists rank every
+    student with a result by their total marks, or with ``weighted`` by their mean
+    percentage so exams with different max marks count equally.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    students, exams, classes, subjects, max_marks, marks, attendance = zip(*rows)
+    present = [mark is not None and status != "absent" for mark, status in zip(marks, attendance)]
+    marks = [float(mark) if ok else 0.0 for mark, ok in zip(marks, present)]
+    values = [mark * 100 / top if weighted and top else mark for mark, top in zip(marks, max_marks)]
+    class_of_exam = dict(zip(exams, classes))
+    class_of_subject = dict(zip(subjects, classes))
+
+    ranks = []
+
+    def collect(scope, groups, group_students, scores, owner):
+        for group, student, score, ranking in zip(
+            groups, group_students, scores, rank_within_groups(groups, scores)
+        ):
+            rank, dense, percentile, size = ranking
+            ranks.append(
+                MeritRank(
+                    scope=scope,
+                    student_id=student,
+                    score=Decimal(str(round(score, 2))),
+                    rank=rank,
+                    dense_rank=dense,
+                    percentile=percentile,
+                    cohort_size=size,
+                    weighted=weighted and scope != "exam",
+                    **owner(group),
+                )
+            )
+
+    sitting = [index for index, ok in enumerate(present) if ok]
+    collect(
+        "exam",
+        [exams[i] for i in sitting],
+        [students[i] for i in sitting],
+        [marks[i] for i in sitting],
+        lambda exam_id: {"exam_id": exam_id, "class_level_id": class_of_exam[exam_id]},
+    )
+    collect(
+        "subject",
+        *_aggregate(subjects, students, exams, values, weighted),
+        lambda subject_id: {"subject_id": subject_id, "class_level_id": class_of_subject[subject_id]},
+    )
+    collect(
+        "class",
+        *_aggregate(classes, students, exams, values, weighted),
+        lambda class_id: {"class_level_id": class_id},
+    )
+    return ranks
+
+
+def refresh_merit_lists(
+    year: AcademicYear, class_ids: Optional[Sequence[int]] = None, weighted: Optional[bool] = None
+) -> Dict[str, int]:
+    """
+    Recompute and store the exam, subject and class merit lists of ``year`` (optionally
+    only some classes) from one results query. The year's previous snapshot for those
+    classes is replaced in one transaction. Returns the number of rows per scope.
+    """
+    weighted = weighted_by_default() if weighted is None else weighted
+    results = ExamResult.objects.filter(exam__academic_year=year)
+    stale = MeritRank.objects.filter(academic_year=year)
+    if class_ids:
+        results = results.filter(exam__class_level_id__in=class_ids)
+        stale = stale.filter(class_level_id__in=class_ids)
+
+    ranks = compute_merit_ranks(results.values_list(*RESULT_COLUMNS).iterator(chunk_size=5000), weighted)
+    for rank in ranks:
+        rank.academic_year_id = year.pk
+    with transaction.atomic():
+        stale.delete()
+        MeritRank.objects.bulk_create(ranks, batch_size=MERIT_WRITE_BATCH_SIZE)
+        for class_id in {rank.class_level_id for rank in ranks}:
+            invalidate_class_dashboards(class_id, year.pk)
+    return dict(Counter(rank.scope for rank in ranks))
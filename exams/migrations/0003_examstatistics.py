@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_alter_exam_exam_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('graded_count', models.PositiveIntegerField(default=0)),
+                ('highest', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('lowest', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('mean', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('median', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('std_dev', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('first_quartile', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('third_quartile', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('pass_mark', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('pass_rate', models.FloatField(blank=True, null=True)),
+                ('histogram', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='exams.exam')),
+            ],
+            options={
+                'verbose_name_plural': 'exam statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0006_enrollmentrollup'),
+        ('accounts', '0005_identifiersequence'),
+        ('exams', '0003_examstatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeritRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('exam', 'Exam'), ('subject', 'Subject'), ('class', 'Class overall')], max_length=8)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rank', models.PositiveIntegerField(help_text='Competition rank (1, 2, 2, 4).')),
+                ('dense_rank', models.PositiveIntegerField(help_text='Dense rank (1, 2, 2, 3).')),
+                ('percentile', models.FloatField(help_text='Percent of the cohort scoring below, counting ties as half.')),
+                ('cohort_size', models.PositiveIntegerField()),
+                ('weighted', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merit_ranks', to='academics.academicyear')),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merit_ranks', to='academics.classlevel')),
+                ('exam', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='merit_ranks', to='exams.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merit_ranks', to='accounts.studentprofile')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='merit_ranks', to='academics.subject')),
+            ],
+            options={
+                'ordering': ['academic_year', 'class_level', 'scope', 'rank'],
+                'indexes': [models.Index(fields=['academic_year', 'class_level', 'scope'], name='exams_merit_academi_d5fe99_idx'), models.Index(fields=['student', 'academic_year'], name='exams_merit_student_82202e_idx')],
+            },
+        ),
+    ]
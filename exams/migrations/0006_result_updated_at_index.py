@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_search_text'),
+        ('exams', '0005_result_publication'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['exam', 'updated_at'], name='exams_examr_exam_id_5b147e_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
 from accounts.models import StudentProfile, TeacherProfile
@@ -64,12 +65,94 @@ class ExamResult(models.Model):
     marks_obtained = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
     attendance = models.CharField(max_length=8, choices=ATTENDANCE_CHOICES, default="present")
     published = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True)
+    published_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="published_results"
+    )
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
     class Meta:
         unique_together = ("exam", "student")
         ordering = ["exam", "student"]
+        indexes = [
+            # Conditional GETs of the results page read Count/Max(updated_at) per exam.
+            models.Index(fields=["exam", "updated_at"]),
+        ]
 
     def __str__(self):
         return f"{self.exam} - {self.student}"
+
+
+class ExamStatistics(models.Model):
+    """
+    Summary of an exam's results, refreshed by exams.statistics whenever results are
+    written so results pages and dashboards read one row instead of aggregating.
+    """
+
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name="statistics")
+    result_count = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    graded_count = models.PositiveIntegerField(default=0)
+    highest = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    lowest = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    mean = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    median = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    std_dev = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    first_quartile = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    third_quartile = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    pass_mark = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    pass_count = models.PositiveIntegerField(default=0)
+    pass_rate = models.FloatField(null=True, blank=True)
+    histogram = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "exam statistics"
+
+    def __str__(self):
+        return f"Statistics for {self.exam}"
+
+    @property
+    def histogram_rows(self):
+        """(label, count) pairs for templates, e.g. ("40-50%", 3)."""
+        width = 100 // len(self.histogram) if self.histogram else 0
+        return [(f"{i * width}-{(i + 1) * width}%", count) for i, count in enumerate(self.histogram)]
+
+
+class MeritRank(models.Model):
+    """
+    Snapshot of one student's position in a merit list, written by exams.merit for a
+    whole class/year at a time so rank pages read rows instead of re-ranking results.
+    """
+
+    SCOPE_CHOICES = [
+        ("exam", "Exam"),
+        ("subject", "Subject"),
+        ("class", "Class overall"),
+    ]
+
+    scope = models.CharField(max_length=8, choices=SCOPE_CHOICES)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="merit_ranks")
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name="merit_ranks")
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, null=True, blank=True, related_name="merit_ranks")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True, related_name="merit_ranks")
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name="merit_ranks")
+    score = models.DecimalField(max_digits=10, decimal_places=2)
+    rank = models.PositiveIntegerField(help_text="Competition rank (1, 2, 2, 4).")
+    dense_rank = models.PositiveIntegerField(help_text="Dense rank (1, 2, 2, 3).")
+    percentile = models.FloatField(help_text="Percent of the cohort scoring below, counting ties as half.")
+    cohort_size = models.PositiveIntegerField()
+    weighted = models.BooleanField(default=False)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["academic_year", "class_level", "scope", "rank"]
+        indexes = [
+            models.Index(fields=["academic_year", "class_level", "scope"]),
+            models.Index(fields=["student", "academic_year"]),
+        ]
+
+    def __str__(self):
+        return f"{self.student} #{self.rank} ({self.get_scope_display()})"
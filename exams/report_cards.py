@@ -0,0 +1,348 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.template.loader import get_template, render_to_string
+
+from academics.models import AcademicYear, StudentEnrollment
+from cems.workers import init_django_worker, settings_module_name
+from exams.models import Exam, ExamResult
+
+REPORT_CARD_TEMPLATE = "report_card.html"
+TRANSCRIPT_TEMPLATE = "transcript.html"
+REPORT_CARDS_DIR = "report_cards"
+
+# (minimum percentage, grade), checked top-down.
+GRADE_SCALE = (
+    (80, "A+"),
+    (70, "A"),
+    (60, "A-"),
+    (50, "B"),
+    (40, "C"),
+    (33, "D"),
+    (0, "F"),
+)
+
+
+def grade_for(percentage: Optional[float]) -> str:
+    if percentage is None:
+        return "—"
+    for minimum, grade in GRADE_SCALE:
+        if percentage >= minimum:
+            return grade
+    return GRADE_SCALE[-1][1]
+
+
+def _percentage(obtained, possible):
+    return round(obtained * 100 / possible, 2) if possible else None
+
+
+@dataclass
+class GenerationReport:
+    rendered: int = 0
+    unchanged: int = 0
+    files: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+def _class_label(name, section):
+    return f"{name} - {section}" if section else name
+
+
+def _subject_rows(exams, marks_by_exam):
+    """
+    Group a class's exams by subject and total one student's marks against them.
+    Absent or unmarked exams count as zero against the subject's full max marks.
+    """
+    by_subject = defaultdict(list)
+    for exam in exams:
+        by_subject[exam["subject"]].append(exam)
+
+    rows = []
+    total_obtained = total_possible = 0.0
+    for subject in sorted(by_subject):
+        exam_rows = []
+        obtained = possible = 0.0
+        for exam in by_subject[subject]:
+            marks, attendance = marks_by_exam.get(exam["id"], (None, None))
+            possible += exam["max_marks"]
+            if marks is not None and attendance != "absent":
+                obtained += marks
+            exam_rows.append(
+                {
+                    "title": exam["title"],
+                    "date": exam["date"],
+                    "max_marks": exam["max_marks"],
+                    "marks": marks,
+                    "attendance": attendance or "not recorded",
+                }
+            )
+        percentage = _percentage(obtained, possible)
+        rows.append(
+            {
+                "subject": subject,
+                "exams": exam_rows,
+                "obtained": round(obtained, 2),
+                "possible": possible,
+                "percentage": percentage,
+                "grade": grade_for(percentage),
+            }
+        )
+        total_obtained += obtained
+        total_possible += possible
+
+    percentage = _percentage(total_obtained, total_possible)
+    totals = {
+        "obtained": round(total_obtained, 2),
+        "possible": total_possible,
+        "percentage": percentage,
+        "grade": grade_for(percentage),
+    }
+    return rows, totals
+
+
+def _exam_payloads(exam_filter) -> Dict[int, List[dict]]:
+    exams_by_class = defaultdict(list)
+    for exam_id, class_id, title, exam_date, max_marks, subject in (
+        Exam.objects.filter(**exam_filter)
+        .order_by("exam_date", "title")
+        .values_list("id", "class_level_id", "title", "exam_date", "max_marks", "subject__name")
+    ):
+        exams_by_class[class_id].append(
+            {
+                "id": exam_id,
+                "title": title,
+                "date": exam_date.isoformat() if exam_date else "",
+                "max_marks": max_marks,
+                "subject": subject,
+            }
+        )
+    return exams_by_class
+
+
+def _marks_by_student(result_filter, include_drafts: bool = False) -> Dict[int, Dict[int, tuple]]:
+    """Marks keyed by student and exam; unpublished results are left out unless ``include_drafts``."""
+    if not include_drafts:
+        result_filter = {**result_filter, "published": True}
+    marks = defaultdict(dict)
+    rows = (
+        ExamResult.objects.filter(**result_filter)
+        .values_list("student_id", "exam_id", "marks_obtained", "attendance")
+        .iterator(chunk_size=5000)
+    )
+    for student_id, exam_id, value, attendance in rows:
+        marks[student_id][exam_id] = (float(value) if value is not None else None, attendance)
+    return marks
+
+
+def _student_fields(enrollment_row):
+    first, last, username = enrollment_row["first_name"], enrollment_row["last_name"], enrollment_row["username"]
+    return {
+        "student_pk": enrollment_row["student_id"],
+        "student_id": enrollment_row["student_code"] or f"user-{username}",
+        "name": f"{first} {last}".strip() or username,
+    }
+
+
+ENROLLMENT_VALUES = {
+    "student_code": "student__student_id",
+    "first_name": "student__user__first_name",
+    "last_name": "student__user__last_name",
+    "username": "student__user__username",
+    "year_name": "academic_year__name",
+    "class_name": "class_level__name",
+    "section": "class_level__section",
+}
+
+
+def _enrollment_rows(**filters):
+    return (
+        StudentEnrollment.objects.filter(**filters)
+        .annotate(**{alias: F(lookup) for alias, lookup in ENROLLMENT_VALUES.items()})
+        .values("student_id", "class_level_id", "academic_year_id", "roll_number", "status", *ENROLLMENT_VALUES)
+    )
+
+
+def build_report_card_payloads(year: AcademicYear, class_ids=None, include_drafts: bool = False) -> List[dict]:
+    """
+    Build one plain-data report card per enrollment of ``year`` using three queries
+    (enrollments, exams, results) for the whole year. Only published results count
+    unless ``include_drafts``.
+    """
+    enrollment_filter = {"academic_year": year}
+    exam_filter = {"academic_year": year}
+    if class_ids:
+        enrollment_filter["class_level_id__in"] = class_ids
+        exam_filter["class_level_id__in"] = class_ids
+    exams_by_class = _exam_payloads(exam_filter)
+    marks = _marks_by_student({f"exam__{key}": value for key, value in exam_filter.items()}, include_drafts)
+
+    payloads = []
+    for row in _enrollment_rows(**enrollment_filter).order_by("class_level_id", "roll_number"):
+        subjects, totals = _subject_rows(exams_by_class.get(row["class_level_id"], []), marks.get(row["student_id"], {}))
+        payloads.append(
+            {
+                "kind": "card",
+                **_student_fields(row),
+                "year": row["year_name"],
+                "class_label": _class_label(row["class_name"], row["section"]),
+                "roll_number": row["roll_number"],
+                "subjects": subjects,
+                "totals": totals,
+            }
+        )
+    return payloads
+
+
+def build_transcript_payloads(year: AcademicYear, class_ids=None, include_drafts: bool = False) -> List[dict]:
+    """
+    Build multi-year transcripts for every student enrolled in ``year`` from their whole
+    enrollment history, again with one query each for enrollments, exams and results.
+    """
+    filters = {"academic_year": year}
+    if class_ids:
+        filters["class_level_id__in"] = class_ids
+    student_ids = list(StudentEnrollment.objects.filter(**filters).values_list("student_id", flat=True).distinct())
+    history = list(
+        _enrollment_rows(student_id__in=student_ids).order_by("student_id", "academic_year__start_date")
+    )
+    exams_by_class = _exam_payloads({"class_level_id__in": {row["class_level_id"] for row in history}})
+    marks = _marks_by_student({"student_id__in": student_ids}, include_drafts)
+
+    transcripts = {}
+    for row in history:
+        transcript = transcripts.setdefault(
+            row["student_id"], {"kind": "transcript", **_student_fields(row), "year": str(year), "years": []}
+        )
+        subjects, totals = _subject_rows(exams_by_class.get(row["class_level_id"], []), marks.get(row["student_id"], {}))
+        transcript["years"].append(
+            {
+                "year": row["year_name"],
+                "class_label": _class_label(row["class_name"], row["section"]),
+                "status": row["status"],
+                "subjects": subjects,
+                "totals": totals,
+            }
+        )
+    return list(transcripts.values())
+
+
+def _template_fingerprint():
+    digest = hashlib.sha256()
+    for name in (REPORT_CARD_TEMPLATE, TRANSCRIPT_TEMPLATE):
+        digest.update(Path(get_template(name).origin.name).read_bytes())
+    return digest.hexdigest()
+
+
+def _pdf_writer():
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return None
+    return HTML
+
+
+def _render_payload(payload, output_dir, formats, template_fingerprint):
+    """
+    Render one card/transcript unless a file with the same content hash already exists.
+    Runs inside worker processes. Returns (written paths, unchanged flag, warnings).
+    """
+    warnings = []
+    pdf_writer = _pdf_writer() if "pdf" in formats else None
+    if "pdf" in formats and pdf_writer is None:
+        # Never expect a PDF that cannot be written, or the card would never count as unchanged.
+        formats = [fmt for fmt in formats if fmt != "pdf"]
+        warnings.append("PDF output needs weasyprint installed; wrote HTML only.")
+    canonical = json.dumps(payload, sort_keys=True, default=str)
+    digest = hashlib.sha256((template_fingerprint + canonical).encode()).hexdigest()[:16]
+    stem = f"{payload['student_id']}_{payload['kind']}"
+    directory = Path(output_dir)
+    targets = {fmt: directory / f"{stem}_{digest}.{fmt}" for fmt in formats}
+    if all(path.exists() for path in targets.values()):
+        return [], True, warnings
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob(f"{stem}_*"):
+        if stale not in targets.values():
+            stale.unlink()
+
+    template = REPORT_CARD_TEMPLATE if payload["kind"] == "card" else TRANSCRIPT_TEMPLATE
+    html = render_to_string(template, payload)
+    written = []
+    if "html" in targets:
+        targets["html"].write_text(html, encoding="utf-8")
+        written.append(str(targets["html"]))
+    if "pdf" in targets:
+        pdf_writer(string=html).write_pdf(str(targets["pdf"]))
+        written.append(str(targets["pdf"]))
+    return written, False, warnings
+
+
+def _render_task(args):
+    return _render_payload(*args)
+
+
+def default_output_dir(year: AcademicYear) -> Path:
+    return Path(settings.MEDIA_ROOT) / REPORT_CARDS_DIR / str(year.name)
+
+
+def generate_report_cards(
+    year: AcademicYear,
+    class_ids=None,
+    transcripts: bool = False,
+    formats=("html",),
+    output_dir=None,
+    workers: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    include_drafts: bool = False,
+) -> GenerationReport:
+    """
+    Generate report cards (and optionally transcripts) for a year from its published
+    results (and unpublished ones too with ``include_drafts``).
+
+    Data is gathered in a handful of bulk queries in this process; rendering fans out to
+    a process pool. Output file names carry a hash of the data and templates, so cards
+    whose content has not changed are skipped on the next run.
+    """
+    payloads = build_report_card_payloads(year, class_ids, include_drafts)
+    if transcripts:
+        payloads += build_transcript_payloads(year, class_ids, include_drafts)
+    output_dir = str(output_dir or default_output_dir(year))
+    fingerprint = _template_fingerprint()
+    tasks = [(payload, output_dir, tuple(formats), fingerprint) for payload in payloads]
+
+    report = GenerationReport()
+    warnings = set()
+
+    def record(index, outcome):
+        written, unchanged, task_warnings = outcome
+        if unchanged:
+            report.unchanged += 1
+        else:
+            report.rendered += 1
+            report.files.extend(written)
+        warnings.update(task_warnings)
+        if on_progress:
+            on_progress(index, len(tasks))
+
+    if workers == 1 or len(tasks) < 2:
+        for index, task in enumerate(tasks, start=1):
+            record(index, _render_task(task))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=init_django_worker,
+            initargs=(settings_module_name(),),
+        ) as pool:
+            for index, outcome in enumerate(pool.map(_render_task, tasks, chunksize=16), start=1):
+                record(index, outcome)
+
+    report.warnings = sorted(warnings)
+    return report
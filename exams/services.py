@@ -0,0 +1,205 @@
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from academics.models import StudentEnrollment
+from accounts.counters import adjust_landing_counter
+from accounts.dashboard import invalidate_class_dashboards, invalidate_student_dashboards
+from exams.models import Exam, ExamResult
+from exams.statistics import refresh_exam_statistics
+from notifications.outbox import enqueue_emails
+
+ATTENDANCE_VALUES = {value for value, _ in ExamResult.ATTENDANCE_CHOICES}
+RESULT_WRITE_BATCH_SIZE = 500
+
+
+def roster_snapshot(exam: Exam) -> Dict[int, StudentEnrollment]:
+    """
+    Load the exam's class/year roster once, keyed by student pk, in roll order.
+    """
+    enrollments = (
+        StudentEnrollment.objects.filter(class_level_id=exam.class_level_id, academic_year_id=exam.academic_year_id)
+        .select_related("student__user")
+        .order_by("roll_number", "student__user__username")
+    )
+    return {enrollment.student_id: enrollment for enrollment in enrollments}
+
+
+def clean_marks(raw, exam: Exam) -> Optional[Decimal]:
+    """
+    Parse a submitted mark. Blank means "no mark"; anything else must be a number
+    between 0 and the exam's max marks with at most two decimal places, and small
+    enough for the marks column.
+    """
+    raw = ("" if raw is None else str(raw)).strip()
+    if not raw:
+        return None
+    try:
+        value = Decimal(raw)
+    except (InvalidOperation, ValueError):
+        raise ValidationError("Enter a numeric mark or leave blank.")
+    if not value.is_finite():
+        raise ValidationError("Enter a numeric mark or leave blank.")
+    if value < 0 or value > exam.max_marks:
+        raise ValidationError(f"Marks must be between 0 and {exam.max_marks}.")
+    if value.as_tuple().exponent < -2:
+        raise ValidationError("Marks can have at most two decimal places.")
+    field = ExamResult._meta.get_field("marks_obtained")
+    limit = 10 ** (field.max_digits - field.decimal_places)
+    if value >= limit:
+        raise ValidationError(f"Marks must be below {limit}.")
+    return value
+
+
+def clean_attendance(raw) -> str:
+    value = ("" if raw is None else str(raw)).strip().lower() or "present"
+    if value not in ATTENDANCE_VALUES:
+        raise ValidationError("Attendance must be present or absent.")
+    return value
+
+
+def upsert_exam_results(exam: Exam, entries: Iterable[Tuple[int, Optional[Decimal], str]]) -> int:
+    """
+    Insert or update results for (student_id, marks, attendance) entries with one
+    INSERT ... ON CONFLICT per batch. Returns the number of rows written.
+
+    Bulk writes do not send post_save, so callers refresh the exam's statistics once
+    after their last batch; cached student dashboards of the class are expired here.
+    """
+    results = [
+        ExamResult(exam=exam, student_id=student_id, marks_obtained=marks, attendance=attendance)
+        for student_id, marks, attendance in entries
+    ]
+    if not results:
+        return 0
+    ExamResult.objects.bulk_create(
+        results,
+        batch_size=RESULT_WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["exam", "student"],
+        update_fields=["marks_obtained", "attendance", "updated_at"],
+    )
+    invalidate_class_dashboards(exam.class_level_id, exam.academic_year_id)
+    return len(results)
+
+
+def save_roster_marks(exam: Exam, data, roster: Optional[Dict[int, StudentEnrollment]] = None):
+    """
+    Validate a whole-roster grid submission and write every valid row in one transaction.
+
+    ``data`` is a mapping (e.g. ``request.POST``) holding ``marks_<student_pk>`` and
+    ``attendance_<student_pk>`` keys. Invalid rows are reported per student and do not
+    abort the batch; rows whose values did not change are not rewritten.
+
+    Returns a dict with ``saved``, ``unchanged`` and ``errors`` ({student_pk: message}).
+    """
+    if roster is None:
+        roster = roster_snapshot(exam)
+
+    existing = {
+        student_id: (marks, attendance)
+        for student_id, marks, attendance in ExamResult.objects.filter(exam=exam).values_list(
+            "student_id", "marks_obtained", "attendance"
+        )
+    }
+
+    entries = []
+    errors = {}
+    unchanged = 0
+    for key in data:
+        if not key.startswith("marks_"):
+            continue
+        try:
+            student_id = int(key[len("marks_"):])
+        except ValueError:
+            continue
+        if student_id not in roster:
+            errors[student_id] = "Student is not enrolled in this class for the exam's year."
+            continue
+        try:
+            marks = clean_marks(data.get(key), exam)
+            attendance = clean_attendance(data.get(f"attendance_{student_id}"))
+        except ValidationError as exc:
+            errors[student_id] = "; ".join(exc.messages)
+            continue
+        if existing.get(student_id) == (marks, attendance):
+            unchanged += 1
+            continue
+        entries.append((student_id, marks, attendance))
+
+    with transaction.atomic():
+        saved = upsert_exam_results(exam, entries)
+        if saved:
+            refresh_exam_statistics(exam.pk)
+
+    return {"saved": saved, "unchanged": unchanged, "errors": errors}
+
+
+def set_results_published(results, published: bool = True, actor=None, notify: Optional[bool] = None) -> int:
+    """
+    Publish (or unpublish) every row of the ``results`` queryset with a single UPDATE,
+    stamping the time and acting user, then expire the affected students' cached
+    dashboards in one sweep. Rows already in the requested state are left untouched.
+
+    When publishing (and ``NOTIFY_ON_RESULT_PUBLISH`` is on), one email per student
+    listing the newly published exams is queued in the outbox in the same transaction.
+    Returns the number of rows changed.
+    """
+    if notify is None:
+        notify = published and getattr(settings, "NOTIFY_ON_RESULT_PUBLISH", False)
+    now = timezone.now()
+    changing = results.exclude(published=published)
+    with transaction.atomic():
+        rows = list(
+            changing.values_list(
+                "student_id", "student__user__email", "student__user__first_name", "student__user__username", "exam__title"
+            )
+        )
+        updated = changing.update(
+            published=published,
+            published_at=now if published else None,
+            published_by=actor if published else None,
+            updated_at=now,
+        )
+        invalidate_student_dashboards(row[0] for row in rows)
+        adjust_landing_counter("published_results", updated if published else -updated)
+        if notify:
+            _queue_publication_emails(rows)
+    return updated
+
+
+def _queue_publication_emails(rows):
+    by_student = {}
+    for student_id, email, first_name, username, exam_title in rows:
+        entry = by_student.setdefault(student_id, {"to": email, "name": first_name or username, "exams": []})
+        entry["exams"].append(exam_title)
+    enqueue_emails(
+        (
+            entry["to"],
+            "Your exam results are published",
+            render_to_string("notifications/results_published.txt", entry),
+        )
+        for entry in by_student.values()
+        if entry["to"]
+    )
+
+
+def publish_exam_results(exam: Exam, published: bool = True, actor=None) -> int:
+    return set_results_published(ExamResult.objects.filter(exam=exam), published, actor)
+
+
+def publish_class_results(class_levels, published: bool = True, actor=None) -> int:
+    """Release (or withdraw) every exam result of the given classes for their academic year."""
+    return set_results_published(
+        ExamResult.objects.filter(
+            exam__class_level__in=class_levels, exam__academic_year=F("exam__class_level__academic_year")
+        ),
+        published,
+        actor,
+    )
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from cems.fragments import bump_fragment_versions
+from exams.models import Exam, ExamResult
+from exams.statistics import refresh_exam_statistics, refresh_exam_statistics_on_commit
+
+
+@receiver(post_save, sender=ExamResult)
+def refresh_statistics_on_result_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_exam_statistics(instance.exam_id)
+
+
+@receiver(post_delete, sender=ExamResult)
+def refresh_statistics_on_result_delete(sender, instance, **kwargs):
+    # Deferred: when the whole exam is being deleted, the refresh finds it gone and skips.
+    refresh_exam_statistics_on_commit(instance.exam_id)
+
+
+@receiver(post_save, sender=Exam)
+def refresh_statistics_on_exam_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # max_marks drives the pass mark and histogram buckets.
+    if not raw and not created and (update_fields is None or "max_marks" in update_fields):
+        refresh_exam_statistics(instance.pk)
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def bump_exam_fragment_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_fragment_versions("exam", [instance.pk])
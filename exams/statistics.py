@@ -0,0 +1,123 @@
+import statistics
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db import transaction
+
+from cems.fragments import bump_fragment_versions
+from cems.routers import replica_reads
+from exams.models import Exam, ExamResult, ExamStatistics
+
+HISTOGRAM_BUCKETS = 10
+TWO_PLACES = Decimal("0.01")
+
+
+def pass_percentage():
+    return getattr(settings, "EXAM_PASS_PERCENTAGE", 40)
+
+
+def _quantize(value):
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def compute_statistics(rows, max_marks, pass_percent=None) -> dict:
+    """
+    Summarise (marks_obtained, attendance) rows of one exam.
+
+    Marks count towards the numeric figures only when the student was present and has a
+    mark. The histogram has HISTOGRAM_BUCKETS equal buckets of marks / max_marks; a full
+    score lands in the last bucket.
+    """
+    pass_percent = pass_percentage() if pass_percent is None else pass_percent
+    present = absent = 0
+    marks = []
+    for value, attendance in rows:
+        if attendance == "absent":
+            absent += 1
+            continue
+        present += 1
+        if value is not None:
+            marks.append(value)
+
+    pass_mark = Decimal(max_marks) * Decimal(pass_percent) / 100 if max_marks else None
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for value in marks:
+        ratio = float(value) / max_marks if max_marks else 0
+        histogram[min(max(int(ratio * HISTOGRAM_BUCKETS), 0), HISTOGRAM_BUCKETS - 1)] += 1
+
+    stats = {
+        "result_count": present + absent,
+        "present_count": present,
+        "absent_count": absent,
+        "graded_count": len(marks),
+        "highest": None,
+        "lowest": None,
+        "mean": None,
+        "median": None,
+        "std_dev": None,
+        "first_quartile": None,
+        "third_quartile": None,
+        "pass_mark": _quantize(pass_mark),
+        "pass_count": 0,
+        "pass_rate": None,
+        "histogram": histogram,
+    }
+    if marks:
+        floats = sorted(float(value) for value in marks)
+        if len(floats) > 1:
+            first_quartile, _, third_quartile = statistics.quantiles(floats, n=4, method="inclusive")
+        else:
+            first_quartile = third_quartile = floats[0]
+        pass_count = sum(1 for value in marks if pass_mark is None or value >= pass_mark)
+        stats.update(
+            highest=_quantize(max(marks)),
+            lowest=_quantize(min(marks)),
+            mean=_quantize(statistics.fmean(floats)),
+            median=_quantize(statistics.median(floats)),
+            std_dev=_quantize(statistics.pstdev(floats)),
+            first_quartile=_quantize(first_quartile),
+            third_quartile=_quantize(third_quartile),
+            pass_count=pass_count,
+            pass_rate=pass_count / len(marks),
+        )
+    return stats
+
+
+@replica_reads(False)
+def refresh_exam_statistics(exam_id):
+    """
+    Recompute and store statistics for one exam from its own results (one read bounded by
+    the class roster, one write). Returns the ExamStatistics row, or None if the exam is gone.
+    """
+    max_marks = Exam.objects.filter(pk=exam_id).values_list("max_marks", flat=True).first()
+    if max_marks is None:
+        return None
+    rows = ExamResult.objects.filter(exam_id=exam_id).values_list("marks_obtained", "attendance")
+    stats, _ = ExamStatistics.objects.update_or_create(
+        exam_id=exam_id, defaults=compute_statistics(rows, max_marks)
+    )
+    # Every marks write, single or bulk, ends here: re-render the exam's dashboard row.
+    bump_fragment_versions("exam", [exam_id])
+    return stats
+
+
+def refresh_exam_statistics_on_commit(exam_id):
+    transaction.on_commit(lambda: refresh_exam_statistics(exam_id))
+
+
+def ensure_exam_statistics(exams: Iterable[Exam]) -> Dict[int, ExamStatistics]:
+    """
+    Return {exam_id: statistics} for the given exams, computing rows only for exams that
+    have never had statistics stored (e.g. results written before statistics existed).
+    """
+    exams = list(exams)
+    found = {stats.exam_id: stats for stats in ExamStatistics.objects.filter(exam__in=exams)}
+    for exam in exams:
+        if exam.pk not in found:
+            stats = refresh_exam_statistics(exam.pk)
+            if stats:
+                found[exam.pk] = stats
+    return found
@@ -1,3 +1,680 @@
-from django.test import TestCase
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from academics.models import AcademicYear, ClassLevel, StudentEnrollment, Subject, TeacherAssignment
+from accounts.counters import landing_counters
+from accounts.dashboard import STUDENT_KEY
+from accounts.models import StudentProfile, TeacherProfile
+from cems.fragments import fragment_versions
+from exams import merit, report_cards
+from exams.imports import error_file_path, import_exam_marks
+from exams.models import Exam, ExamResult, ExamStatistics
+from exams.services import save_roster_marks, set_results_published
+from exams.statistics import HISTOGRAM_BUCKETS, compute_statistics
+from notifications.models import OutboxMessage
+
+
+def make_student(username):
+    return StudentProfile.objects.create(user=User.objects.create_user(username))
+
+
+def csv_upload(*lines):
+    return SimpleUploadedFile("marks.csv", "\n".join(lines).encode())
+
+
+class ExamSetupMixin:
+    """'Class 5' split into sections A and B, two students each, and an exam for section A and its teacher."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.year = AcademicYear.objects.create(name="Current", start_date=date(date.today().year, 1, 1), is_current=True)
+        cls.section_a = ClassLevel.objects.create(name="Class 5", section="A", academic_year=cls.year)
+        cls.section_b = ClassLevel.objects.create(name="Class 5", section="B", academic_year=cls.year)
+        cls.students = {}
+        for class_level in (cls.section_a, cls.section_b):
+            for roll in (1, 2):
+                student = make_student(f"pupil_{class_level.section}{roll}".lower())
+                StudentEnrollment.objects.create(student=student, class_level=class_level, academic_year=cls.year)
+                cls.students[class_level.section, roll] = student
+        subject = Subject.objects.create(name="Math", class_level=cls.section_a)
+        cls.teacher = TeacherProfile.objects.create(user=User.objects.create_user("teacher"))
+        TeacherAssignment.objects.create(
+            teacher=cls.teacher, class_level=cls.section_a, subject=subject, academic_year=cls.year
+        )
+        cls.exam = Exam.objects.create(
+            title="Midterm",
+            class_level=cls.section_a,
+            subject=subject,
+            academic_year=cls.year,
+            assigned_teacher=cls.teacher,
+            max_marks=100,
+        )
+
+
+class ImportExamMarksTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def marks(self):
+        return {result.student_id: result.marks_obtained for result in ExamResult.objects.filter(exam=self.exam)}
+
+    def test_whole_grade_file_with_section_column_imports_own_section(self):
+        upload = csv_upload(
+            "section,roll_number,marks",
+            "A,1,70",
+            "B,1,10",
+            "A,2,80",
+            "B,2,20",
+        )
+
+        outcome = import_exam_marks(self.exam, upload)
+
+        self.assertEqual((outcome["accepted"], outcome["rejected"], outcome["skipped"]), (2, 0, 2))
+        self.assertEqual(self.marks(), {self.students["A", 1].pk: 70, self.students["A", 2].pk: 80})
+
+    def test_whole_grade_file_without_section_column_is_rejected(self):
+        # Rows 1 and 2 of section B would otherwise overwrite section A's rolls 1 and 2.
+        upload = csv_upload("roll_number,marks", "1,70", "2,80", "1,10", "2,20")
+
+        outcome = import_exam_marks(self.exam, upload)
+
+        self.assertEqual((outcome["accepted"], outcome["rejected"]), (0, 4))
+        self.assertIsNotNone(outcome["error_token"])
+        self.assertEqual(self.marks(), {})
+
+    def test_student_ids_need_no_section(self):
+        student = self.students["A", 2]
+        student.refresh_from_db()
+        upload = csv_upload("student_id,marks", f"{student.student_id},55")
+
+        outcome = import_exam_marks(self.exam, upload)
+
+        self.assertEqual(outcome["accepted"], 1)
+        self.assertEqual(self.marks(), {student.pk: 55})
+
+    def test_whole_grade_file_with_student_ids_skips_other_sections(self):
+        codes = {}
+        for key, student in self.students.items():
+            student.refresh_from_db()
+            codes[key] = student.student_id
+        upload = csv_upload(
+            "student_id,marks",
+            f"{codes['A', 1]},70",
+            f"{codes['B', 1]},10",
+            f"{codes['A', 2]},80",
+            f"{codes['B', 2]},20",
+            "S-UNKNOWN,30",
+        )
+
+        outcome = import_exam_marks(self.exam, upload)
+
+        self.assertEqual((outcome["accepted"], outcome["rejected"], outcome["skipped"]), (2, 1, 2))
+        self.assertEqual(self.marks(), {self.students["A", 1].pk: 70, self.students["A", 2].pk: 80})
+
+    def test_new_error_file_deletes_old_ones(self):
+        def rejected_import(exam, line):
+            return error_file_path(exam, import_exam_marks(exam, csv_upload("roll_number,marks", line))["error_token"])
+
+        quiz, final = (
+            Exam.objects.create(title=title, class_level=self.section_a, subject=self.exam.subject, academic_year=self.year)
+            for title in ("Quiz", "Final")
+        )
+        earlier = rejected_import(self.exam, "1,70")
+        recent = rejected_import(quiz, "1,70")
+        stale = rejected_import(final, "1,70")
+        two_days_ago = time.time() - 2 * 24 * 60 * 60
+        os.utime(stale, (two_days_ago, two_days_ago))
+
+        latest = rejected_import(self.exam, "2,80")
+
+        self.assertFalse(earlier.exists())
+        self.assertFalse(stale.exists())
+        self.assertTrue(recent.exists())
+        self.assertTrue(latest.exists())
+
+
+class TeacherExamManageTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(self.teacher.user)
+        self.url = reverse("exams:teacher_exam_manage", args=[self.exam.pk])
+
+    def test_single_entry_does_not_load_the_roster(self):
+        student = self.students["A", 1]
+        student.refresh_from_db()
+
+        with mock.patch("exams.views.roster_snapshot") as snapshot:
+            response = self.client.post(self.url, {"student_identifier": student.student_id, "marks_obtained": "42"})
+
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        snapshot.assert_not_called()
+        self.assertEqual(ExamResult.objects.get(exam=self.exam, student=student).marks_obtained, 42)
+
+    def test_single_entry_rejects_invalid_marks(self):
+        student = self.students["A", 1]
+        student.refresh_from_db()
+
+        def submit(marks, attendance="present"):
+            response = self.client.post(
+                self.url, {"student_identifier": student.student_id, "marks_obtained": marks, "attendance": attendance}
+            )
+            self.assertRedirects(response, self.url, fetch_redirect_response=False)
+
+        for marks, attendance in (("101", "present"), ("-1", "present"), ("NaN", "present"), ("12.345", "present"),
+                                  ("40", "late")):
+            submit(marks, attendance)
+        # Within max_marks, but more than the column can hold.
+        Exam.objects.filter(pk=self.exam.pk).update(max_marks=20000)
+        submit("15000")
+
+        self.assertEqual(
+            [str(message) for message in self.client.get(self.url).context["messages"]],
+            [
+                "Marks must be between 0 and 100.",
+                "Marks must be between 0 and 100.",
+                "Enter a numeric mark or leave blank.",
+                "Marks can have at most two decimal places.",
+                "Attendance must be present or absent.",
+                "Marks must be below 10000.",
+            ],
+        )
+        self.assertFalse(ExamResult.objects.filter(exam=self.exam).exists())
+
+    def test_page_lists_the_roster(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            [row["student"] for row in response.context["rows"]], [self.students["A", 1], self.students["A", 2]]
+        )
+
+
+class SetResultsPublishedTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for roll, marks in ((1, 70), (2, 80)):
+            student = self.students["A", roll]
+            student.user.email = f"{student.user.username}@example.com"
+            student.user.save()
+            ExamResult.objects.create(exam=self.exam, student=student, marks_obtained=marks)
+
+    def publish(self, results, published=True, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                changed = set_results_published(results, published, **kwargs)
+        updates = [query["sql"] for query in queries if query["sql"].lstrip().upper().startswith("UPDATE")]
+        return changed, updates
+
+    def test_one_update_for_all_rows(self):
+        changed, updates = self.publish(ExamResult.objects.filter(exam=self.exam), notify=False)
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(ExamResult.objects.filter(published=True).count(), 2)
+
+    def test_rows_already_published_are_left_alone(self):
+        self.publish(ExamResult.objects.filter(student=self.students["A", 1]), notify=False)
+
+        changed, updates = self.publish(ExamResult.objects.filter(exam=self.exam), notify=False)
+
+        self.assertEqual(changed, 1)
+        self.assertEqual(len(updates), 1)
+
+    def test_adjusts_the_cached_published_results_counter(self):
+        self.assertEqual(landing_counters()["published_results"], 0)
+
+        self.publish(ExamResult.objects.filter(exam=self.exam), notify=False)
+        self.assertEqual(landing_counters()["published_results"], 2)
+
+        self.publish(ExamResult.objects.filter(student=self.students["A", 2]), published=False)
+        self.assertEqual(landing_counters()["published_results"], 1)
+
+    def test_queues_one_email_per_student_when_notifying(self):
+        self.publish(ExamResult.objects.filter(exam=self.exam), notify=True)
+
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list("to", flat=True)),
+            ["pupil_a1@example.com", "pupil_a2@example.com"],
+        )
+        self.assertIn("Midterm", OutboxMessage.objects.first().body)
+
+        self.publish(ExamResult.objects.filter(exam=self.exam), notify=True)
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_invalidates_only_the_affected_dashboards(self):
+        keys = {key: STUDENT_KEY.format(student.pk) for key, student in self.students.items()}
+        cache.set_many({cache_key: "cached" for cache_key in keys.values()})
+
+        self.publish(ExamResult.objects.filter(student=self.students["A", 1]), notify=False)
+
+        self.assertEqual(set(cache.get_many(keys.values())), {keys["A", 2], keys["B", 1], keys["B", 2]})
+
+
+class PublishActionPermissionTests(ExamSetupMixin, TestCase):
+    publish_actions = {
+        Exam: {"publish_results", "unpublish_results"},
+        ExamResult: {"publish_selected", "unpublish_selected"},
+        ClassLevel: {"release_term_results", "withdraw_term_results"},
+    }
+
+    def actions_for(self, user):
+        request = RequestFactory().get("/")
+        request.user = User.objects.get(pk=user.pk)
+        return {model: set(admin.site._registry[model].get_actions(request)) for model in self.publish_actions}
+
+    def test_publish_actions_need_result_change_permission(self):
+        user = User.objects.create_user("clerk", is_staff=True)
+        user.user_permissions.add(
+            *Permission.objects.filter(codename__in=["change_exam", "view_examresult", "change_classlevel"])
+        )
+
+        for model, actions in self.actions_for(user).items():
+            with self.subTest(model=model.__name__):
+                self.assertFalse(actions & self.publish_actions[model])
+
+        user.user_permissions.add(Permission.objects.get(codename="change_examresult"))
+
+        for model, actions in self.actions_for(user).items():
+            with self.subTest(model=model.__name__):
+                self.assertLessEqual(self.publish_actions[model], actions)
+
+
+class KeysetPaginationTests(ExamSetupMixin, TestCase):
+    def walk(self, url, limit, **params):
+        """Every page of ``url`` from the first, following ``next`` cursors."""
+        rows = []
+        cursor = None
+        while True:
+            response = self.client.get(url, {"limit": limit, **params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            self.assertLessEqual(len(page["results"]), limit)
+            rows += page["results"]
+            cursor = page["next"]
+            if not cursor:
+                return rows
+
+    def make_exams(self, *dates):
+        return [
+            Exam.objects.create(
+                title=f"Test {index}",
+                class_level=self.section_a,
+                subject=self.exam.subject,
+                academic_year=self.year,
+                exam_date=exam_date,
+            )
+            for index, exam_date in enumerate(dates)
+        ]
+
+    def test_descending_dates_put_undated_exams_last(self):
+        student = self.students["A", 1]
+        soon, later = date.today() + timedelta(days=3), date.today() + timedelta(days=30)
+        exams = [self.exam] + self.make_exams(soon, None, later, soon, None)
+        for exam in exams:
+            ExamResult.objects.create(exam=exam, student=student, marks_obtained=50)
+        self.client.force_login(student.user)
+        expected = [exams[3], exams[1], exams[4], self.exam, exams[2], exams[5]]
+
+        for limit in (1, 2, 4, 10):
+            with self.subTest(limit=limit):
+                rows = self.walk(reverse("accounts:api_student_results"), limit)
+                self.assertEqual([row["exam"] for row in rows], [exam.pk for exam in expected])
+
+    def test_results_follow_roll_numbers_of_the_exams_class(self):
+        late_joiners = [make_student(f"pupil_a{roll}") for roll in (3, 4, 5)]
+        for student in late_joiners:
+            StudentEnrollment.objects.create(student=student, class_level=self.section_a, academic_year=self.year)
+        StudentEnrollment.objects.filter(student=late_joiners[0]).update(roll_number=9)
+        # Created out of roll order; B1 has no enrollment in the exam's class, so no roll.
+        for student in [self.students["B", 1], *late_joiners, self.students["A", 2], self.students["A", 1]]:
+            ExamResult.objects.create(exam=self.exam, student=student, marks_obtained=40)
+        self.client.force_login(self.teacher.user)
+        url = reverse("exams:api_teacher_exam_results", args=[self.exam.pk])
+
+        for limit in (1, 2, 5):
+            with self.subTest(limit=limit):
+                rows = self.walk(url, limit, fields="roll_number,student")
+                self.assertEqual(
+                    [(row["roll_number"], row["student"]) for row in rows],
+                    [
+                        (1, self.students["A", 1].pk),
+                        (2, self.students["A", 2].pk),
+                        (4, late_joiners[1].pk),
+                        (5, late_joiners[2].pk),
+                        (9, late_joiners[0].pk),
+                        (None, self.students["B", 1].pk),
+                    ],
+                )
+
+    def test_bad_parameters_are_rejected(self):
+        self.client.force_login(self.teacher.user)
+        url = reverse("exams:api_teacher_exams")
+
+        for params in (
+            {"cursor": "not-a-cursor"},
+            {"cursor": "WzEsMiwzXQ"},  # three values for a two-key ordering
+            {"cursor": "WyJzb29uIiwxXQ"},  # ["soon", 1]: not a date
+            {"fields": "title,grade"},
+            {"limit": "ten"},
+            {"limit": "0"},
+        ):
+            with self.subTest(**params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_queries_do_not_grow_with_the_page_size(self):
+        exams = self.make_exams(*(date.today() + timedelta(days=day) for day in range(8)))
+        for exam in exams:
+            ExamResult.objects.create(exam=exam, student=self.students["A", 1], marks_obtained=50)
+        self.client.force_login(self.students["A", 1].user)
+        url = reverse("accounts:api_student_results")
+        self.client.get(url, {"limit": 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.client.get(url, {"limit": 1}).json()["results"]), 1)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.client.get(url, {"limit": 50}).json()["results"]), 8)
+
+
+class ReportCardTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        ExamResult.objects.create(exam=self.exam, student=self.students["A", 1], marks_obtained=70, published=True)
+        ExamResult.objects.create(exam=self.exam, student=self.students["A", 2], marks_obtained=90)
+
+    def totals(self, **kwargs):
+        cards = report_cards.build_report_card_payloads(self.year, [self.section_a.pk], **kwargs)
+        return {card["student_pk"]: card["totals"]["obtained"] for card in cards}
+
+    def test_cards_count_published_results_only(self):
+        self.assertEqual(self.totals(), {self.students["A", 1].pk: 70, self.students["A", 2].pk: 0})
+
+        transcripts = report_cards.build_transcript_payloads(self.year, [self.section_a.pk])
+        self.assertEqual(
+            {transcript["student_pk"]: transcript["years"][0]["totals"]["obtained"] for transcript in transcripts},
+            {self.students["A", 1].pk: 70, self.students["A", 2].pk: 0},
+        )
+
+    def test_drafts_can_be_included(self):
+        self.assertEqual(self.totals(include_drafts=True), {self.students["A", 1].pk: 70, self.students["A", 2].pk: 90})
+
+    def test_pdf_without_weasyprint_writes_html_and_reruns_as_unchanged(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+
+        def generate():
+            with mock.patch.object(report_cards, "_pdf_writer", return_value=None):
+                return report_cards.generate_report_cards(
+                    self.year, [self.section_a.pk], formats=("html", "pdf"), output_dir=output_dir, workers=1
+                )
+
+        first = generate()
+        second = generate()
+
+        self.assertEqual((first.rendered, first.unchanged), (2, 0))
+        self.assertTrue(all(path.endswith(".html") for path in first.files))
+        self.assertEqual((second.rendered, second.unchanged), (0, 2))
+        self.assertEqual(second.warnings, ["PDF output needs weasyprint installed; wrote HTML only."])
+
+
+class ComputeStatisticsTests(SimpleTestCase):
+    def test_full_score_lands_in_the_last_bucket(self):
+        rows = [(Decimal("100"), "present"), (Decimal("99.99"), "present"), (Decimal("0"), "present")]
+
+        histogram = compute_statistics(rows, 100, pass_percent=40)["histogram"]
+
+        self.assertEqual(len(histogram), HISTOGRAM_BUCKETS)
+        self.assertEqual((histogram[0], histogram[-1], sum(histogram)), (1, 2, 3))
+
+    def test_single_mark(self):
+        stats = compute_statistics([(Decimal("72.5"), "present")], 100, pass_percent=40)
+
+        self.assertEqual(
+            [stats[name] for name in ("first_quartile", "median", "third_quartile", "highest", "lowest", "mean")],
+            [Decimal("72.50")] * 6,
+        )
+        self.assertEqual(stats["std_dev"], Decimal("0.00"))
+        self.assertEqual(stats["pass_rate"], 1)
+
+    def test_everyone_absent(self):
+        stats = compute_statistics([(None, "absent"), (Decimal("30"), "absent")], 100, pass_percent=40)
+
+        self.assertEqual((stats["result_count"], stats["present_count"], stats["absent_count"]), (2, 0, 2))
+        self.assertEqual((stats["graded_count"], stats["pass_count"]), (0, 0))
+        self.assertIsNone(stats["mean"])
+        self.assertIsNone(stats["pass_rate"])
+        self.assertEqual(stats["histogram"], [0] * HISTOGRAM_BUCKETS)
+
+    def test_present_without_marks_are_not_graded(self):
+        stats = compute_statistics([(None, "present"), (None, "present"), (Decimal("50"), "present")], 100, 40)
+
+        self.assertEqual((stats["present_count"], stats["graded_count"]), (3, 1))
+        self.assertEqual(stats["mean"], Decimal("50.00"))
+        self.assertEqual(stats["pass_rate"], 1)
+
+    def test_mark_at_the_pass_mark_passes(self):
+        rows = [(Decimal("20"), "present"), (Decimal("19.99"), "present")]
+
+        stats = compute_statistics(rows, 50, pass_percent=40)
+
+        self.assertEqual(stats["pass_mark"], Decimal("20.00"))
+        self.assertEqual((stats["pass_count"], stats["pass_rate"]), (1, 0.5))
+
+
+class StatisticsRefreshTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for student in self.students.values():
+            student.refresh_from_db()
+
+    def statistics_writes(self, write):
+        with CaptureQueriesContext(connection) as queries:
+            write()
+        return [
+            query["sql"]
+            for query in queries
+            if "exams_examstatistics" in query["sql"]
+            and query["sql"].lstrip().upper().startswith(("INSERT", "UPDATE"))
+        ]
+
+    def test_grid_save_refreshes_once(self):
+        students = [self.students["A", 1], self.students["A", 2]]
+        data = {f"marks_{student.pk}": marks for student, marks in zip(students, ("60", "30"))}
+
+        writes = self.statistics_writes(lambda: save_roster_marks(self.exam, data))
+
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(ExamStatistics.objects.get(exam=self.exam).graded_count, 2)
+
+    def test_import_refreshes_once_across_chunks(self):
+        upload = csv_upload(
+            "student_id,marks",
+            f"{self.students['A', 1].student_id},60",
+            f"{self.students['A', 2].student_id},30",
+        )
+
+        writes = self.statistics_writes(lambda: import_exam_marks(self.exam, upload, chunk_size=1))
+
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(ExamStatistics.objects.get(exam=self.exam).graded_count, 2)
+
+
+class ConditionalResultsPageTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        self.result = ExamResult.objects.create(exam=self.exam, student=self.students["A", 1], marks_obtained=60)
+        self.client.force_login(self.teacher.user)
+        self.url = reverse("exams:teacher_exam_results", args=[self.exam.pk])
+        # The first page sets the CSRF cookie, which is part of every later ETag.
+        self.client.get(self.url)
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_matching_etag_answers_304_without_rendering(self):
+        etag = self.etag()
+
+        with mock.patch("exams.views.render") as render:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        render.assert_not_called()
+
+    def test_pending_messages_force_a_full_page(self):
+        etag = self.etag()
+        # A rejected entry changes nothing but leaves an error message to show.
+        self.client.post(
+            reverse("exams:teacher_exam_manage", args=[self.exam.pk]),
+            {"student_identifier": "nobody", "marks_obtained": "10"},
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
+        self.assertContains(response, "No student enrolled in this class")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_etag_changes_after_a_mark_edit(self):
+        etag = self.etag()
+
+        self.result.marks_obtained = 65
+        self.result.save()
+
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_etag_changes_after_a_student_rename(self):
+        etag = self.etag()
+
+        user = self.students["A", 1].user
+        user.first_name = "Renamed"
+        user.save()
+
+        self.assertNotEqual(self.etag(), etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag()).status_code, 304)
+
+
+class DashboardFragmentTests(ExamSetupMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.other_exam = Exam.objects.create(
+            title="Final",
+            class_level=self.section_a,
+            subject=self.exam.subject,
+            academic_year=self.year,
+            assigned_teacher=self.teacher,
+        )
+        self.client.force_login(self.teacher.user)
+        self.url = reverse("academics:teacher_dashboard")
+
+    def versions(self):
+        return fragment_versions("exam", [self.exam.pk, self.other_exam.pk]), fragment_versions("class", [self.section_a.pk])
+
+    def render_dashboard(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return [query["sql"] for query in queries]
+
+    def test_saving_a_mark_re_renders_only_that_exams_row(self):
+        self.render_dashboard()
+        cached = self.render_dashboard()
+        (exam_versions, class_versions) = self.versions()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_roster_marks(self.exam, {f"marks_{self.students['A', 1].pk}": "64"})
+
+        new_exam_versions, new_class_versions = self.versions()
+        self.assertNotEqual(new_exam_versions[self.exam.pk], exam_versions[self.exam.pk])
+        self.assertEqual(new_exam_versions[self.other_exam.pk], exam_versions[self.other_exam.pk])
+        self.assertEqual(new_class_versions, class_versions)
+
+        after_save = self.render_dashboard()
+        # The exam table is rendered again (loading the teacher's exams); the class table is not.
+        self.assertEqual(len(after_save), len(cached) + 2)
+        self.assertTrue(any("exams_examstatistics" in sql for sql in after_save))
+        self.assertFalse(any("academics_enrollmentrollup" in sql for sql in after_save))
+        self.assertEqual(len(self.render_dashboard()), len(cached))
+
+
+class RankWithinGroupsTests(SimpleTestCase):
+    def test_ties_share_a_rank(self):
+        groups = [1, 1, 1, 1, 2, 2]
+        scores = [90, 80, 90, 70, 50, 50]
+        expected = [
+            (1, 1, 75.0, 4),
+            (3, 2, 37.5, 4),
+            (1, 1, 75.0, 4),
+            (4, 3, 12.5, 4),
+            (1, 1, 50.0, 2),
+            (1, 1, 50.0, 2),
+        ]
+
+        self.assertEqual(merit._rank_python(groups, scores), expected)
+        if merit.np is not None:
+            self.assertEqual(merit.rank_within_groups(groups, scores), expected)
+
+    def test_scores_equal_to_two_places_tie(self):
+        self.assertEqual(merit._rank_python([1, 1], [80.001, 80.004]), [(1, 1, 50.0, 2), (1, 1, 50.0, 2)])
+
+
+@skipIf(merit.np is None, "NumPy is not installed.")
+class NumpyRankingEquivalenceTests(SimpleTestCase):
+    """The NumPy paths give exactly what the plain Python fallbacks give."""
+
+    def setUp(self):
+        self.random = random.Random(2024)
+
+    def test_rank_within_groups(self):
+        for _ in range(50):
+            size = self.random.randint(1, 60)
+            groups = [self.random.randint(1, 4) for _ in range(size)]
+            # Few distinct scores so most groups have ties.
+            scores = [self.random.choice([35, 50, 50.5, 72.25, 90, 100]) for _ in range(size)]
+
+            self.assertEqual(merit.rank_within_groups(groups, scores), merit._rank_python(groups, scores))
+
+    def test_compute_merit_ranks(self):
+        # Two exams of different max marks in class 1, one in class 2; absences and blanks.
+        rows = []
+        for exam_id, (class_id, subject_id, max_marks) in enumerate([(1, 10, 100), (1, 11, 50), (2, 12, 100)], 1):
+            for student_id in range(class_id * 100, class_id * 100 + 12):
+                attendance = "absent" if self.random.random() < 0.1 else "present"
+                mark = self.random.choice([None, max_marks * 0.4, max_marks * 0.7, max_marks * 0.7, max_marks])
+                rows.append((student_id, exam_id, class_id, subject_id, max_marks, mark, attendance))
+        fields = ("scope", "class_level_id", "exam_id", "subject_id", "student_id", "score", "rank", "dense_rank",
+                  "percentile", "cohort_size")
+
+        def snapshot(ranks):
+            return sorted(tuple(getattr(rank, name) for name in fields) for rank in ranks)
+
+        for weighted in (False, True):
+            with self.subTest(weighted=weighted):
+                with_numpy = snapshot(merit.compute_merit_ranks(rows, weighted))
+                with mock.patch.object(merit, "np", None):
+                    without_numpy = snapshot(merit.compute_merit_ranks(rows, weighted))
+                self.assertEqual(with_numpy, without_numpy)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -6,5 +7,32 @@ app_name = "exams"
 urlpatterns = [
     path("teacher/exams/create/", views.teacher_exam_create, name="teacher_exam_create"),
     path("teacher/exams/<int:exam_id>/manage/", views.teacher_exam_manage, name="teacher_exam_manage"),
-    path("teacher/exams/<int:exam_id>/results/", views.teacher_exam_results, name="teacher_exam_results"),
+    path(
+        "teacher/exams/<int:exam_id>/students/search/",
+        views.teacher_exam_student_search,
+        name="teacher_exam_student_search",
+    ),
+    path("teacher/exams/<int:exam_id>/import/", views.teacher_exam_import, name="teacher_exam_import"),
+    path(
+        "teacher/exams/<int:exam_id>/import/errors/<slug:token>/",
+        views.teacher_exam_import_errors,
+        name="teacher_exam_import_errors",
+    ),
+    path(
+        "teacher/exams/<int:exam_id>/results/",
+        views.teacher_exam_results_async if settings.ASYNC_DASHBOARDS else views.teacher_exam_results,
+        name="teacher_exam_results",
+    ),
+    path("teacher/exams/<int:exam_id>/publish/", views.teacher_exam_publish, name="teacher_exam_publish"),
+    path(
+        "teacher/exams/<int:exam_id>/results/export/",
+        views.teacher_exam_results_export,
+        name="teacher_exam_results_export",
+    ),
+    path("api/teacher/exams/", views.api_teacher_exams, name="api_teacher_exams"),
+    path(
+        "api/teacher/exams/<int:exam_id>/results/",
+        views.api_teacher_exam_results,
+        name="api_teacher_exam_results",
+    ),
 ]
@@ -1,19 +1,63 @@
 from datetime import date
-from decimal import Decimal, InvalidOperation
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Avg, Max, Min, Count
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, FilteredRelation, Max, Q
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 
-from accounts.models import StudentProfile
-from academics.models import ClassLevel, StudentEnrollment, TeacherAssignment
-from exams.models import Exam, ExamResult
+from accounts.roles import request_teacher
+from accounts.search import pick_match, roster_matches
+from academics.exports import RESULT_EXPORT_COLUMNS, stream_queryset_csv
+from academics.models import ClassLevel, TeacherAssignment
+from cems.api import ApiError, api_view, keyset_page
+from cems.concurrency import gather_queries
+from cems.conditional import conditional_page, latest, not_modified, page_etag, with_validators
+from exams.merit import refresh_merit_lists
+from exams.models import Exam, ExamResult, MeritRank
+from exams.imports import MarksImportError, error_file_path, import_exam_marks
+from exams.services import (
+    clean_attendance,
+    clean_marks,
+    publish_exam_results,
+    roster_snapshot,
+    save_roster_marks,
+)
+from exams.statistics import ensure_exam_statistics
+
+# (field, lookup) pairs the teacher API can return; ?fields= picks a subset.
+EXAM_API_FIELDS = (
+    ("id", "pk"),
+    ("title", "title"),
+    ("academic_year", "academic_year__name"),
+    ("class_level", "class_level_id"),
+    ("class_name", "class_level__name"),
+    ("section", "class_level__section"),
+    ("subject", "subject__name"),
+    ("subject_code", "subject__code"),
+    ("exam_date", "exam_date"),
+    ("max_marks", "max_marks"),
+)
+
+EXAM_RESULT_API_FIELDS = (
+    ("id", "pk"),
+    ("roll_number", "enrollment__roll_number"),
+    ("student", "student_id"),
+    ("student_id", "student__student_id"),
+    ("username", "student__user__username"),
+    ("first_name", "student__user__first_name"),
+    ("last_name", "student__user__last_name"),
+    ("marks_obtained", "marks_obtained"),
+    ("attendance", "attendance"),
+    ("published", "published"),
+)
 
 
 def _get_teacher(request):
-    return getattr(request.user, "teacher_profile", None)
+    return request_teacher(request)
 
 
 def _teacher_assignments(teacher):
@@ -117,41 +161,45 @@ def teacher_exam_manage(request, exam_id):
         assigned_teacher=teacher,
     )
 
-    if request.method == "POST":
-        student_identifier = (request.POST.get("student_identifier") or "").strip()
-        marks_input = (request.POST.get("marks_obtained") or "").strip()
-        attendance = request.POST.get("attendance") or "present"
-
-        student = (
-            StudentProfile.objects.select_related("user")
-            .filter(
-                Q(student_id__iexact=student_identifier)
-                | Q(user__username__iexact=student_identifier)
-                | Q(user__first_name__icontains=student_identifier)
-                | Q(user__last_name__icontains=student_identifier)
+    grid_mode = request.GET.get("mode") == "grid" or request.POST.get("entry_mode") == "grid"
+    # The single-student form always redirects, so only the page and the grid need the roster.
+    roster = roster_snapshot(exam) if grid_mode or request.method != "POST" else None
+    row_errors = {}
+    submitted = None
+
+    if request.method == "POST" and grid_mode:
+        outcome = save_roster_marks(exam, request.POST, roster=roster)
+        row_errors = outcome["errors"]
+        if outcome["saved"] or outcome["unchanged"]:
+            messages.success(
+                request,
+                f"Saved marks for {outcome['saved']} students on {exam.title}"
+                f" ({outcome['unchanged']} unchanged).",
             )
-            .first()
-        )
-        if not student:
-            messages.error(request, "Student not found for that ID or name.")
+        if not row_errors:
+            return redirect(f"{reverse('exams:teacher_exam_manage', args=[exam_id])}?mode=grid")
+        messages.error(request, f"{len(row_errors)} rows were not saved. Fix the highlighted rows and resubmit.")
+        submitted = request.POST
+
+    elif request.method == "POST":
+        student_identifier = (request.POST.get("student_identifier") or "").strip()
+        try:
+            marks_value = clean_marks(request.POST.get("marks_obtained"), exam)
+            attendance = clean_attendance(request.POST.get("attendance"))
+        except ValidationError as exc:
+            messages.error(request, "; ".join(exc.messages))
             return redirect("exams:teacher_exam_manage", exam_id=exam_id)
 
-        is_enrolled = StudentEnrollment.objects.filter(
-            student=student,
-            class_level=exam.class_level,
-            academic_year=exam.academic_year,
-        ).exists()
-        if not is_enrolled:
-            messages.error(request, "Student is not enrolled in this class for the exam's year.")
+        matches = roster_matches(exam, student_identifier, limit=2)
+        if not matches:
+            messages.error(request, "No student enrolled in this class for the exam's year matches that ID or name.")
             return redirect("exams:teacher_exam_manage", exam_id=exam_id)
 
-        marks_value = None
-        if marks_input:
-            try:
-                marks_value = Decimal(marks_input)
-            except (InvalidOperation, ValueError):
-                messages.error(request, "Enter a numeric mark or leave blank.")
-                return redirect("exams:teacher_exam_manage", exam_id=exam_id)
+        match = pick_match(matches)
+        if not match:
+            messages.error(request, "Several students match that name. Enter the student ID instead.")
+            return redirect("exams:teacher_exam_manage", exam_id=exam_id)
+        student = match.student
 
         ExamResult.objects.update_or_create(
             exam=exam,
@@ -164,36 +212,63 @@ def teacher_exam_manage(request, exam_id):
         )
         return redirect("exams:teacher_exam_manage", exam_id=exam_id)
 
-    enrollments = (
-        StudentEnrollment.objects.filter(class_level=exam.class_level, academic_year=exam.academic_year)
-        .select_related("student__user")
-        .order_by("roll_number", "student__user__username")
-    )
-    results_map = {
-        res.student_id: res
-        for res in ExamResult.objects.filter(exam=exam).select_related("student__user")
-    }
+    results_map = {res.student_id: res for res in ExamResult.objects.filter(exam=exam)}
     rows = []
-    for enrollment in enrollments:
+    for enrollment in roster.values():
         res = results_map.get(enrollment.student_id)
-        rows.append(
-            {
-                "student": enrollment.student,
-                "roll_number": enrollment.roll_number,
-                "marks": res.marks_obtained if res else None,
-                "attendance": res.attendance if res else "present",
-            }
-        )
+        row = {
+            "student": enrollment.student,
+            "roll_number": enrollment.roll_number,
+            "marks": res.marks_obtained if res else None,
+            "attendance": res.attendance if res else "present",
+            "error": row_errors.get(enrollment.student_id),
+        }
+        if submitted is not None and row["error"]:
+            # Keep what the teacher typed so the failing rows can be corrected in place.
+            row["marks"] = submitted.get(f"marks_{enrollment.student_id}", row["marks"])
+            row["attendance"] = submitted.get(f"attendance_{enrollment.student_id}", row["attendance"])
+        rows.append(row)
 
     return render(
         request,
         "teacher_exam_manage.html",
-        {"exam": exam, "rows": rows, "teacher": teacher},
+        {
+            "exam": exam,
+            "rows": rows,
+            "teacher": teacher,
+            "grid_mode": grid_mode,
+            "last_import": request.session.get(f"exam_import_{exam.pk}"),
+        },
     )
 
 
 @login_required
-def teacher_exam_results(request, exam_id):
+def teacher_exam_student_search(request, exam_id):
+    """Autocomplete for mark entry: ranked roster matches for ``?q=`` as JSON."""
+    teacher = _get_teacher(request)
+    if not teacher:
+        return JsonResponse({"error": "Teacher access required."}, status=403)
+
+    exam = get_object_or_404(Exam, pk=exam_id, assigned_teacher=teacher)
+    matches = roster_matches(exam, request.GET.get("q") or "")
+    return JsonResponse(
+        {
+            "results": [
+                {
+                    "id": enrollment.student_id,
+                    "student_id": enrollment.student.student_id,
+                    "name": enrollment.student.user.get_full_name() or enrollment.student.user.username,
+                    "username": enrollment.student.user.username,
+                    "roll_number": enrollment.roll_number,
+                }
+                for enrollment in matches
+            ]
+        }
+    )
+
+
+@login_required
+def teacher_exam_import(request, exam_id):
     teacher = _get_teacher(request)
     if not teacher:
         return redirect("accounts:role_redirect")
@@ -203,21 +278,204 @@ def teacher_exam_results(request, exam_id):
         pk=exam_id,
         assigned_teacher=teacher,
     )
+    if request.method != "POST":
+        return redirect("exams:teacher_exam_manage", exam_id=exam_id)
+
+    upload = request.FILES.get("marks_file")
+    if not upload:
+        messages.error(request, "Choose a CSV or XLSX file to import.")
+        return redirect("exams:teacher_exam_manage", exam_id=exam_id)
 
-    results = (
+    try:
+        outcome = import_exam_marks(exam, upload)
+    except MarksImportError as exc:
+        messages.error(request, str(exc))
+        return redirect("exams:teacher_exam_manage", exam_id=exam_id)
+
+    request.session[f"exam_import_{exam.pk}"] = {"file_name": upload.name, **outcome}
+    level = messages.WARNING if outcome["rejected"] else messages.SUCCESS
+    messages.add_message(
+        request,
+        level,
+        f"Imported {upload.name}: {outcome['accepted']} accepted, {outcome['rejected']} rejected, "
+        f"{outcome['skipped']} skipped for other sections.",
+    )
+    return redirect("exams:teacher_exam_manage", exam_id=exam_id)
+
+
+@login_required
+def teacher_exam_import_errors(request, exam_id, token):
+    teacher = _get_teacher(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    exam = get_object_or_404(Exam, pk=exam_id, assigned_teacher=teacher)
+    path = error_file_path(exam, token)
+    if not path.is_file():
+        raise Http404("Import error file not found.")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{exam.title}-import-errors.csv")
+
+
+def _exam_results(exam):
+    return list(
         ExamResult.objects.filter(exam=exam)
         .select_related("student__user")
-        .order_by("marks_obtained", "student__user__username")
+        .order_by(F("marks_obtained").desc(nulls_last=True), "student__user__username")
     )
-    stats = results.aggregate(
-        highest=Max("marks_obtained"),
-        lowest=Min("marks_obtained"),
-        average=Avg("marks_obtained"),
-        total=Count("id"),
+
+
+def _exam_ranks(exam):
+    return {rank.student_id: rank for rank in MeritRank.objects.filter(exam=exam, scope="exam")}
+
+
+def _exam_stats(exam):
+    return ensure_exam_statistics([exam]).get(exam.pk)
+
+
+def _exam_results_validators(request, exam):
+    """
+    ETag and Last-Modified of the results page from two aggregates: results (count and
+    latest edit, including student renames) and the exam's merit ranks.
+    """
+    results = ExamResult.objects.filter(exam=exam).aggregate(
+        count=Count("pk"), edited=Max("updated_at"), students=Max("student__updated_at")
     )
+    ranks = MeritRank.objects.filter(exam=exam, scope="exam").aggregate(count=Count("pk"), ranked=Max("computed_at"))
+    etag = page_etag(request, exam.pk, exam.updated_at, *results.values(), *ranks.values())
+    return etag, latest(exam.updated_at, results["edited"], results["students"], ranks["ranked"])
 
-    return render(
+
+def _exam_results_context(teacher, exam, results, ranks, stats):
+    for result in results:
+        result.merit = ranks.get(result.student_id)
+    ranked_at = max((rank.computed_at for rank in ranks.values()), default=None)
+    return {"exam": exam, "results": results, "stats": stats, "ranked_at": ranked_at, "teacher": teacher}
+
+
+@login_required
+def teacher_exam_results(request, exam_id):
+    teacher = _get_teacher(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    exam = get_object_or_404(
+        Exam.objects.select_related("class_level__academic_year", "subject__class_level__academic_year", "academic_year"),
+        pk=exam_id,
+        assigned_teacher=teacher,
+    )
+
+    if request.method == "POST":
+        counts = refresh_merit_lists(exam.academic_year, class_ids=[exam.class_level_id])
+        messages.success(request, f"Merit lists recomputed for {exam.class_level}: {counts.get('class', 0)} students ranked.")
+        return redirect("exams:teacher_exam_results", exam_id=exam.id)
+
+    etag, last_modified = _exam_results_validators(request, exam)
+    return conditional_page(
         request,
-        "teacher_exam_results.html",
-        {"exam": exam, "results": results, "stats": stats, "teacher": teacher},
+        etag,
+        last_modified,
+        lambda: render(
+            request,
+            "teacher_exam_results.html",
+            _exam_results_context(teacher, exam, _exam_results(exam), _exam_ranks(exam), _exam_stats(exam)),
+        ),
+    )
+
+
+@login_required
+async def teacher_exam_results_async(request, exam_id):
+    """teacher_exam_results for ASGI: results, ranks and statistics are loaded together."""
+    if request.method == "POST":
+        return await sync_to_async(teacher_exam_results)(request, exam_id)
+
+    teacher = await sync_to_async(_get_teacher)(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    try:
+        exam = await Exam.objects.select_related(
+            "class_level__academic_year", "subject__class_level__academic_year", "academic_year"
+        ).aget(
+            pk=exam_id, assigned_teacher=teacher
+        )
+    except Exam.DoesNotExist:
+        raise Http404("No Exam matches the given query.")
+
+    etag, last_modified = await sync_to_async(_exam_results_validators)(request, exam)
+    response = await sync_to_async(not_modified)(request, etag, last_modified)
+    if response:
+        return response
+
+    results, ranks, stats = await gather_queries(
+        lambda: _exam_results(exam), lambda: _exam_ranks(exam), lambda: _exam_stats(exam)
+    )
+    context = _exam_results_context(teacher, exam, results, ranks, stats)
+    return with_validators(
+        await sync_to_async(render)(request, "teacher_exam_results.html", context), etag, last_modified
+    )
+
+
+@login_required
+def teacher_exam_publish(request, exam_id):
+    teacher = _get_teacher(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    exam = get_object_or_404(Exam, pk=exam_id, assigned_teacher=teacher)
+    if request.method != "POST":
+        return redirect("exams:teacher_exam_results", exam_id=exam_id)
+
+    publish = request.POST.get("action") != "unpublish"
+    changed = publish_exam_results(exam, published=publish, actor=request.user)
+    if publish:
+        messages.success(request, f"Published {changed} results for {exam.title}.")
+    else:
+        messages.success(request, f"Withdrew {changed} results for {exam.title}.")
+    return redirect("exams:teacher_exam_results", exam_id=exam_id)
+
+
+@login_required
+def teacher_exam_results_export(request, exam_id):
+    teacher = _get_teacher(request)
+    if not teacher:
+        return redirect("accounts:role_redirect")
+
+    exam = get_object_or_404(Exam, pk=exam_id, assigned_teacher=teacher)
+    results = ExamResult.objects.filter(exam=exam).order_by("student__student_id")
+    filename = f"{exam.title}-results.csv".replace(" ", "_")
+    return stream_queryset_csv(results, filename, RESULT_EXPORT_COLUMNS)
+
+
+def _api_teacher(request):
+    teacher = _get_teacher(request)
+    if not teacher:
+        raise ApiError("Teacher access required.", status=403)
+    return teacher
+
+
+@api_view
+def api_teacher_exams(request):
+    """Exams assigned to the signed-in teacher, newest first (undated last)."""
+    teacher = _api_teacher(request)
+    exams = Exam.objects.filter(assigned_teacher=teacher)
+    return keyset_page(request, exams, EXAM_API_FIELDS, ("-exam_date", "pk"))
+
+
+@api_view
+def api_teacher_exam_results(request, exam_id):
+    """Results of one of the teacher's exams in the class's roll-number order."""
+    teacher = _api_teacher(request)
+    exam = Exam.objects.filter(pk=exam_id, assigned_teacher=teacher).values("class_level_id", "academic_year_id").first()
+    if not exam:
+        raise ApiError("No Exam matches the given query.", status=404)
+    # Roll numbers live on the enrollment of the exam's class and year (one per student).
+    results = ExamResult.objects.filter(exam_id=exam_id).annotate(
+        enrollment=FilteredRelation(
+            "student__enrollments",
+            condition=Q(
+                student__enrollments__class_level_id=exam["class_level_id"],
+                student__enrollments__academic_year_id=exam["academic_year_id"],
+            ),
+        )
     )
+    return keyset_page(request, results, EXAM_RESULT_API_FIELDS, ("enrollment__roll_number", "pk"))
@@ -0,0 +1,22 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import OutboxMessage
+from cems.admin_base import CemsModelAdmin
+
+
+def all_model_fields(model_class):
+    return [field.name for field in model_class._meta.fields]
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(CemsModelAdmin):
+    list_display = [name for name in all_model_fields(OutboxMessage) if name not in ("body", "html_body")]
+    list_filter = ("status",)
+    search_fields = ("to", "subject", "id")
+    actions = ("retry_now",)
+
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status="sent").update(status="pending", attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"Queued {count} messages for immediate delivery.", level=messages.INFO)
+    retry_now.short_description = "Retry selected messages now"
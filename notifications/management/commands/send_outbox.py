@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from notifications.worker import outbox_counters, run_worker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches (runs until stopped unless --once is given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the due backlog and exit.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Messages per batch/connection.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to wait when the outbox is empty.")
+        parser.add_argument("--stats", action="store_true", help="Print backlog counters and exit.")
+
+    def _write_counters(self):
+        counters = outbox_counters()
+        self.stdout.write(
+            f"Outbox: {counters['pending']} pending ({counters['due']} due, {counters['retrying']} retrying), "
+            f"{counters['failed']} failed, {counters['sent_last_hour']} sent in the last hour, "
+            f"oldest pending {counters['oldest_pending_seconds']}s."
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self._write_counters()
+            return
+
+        def progress(totals):
+            self.stdout.write(
+                f"  batches {totals.batches}: sent {totals.sent}, retrying {totals.retried}, "
+                f"failed {totals.failed} ({totals.per_second:.1f}/s)"
+            )
+
+        try:
+            totals = run_worker(
+                size=options["batch_size"], interval=options["interval"], once=options["once"], on_batch=progress
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Sent {totals.sent} emails in {totals.batches} batches."))
+        self._write_counters()
@@ -0,0 +1,30 @@
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from notifications.models import OutboxMessage
+
+OUTBOX_WRITE_BATCH_SIZE = 1000
+
+
+def enqueue_email(to: str, subject: str, body: str, html_body: str = "", from_email: Optional[str] = None):
+    """
+    Queue one email. Call inside the transaction that makes the change being announced:
+    the message is only delivered if that transaction commits.
+    """
+    return OutboxMessage.objects.create(
+        to=to,
+        subject=subject,
+        body=body,
+        html_body=html_body or "",
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def enqueue_emails(messages: Iterable[Tuple[str, str, str]], from_email: Optional[str] = None) -> List[OutboxMessage]:
+    """Queue many (to, subject, body) emails with bulk inserts."""
+    sender = from_email or settings.DEFAULT_FROM_EMAIL
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(to=to, subject=subject, body=body, from_email=sender) for to, subject, body in messages if to],
+        batch_size=OUTBOX_WRITE_BATCH_SIZE,
+    )
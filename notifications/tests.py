@@ -0,0 +1,136 @@
+import threading
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from notifications.models import OutboxMessage
+from notifications.worker import deliver_batch, retry_delay
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("SMTP server refused the connection")
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    def open(self):
+        raise TimeoutError("SMTP server timed out")
+
+
+def queue(count=1, **fields):
+    return [
+        OutboxMessage.objects.create(to=f"parent{index}@example.com", subject="Results", body="Published.", **fields)
+        for index in range(count)
+    ]
+
+
+class RetryDelayTests(SimpleTestCase):
+    @override_settings(OUTBOX_RETRY_BASE_SECONDS=30)
+    def test_doubles_per_attempt_up_to_an_hour(self):
+        self.assertEqual(
+            [retry_delay(attempts).total_seconds() for attempts in (1, 2, 3, 4, 8, 20)],
+            [30, 60, 120, 240, 3600, 3600],
+        )
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", OUTBOX_RETRY_BASE_SECONDS=30)
+class DeliverBatchTests(TestCase):
+    def make_due(self):
+        OutboxMessage.objects.filter(status="pending").update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_sends_due_messages_in_order_up_to_the_batch_size(self):
+        now = timezone.now()
+        later, first, second = queue(3)
+        OutboxMessage.objects.filter(pk=later.pk).update(next_attempt_at=now - timedelta(minutes=1))
+        OutboxMessage.objects.filter(pk=first.pk).update(next_attempt_at=now - timedelta(minutes=3))
+        OutboxMessage.objects.filter(pk=second.pk).update(next_attempt_at=now - timedelta(minutes=2))
+        queue(1, next_attempt_at=now + timedelta(minutes=5))
+
+        stats = deliver_batch(size=2)
+
+        self.assertEqual((stats.batches, stats.sent), (1, 2))
+        self.assertEqual([email.to for email in mail.outbox], [[first.to], [second.to]])
+        self.assertEqual(OutboxMessage.objects.filter(status="sent").count(), 2)
+        self.assertEqual(deliver_batch().sent, 1)
+        self.assertEqual(deliver_batch().batches, 0)
+
+    @override_settings(EMAIL_BACKEND="notifications.tests.FailingEmailBackend")
+    def test_failed_send_is_retried_with_backoff(self):
+        (message,) = queue()
+        before = timezone.now()
+
+        stats = deliver_batch()
+
+        message.refresh_from_db()
+        self.assertEqual(stats.retried, 1)
+        self.assertEqual((message.status, message.attempts), ("pending", 1))
+        self.assertIn("refused", message.last_error)
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=30))
+        # Not due again until the backoff has passed.
+        self.assertEqual(deliver_batch().batches, 0)
+
+        self.make_due()
+        deliver_batch()
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertGreaterEqual(message.next_attempt_at, timezone.now() + timedelta(seconds=59))
+
+    @override_settings(EMAIL_BACKEND="notifications.tests.FailingEmailBackend", OUTBOX_MAX_ATTEMPTS=3)
+    def test_gives_up_after_max_attempts(self):
+        (message,) = queue()
+
+        outcomes = []
+        for _ in range(3):
+            self.make_due()
+            stats = deliver_batch()
+            outcomes.append((stats.retried, stats.failed))
+
+        message.refresh_from_db()
+        self.assertEqual(outcomes, [(1, 0), (1, 0), (0, 1)])
+        self.assertEqual((message.status, message.attempts), ("failed", 3))
+        self.make_due()
+        self.assertEqual(deliver_batch().batches, 0)
+
+    @override_settings(EMAIL_BACKEND="notifications.tests.UnreachableEmailBackend")
+    def test_unreachable_server_retries_the_whole_batch(self):
+        queue(3)
+
+        stats = deliver_batch()
+
+        self.assertEqual((stats.sent, stats.retried), (0, 3))
+        self.assertEqual(set(OutboxMessage.objects.values_list("status", "attempts")), {("pending", 1)})
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class DeliverBatchLockingTests(TransactionTestCase):
+    def test_skips_messages_locked_by_another_worker(self):
+        locked, free = queue(2)
+        claimed = threading.Event()
+        release = threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    list(OutboxMessage.objects.select_for_update().filter(pk=locked.pk))
+                    claimed.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(claimed.wait(10))
+            stats = deliver_batch()
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(stats.sent, 1)
+        self.assertEqual([email.to for email in mail.outbox], [[free.to]])
+        self.assertEqual(OutboxMessage.objects.get(pk=locked.pk).status, "pending")
@@ -0,0 +1,150 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from notifications.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 3600
+
+
+def batch_size():
+    return getattr(settings, "OUTBOX_BATCH_SIZE", 100)
+
+
+def max_attempts():
+    return getattr(settings, "OUTBOX_MAX_ATTEMPTS", 6)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 30)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY_SECONDS))
+
+
+@dataclass
+class DeliveryStats:
+    batches: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.sent / elapsed if elapsed else 0.0
+
+    def add(self, other: "DeliveryStats"):
+        self.batches += other.batches
+        self.sent += other.sent
+        self.retried += other.retried
+        self.failed += other.failed
+
+
+def _as_email(message: OutboxMessage, connection):
+    email = EmailMultiAlternatives(
+        message.subject, message.body, message.from_email or None, [message.to], connection=connection
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, "text/html")
+    return email
+
+
+def _record_failure(message: OutboxMessage, error, now, stats: DeliveryStats):
+    message.attempts += 1
+    message.last_error = str(error)[:2000]
+    if message.attempts >= max_attempts():
+        message.status = "failed"
+        stats.failed += 1
+    else:
+        message.next_attempt_at = now + retry_delay(message.attempts)
+        stats.retried += 1
+
+
+def deliver_batch(size=None) -> DeliveryStats:
+    """
+    Claim up to ``size`` due messages with SELECT ... FOR UPDATE SKIP LOCKED and send them
+    over one mail connection. Rows stay locked until the batch is recorded, so concurrent
+    workers never send the same message; if the worker dies mid-batch the transaction rolls
+    back and the messages are picked up again.
+    """
+    stats = DeliveryStats()
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[: size or batch_size()]
+        )
+        if not batch:
+            return stats
+        stats.batches = 1
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as exc:
+            logger.warning("Outbox could not open a mail connection: %s", exc)
+            for message in batch:
+                _record_failure(message, exc, now, stats)
+        else:
+            try:
+                for message in batch:
+                    try:
+                        _as_email(message, connection).send()
+                    except Exception as exc:
+                        _record_failure(message, exc, now, stats)
+                    else:
+                        message.status = "sent"
+                        message.attempts += 1
+                        message.sent_at = timezone.now()
+                        message.last_error = ""
+                        stats.sent += 1
+            finally:
+                connection.close()
+
+        OutboxMessage.objects.bulk_update(
+            batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+        )
+    return stats
+
+
+def run_worker(size=None, interval: float = 5.0, once: bool = False, on_batch=None) -> DeliveryStats:
+    """
+    Deliver batches until the outbox is drained; with ``once`` stop there, otherwise sleep
+    ``interval`` seconds and poll again. ``on_batch`` receives the running totals.
+    """
+    totals = DeliveryStats()
+    while True:
+        stats = deliver_batch(size)
+        totals.add(stats)
+        if stats.batches and on_batch:
+            on_batch(totals)
+        if not stats.batches:
+            if once:
+                return totals
+            time.sleep(interval)
+
+
+def outbox_counters() -> dict:
+    """Backlog and throughput figures for the outbox in one aggregate query."""
+    now = timezone.now()
+    counters = OutboxMessage.objects.aggregate(
+        pending=Count("id", filter=Q(status="pending")),
+        due=Count("id", filter=Q(status="pending", next_attempt_at__lte=now)),
+        retrying=Count("id", filter=Q(status="pending", attempts__gt=0)),
+        failed=Count("id", filter=Q(status="failed")),
+        sent_last_hour=Count("id", filter=Q(status="sent", sent_at__gte=now - timedelta(hours=1))),
+        oldest_pending=Min("created_at", filter=Q(status="pending")),
+    )
+    oldest = counters.pop("oldest_pending")
+    counters["oldest_pending_seconds"] = int((now - oldest).total_seconds()) if oldest else 0
+    return counters